@@ -1,48 +1,13 @@
 @echo off
 echo =====================================
 echo    DESCARGA PARALELA DE DENUNCIAS
-echo    Ejecutando 12 scripts simultaneos
+echo    12 semestres en un solo proceso
 echo =====================================
 echo.
 
-REM Crear directorio de datos si no existe
-if not exist "data" mkdir data
-
-REM Ejecutar todos los scripts en paralelo
-echo [INFO] Iniciando descarga paralela por semestres...
-echo [INFO] Scripts ejecutandose en segundo plano...
+REM Un solo proceso reparte los tramos de los 12 semestres entre sus workers
+REM (ver src\data_collection\programador.py); ya no se abre un proceso por script
+echo [INFO] Iniciando descarga...
 echo.
 
-start /B python codigo_2020_S1.py
-start /B python codigo_2020_S2.py
-start /B python codigo_2021_S1.py
-start /B python codigo_2021_S2.py
-start /B python codigo_2022_S1.py
-start /B python codigo_2022_S2.py
-start /B python codigo_2023_S1.py
-start /B python codigo_2023_S2.py
-start /B python codigo_2024_S1.py
-start /B python codigo_2024_S2.py
-start /B python codigo_2025_S1.py
-start /B python codigo_2025_S2.py
-
-echo [INFO] 12 procesos iniciados exitosamente
-echo [INFO] Monitorea el progreso en las ventanas abiertas
-echo [INFO] Los archivos CSV se guardaran en: data\
-echo.
-echo [ARCHIVOS ESPERADOS:]
-echo   - denuncias_2020_S1.csv
-echo   - denuncias_2020_S2.csv
-echo   - denuncias_2021_S1.csv
-echo   - denuncias_2021_S2.csv
-echo   - denuncias_2022_S1.csv
-echo   - denuncias_2022_S2.csv
-echo   - denuncias_2023_S1.csv
-echo   - denuncias_2023_S2.csv
-echo   - denuncias_2024_S1.csv
-echo   - denuncias_2024_S2.csv
-echo   - denuncias_2025_S1.csv
-echo   - denuncias_2025_S2.csv
-echo.
-echo [INFO] Presiona cualquier tecla para salir...
-pause >nul
\ No newline at end of file
+python "%~dp0ejecutar_todos.py"
@@ -0,0 +1 @@
+# Servidor ArcGIS local y benchmarks de la ingesta
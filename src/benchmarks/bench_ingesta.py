@@ -0,0 +1,223 @@
+"""Benchmark de la ingesta contra el servidor ArcGIS local.
+
+Levanta ``servidor_arcgis.ServidorArcGIS`` con denuncias sintéticas y mide,
+para cada descargador del proyecto:
+
+- ``motor``: ``MotorIngesta.fetch_all_parallel`` (``ingesta.py``) vía ``descargar``.
+- ``data``: ``data.fetch_all`` (objectIds por POST con lote adaptativo).
+- ``v1``: ``fetch_all`` de ``codigo_2020_S1.py`` (cursores keyset por ``(fecha_hora_hecho, objectid)``).
+
+Cada caso corre en un subproceso propio para que el pico de RSS sea solo suyo.
+Se reportan registros/s, bytes/s (contados por el servidor), pico de RSS y si
+la descarga quedó completa pese a los errores inyectados.
+
+Uso:
+    python src/benchmarks/bench_ingesta.py --registros 20000 --latencia 0.05
+    python src/benchmarks/bench_ingesta.py --casos motor --tasa-error 0.1 --tasa-html 0.02
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.servidor_arcgis import ServidorArcGIS, generar_denuncias
+
+CASOS = ["motor", "data", "v1"]
+# Mismo periodo que codigo_2020_S1.py, para que los tres casos pidan lo mismo
+WHERE = "(año_hecho = 2020 AND mes_hecho BETWEEN 1 AND 6)"
+DESDE = "2020-01-01"
+HASTA = "2020-06-30 23:59:59"
+# Tasa del limitador durante el benchmark: alta para medir al descargador, no al limitador
+TASA_BENCH = 1000.0
+# Backoff corto y pausa breve del cortacircuitos: medir la recuperación sin esperas reales
+BACKOFF_BENCH = 0.05
+PAUSA_BENCH = 1.0
+MARCA_RESULTADO = "RESULTADO_BENCH "
+
+
+def rss_pico_mb():
+    """Pico de memoria residente del proceso actual en MB (None si no se puede medir)."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB; macOS, bytes
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+def _contar(df):
+    if df is None or len(df) == 0:
+        return 0, 0
+    unicos = df["objectid"].nunique() if "objectid" in df.columns else len(df)
+    return len(df), int(unicos)
+
+
+# --- Casos (se ejecutan en el subproceso) ---
+
+def caso_motor(url, args, tmp):
+    import asyncio
+    import pandas as pd
+    from data_collection import ingesta, parquet
+
+    ingesta.BASE_QUERY_URL = url
+    ingesta.BACKOFF_BASE = BACKOFF_BENCH
+    motor = ingesta.MotorIngesta(max_concurrencia=args.concurrencia, out_dir=tmp,
+                                 reiniciar=True, tasa=args.tasa, perfil=args.perfil)
+    motor.circuito.pausa = PAUSA_BENCH
+    particion = ingesta.Particion("bench", WHERE)
+    asyncio.run(motor.descargar([particion]))
+    rutas = parquet.archivos(os.path.join(tmp, parquet.PARQUET_SUBDIR), particion.etiqueta)
+    if rutas:
+        return _contar(pd.concat([pd.read_parquet(r, columns=["objectid"]) for r in rutas]))
+    ruta = os.path.join(tmp, particion.nombre_csv)
+    if not os.path.exists(ruta):
+        return 0, 0
+    return _contar(pd.read_csv(ruta, usecols=["objectid"]))
+
+
+def caso_data(url, args, tmp):
+    from data_collection import data
+    from data_collection.limites import Cortacircuitos, LimitadorTasa, PoliticaReintentos
+
+    data.BASE_QUERY_URL = url
+    data.WHERE = WHERE
+    data.OUT_DIR = tmp
+    data.OUT_CSV = os.path.join(tmp, os.path.basename(data.OUT_CSV))
+    data.LIMITADOR = LimitadorTasa(args.tasa)
+    data.REINTENTOS = PoliticaReintentos(base=BACKOFF_BENCH)
+    data.CIRCUITO = Cortacircuitos(data.LIMITADOR, pausa=PAUSA_BENCH)
+    return _contar(data.fetch_all())
+
+
+def caso_v1(url, args, tmp):
+    from data_collection import codigo_2020_S1 as v1
+    from data_collection.limites import LimitadorTasa, PoliticaReintentos
+
+    v1.BASE_QUERY_URL = url
+    v1.LIMITADOR = LimitadorTasa(args.tasa)
+    v1.REINTENTOS = PoliticaReintentos(base=BACKOFF_BENCH)
+    return _contar(v1.fetch_all())
+
+
+FUNCIONES = {"motor": caso_motor, "data": caso_data, "v1": caso_v1}
+
+
+def ejecutar_worker(args):
+    """Corre un caso y emite una línea ``RESULTADO_BENCH {...}`` en stdout."""
+    with tempfile.TemporaryDirectory(prefix="bench_ingesta_") as tmp:
+        inicio = time.perf_counter()
+        error = None
+        try:
+            filas, unicos = FUNCIONES[args.worker](args.url, args, tmp)
+        except Exception as exc:
+            filas, unicos, error = 0, 0, f"{type(exc).__name__}: {exc}"
+        segundos = time.perf_counter() - inicio
+    resultado = {"filas": filas, "unicos": unicos, "segundos": segundos,
+                 "rss_pico_mb": rss_pico_mb(), "error": error}
+    print(MARCA_RESULTADO + json.dumps(resultado), flush=True)
+
+
+# --- Orquestación (proceso principal) ---
+
+def medir_caso(caso, servidor, args):
+    servidor.reiniciar_estadisticas()
+    comando = [sys.executable, os.path.abspath(__file__), "--worker", caso, "--url", servidor.url_query,
+               "--tasa", str(args.tasa), "--concurrencia", str(args.concurrencia)]
+    if args.perfil:
+        comando += ["--perfil", args.perfil]
+    proc = subprocess.run(comando, capture_output=True, text=True, encoding="utf-8")
+    if args.verbose:
+        print(proc.stdout, flush=True)
+    lineas = [l for l in proc.stdout.splitlines() if l.startswith(MARCA_RESULTADO)]
+    if not lineas:
+        error = (proc.stderr.strip().splitlines() or ["sin salida"])[-1]
+        resultado = {"filas": 0, "unicos": 0, "segundos": 0.0, "rss_pico_mb": None, "error": error}
+    else:
+        resultado = json.loads(lineas[-1][len(MARCA_RESULTADO):])
+
+    stats = servidor.estadisticas()
+    segundos = resultado["segundos"] or float("nan")
+    resultado.update(stats)
+    resultado["caso"] = caso
+    resultado["registros_s"] = resultado["unicos"] / segundos
+    resultado["bytes_s"] = stats["bytes_enviados"] / segundos
+    return resultado
+
+
+def imprimir_tabla(resultados, esperado):
+    print(f"\nRegistros esperados: {esperado}")
+    cabecera = (f"{'caso':<6} {'seg':>8} {'reg/s':>10} {'MB/s':>8} {'RSS MB':>8} "
+                f"{'peticiones':>10} {'err 503':>8} {'err html':>8} {'únicos':>8} {'completo':>8}")
+    print(cabecera)
+    print("-" * len(cabecera))
+    for r in resultados:
+        rss = f"{r['rss_pico_mb']:.0f}" if r["rss_pico_mb"] is not None else "n/d"
+        completo = "sí" if r["unicos"] == esperado and not r["error"] else "NO"
+        print(f"{r['caso']:<6} {r['segundos']:>8.2f} {r['registros_s']:>10.0f} "
+              f"{r['bytes_s'] / 1e6:>8.2f} {rss:>8} {r['peticiones']:>10} {r['errores_503']:>8} "
+              f"{r['errores_html']:>8} {r['unicos']:>8} {completo:>8}")
+        if r["error"]:
+            print(f"       error: {r['error']}")
+        elif r["filas"] != r["unicos"]:
+            print(f"       {r['filas'] - r['unicos']} filas duplicadas")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de la ingesta contra un servidor ArcGIS local.")
+    parser.add_argument("--casos", nargs="+", choices=CASOS, default=CASOS)
+    parser.add_argument("--registros", type=int, default=20000)
+    parser.add_argument("--max-record-count", type=int, default=2000)
+    parser.add_argument("--latencia", type=float, default=0.02, help="Segundos fijos por petición")
+    parser.add_argument("--latencia-por-registro", type=float, default=0.00002)
+    parser.add_argument("--tasa-error", type=float, default=0.0, help="Probabilidad de HTTP 503")
+    parser.add_argument("--tasa-html", type=float, default=0.0, help="Probabilidad de página HTML de error")
+    parser.add_argument("--semilla", type=int, default=42, help="Semilla de los datos y de los errores")
+    parser.add_argument("--concurrencia", type=int, default=12)
+    parser.add_argument("--tasa", type=float, default=TASA_BENCH, help="Peticiones/s del limitador")
+    parser.add_argument("--perfil", help="Perfil de outFields para el caso 'motor' (config/config.yaml)")
+    parser.add_argument("--sin-pbf", action="store_true", help="El servidor rechaza f=pbf")
+    parser.add_argument("--sin-gzip", action="store_true", help="El servidor no comprime las respuestas")
+    parser.add_argument("--repeticiones", type=int, default=1)
+    parser.add_argument("--salida", help="Guarda los resultados en JSON")
+    parser.add_argument("--verbose", action="store_true", help="Muestra la salida de cada descarga")
+    # Uso interno: ejecución de un caso dentro del subproceso
+    parser.add_argument("--worker", choices=CASOS, help=argparse.SUPPRESS)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        return ejecutar_worker(args)
+
+    registros = generar_denuncias(args.registros, DESDE, HASTA, args.semilla)
+    servidor = ServidorArcGIS(
+        registros, max_record_count=args.max_record_count, latencia=args.latencia,
+        latencia_por_registro=args.latencia_por_registro,
+        tasa_error=args.tasa_error, tasa_html=args.tasa_html, semilla=args.semilla,
+        soporta_pbf=not args.sin_pbf, comprimir=not args.sin_gzip,
+    )
+    resultados = []
+    with servidor:
+        esperado = servidor.contar(WHERE)
+        print(f"Servidor local: {servidor.url_query} ({len(registros)} denuncias sintéticas)", flush=True)
+        for rep in range(1, args.repeticiones + 1):
+            for caso in args.casos:
+                print(f"[rep {rep}] Ejecutando caso '{caso}'...", flush=True)
+                resultado = medir_caso(caso, servidor, args)
+                resultado["repeticion"] = rep
+                resultados.append(resultado)
+
+    imprimir_tabla(resultados, esperado)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({"esperado": esperado, "parametros": vars(args), "resultados": resultados},
+                      f, ensure_ascii=False, indent=2)
+        print(f"\nResultados guardados en: {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
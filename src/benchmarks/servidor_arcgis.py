@@ -0,0 +1,715 @@
+"""Servidor local que imita ``MapServer/0/query`` del servicio de denuncias.
+
+Sirve denuncias sintéticas (deterministas según la semilla) para medir la
+ingesta sin tocar ``seguridadciudadana.mininter.gob.pe``. Soporta lo que
+usan los scripts del proyecto:
+
+- ``GET`` (scripts v1) y ``POST`` con formulario (motor de ingesta, ``data.py``).
+- ``where`` con el subconjunto SQL que generamos: ``AND``/``OR``/``NOT``,
+  comparaciones, ``BETWEEN``, ``IN``, ``IS NULL`` y literales ``timestamp '...'``.
+- ``returnIdsOnly``, ``returnCountOnly``, ``outStatistics`` con
+  ``groupByFieldsForStatistics``, ``objectIds``, ``outFields``,
+  ``orderByFields``, ``resultOffset``/``resultRecordCount`` y
+  ``exceededTransferLimit`` al superar ``maxRecordCount``.
+- ``f=json`` (esriJSON), ``f=geojson`` y ``f=pbf`` (protocol buffers, se
+  puede desactivar para simular servidores antiguos), más los metadatos de la
+  capa en ``MapServer/0?f=json``.
+- Compresión gzip si el cliente la anuncia en ``Accept-Encoding``.
+- Latencia configurable (fija + por registro) e inyección de errores: HTTP 503
+  y páginas HTML de error con estado 200, como las que devuelve el servicio real.
+
+Uso:
+    python src/benchmarks/servidor_arcgis.py --registros 50000 --puerto 8765
+"""
+import re
+import gzip
+import json
+import time
+import struct
+import random
+import argparse
+import threading
+from datetime import datetime, timezone
+from urllib.parse import parse_qs, urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RUTA_CAPA = "/arcgis/rest/services/servicios_ogc/denuncias/MapServer/0"
+OID_FIELD = "objectid"
+MAX_RECORD_COUNT = 2000
+
+# Catálogos reducidos (valores reales del dataset) para las columnas categóricas
+UBICACIONES = [
+    ("LIMA", "LIMA", "SAN JUAN DE LURIGANCHO", -11.98, -77.00),
+    ("LIMA", "LIMA", "CERCADO DE LIMA", -12.05, -77.04),
+    ("LIMA", "LIMA", "ATE", -12.03, -76.92),
+    ("CALLAO", "CALLAO", "CALLAO", -12.05, -77.12),
+    ("AREQUIPA", "AREQUIPA", "AREQUIPA", -16.40, -71.54),
+    ("LA LIBERTAD", "TRUJILLO", "TRUJILLO", -8.11, -79.03),
+    ("PIURA", "PIURA", "PIURA", -5.19, -80.63),
+    ("CUSCO", "CUSCO", "CUSCO", -13.53, -71.97),
+]
+HECHOS = [
+    (1, "PATRIMONIO (DELITO)", 10, "HURTO"),
+    (1, "PATRIMONIO (DELITO)", 11, "ROBO"),
+    (2, "VIDA EL CUERPO Y LA SALUD", 20, "LESIONES"),
+    (3, "SEGURIDAD PUBLICA", 30, "PELIGRO COMUN"),
+    (4, "FAMILIA", 40, "VIOLENCIA FAMILIAR"),
+]
+TURNOS = ["MAÑANA", "TARDE", "NOCHE", "MADRUGADA"]
+
+# Esquema: nombre -> tipo esri (mismo orden que el servicio)
+CAMPOS = [
+    (OID_FIELD, "esriFieldTypeOID"),
+    ("fecha_hora_hecho", "esriFieldTypeDate"),
+    ("año_hecho", "esriFieldTypeInteger"),
+    ("mes_hecho", "esriFieldTypeInteger"),
+    ("dia_hecho", "esriFieldTypeInteger"),
+    ("departamento_hecho", "esriFieldTypeString"),
+    ("provincia_hecho", "esriFieldTypeString"),
+    ("distrito_hecho", "esriFieldTypeString"),
+    ("id_tipo_hecho", "esriFieldTypeInteger"),
+    ("tipo_hecho", "esriFieldTypeString"),
+    ("id_materia_hecho", "esriFieldTypeInteger"),
+    ("materia_hecho", "esriFieldTypeString"),
+    ("turno_hecho", "esriFieldTypeString"),
+    ("direccion_hecho", "esriFieldTypeString"),
+    ("lat_hecho", "esriFieldTypeDouble"),
+    ("long_hecho", "esriFieldTypeDouble"),
+]
+
+# esriPBuffer.FieldType
+TIPOS_PBF = {
+    "esriFieldTypeSmallInteger": 0, "esriFieldTypeInteger": 1, "esriFieldTypeSingle": 2,
+    "esriFieldTypeDouble": 3, "esriFieldTypeString": 4, "esriFieldTypeDate": 5,
+    "esriFieldTypeOID": 6,
+}
+# Cuantización de coordenadas en f=pbf (origen superior izquierdo, como ArcGIS)
+ESCALA_PBF = 1e-9
+TRASLADO_PBF = (-180.0, 90.0)
+# No se comprimen respuestas más chicas que esto
+MIN_BYTES_GZIP = 1024
+
+PAGINA_ERROR = (b"<html><head><title>Error</title></head>"
+                b"<body><h1>Service Unavailable</h1></body></html>")
+
+
+def _a_epoch_ms(texto):
+    for formato in ("%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
+        try:
+            dt = datetime.strptime(texto, formato)
+        except ValueError:
+            continue
+        return int(dt.replace(tzinfo=timezone.utc).timestamp() * 1000)
+    raise ValueError(f"Timestamp inválido: {texto!r}")
+
+
+def generar_denuncias(n, desde="2020-01-01", hasta="2020-06-30 23:59:59", semilla=42):
+    """Lista de ``n`` denuncias sintéticas con objectids 1..n.
+
+    Las fechas se redondean al minuto, así que hay hechos que comparten
+    ``fecha_hora_hecho`` (como en el servicio real).
+    """
+    rng = random.Random(semilla)
+    inicio = _a_epoch_ms(desde) // 60000
+    fin = _a_epoch_ms(hasta) // 60000
+    registros = []
+    for oid in range(1, n + 1):
+        minuto = rng.randint(inicio + 1, fin)
+        dt = datetime.fromtimestamp(minuto * 60, tz=timezone.utc)
+        dpto, prov, dist, lat, lon = rng.choice(UBICACIONES)
+        id_materia, materia, id_tipo, tipo = rng.choice(HECHOS)
+        lat = round(lat + rng.uniform(-0.05, 0.05), 6)
+        lon = round(lon + rng.uniform(-0.05, 0.05), 6)
+        registros.append({
+            OID_FIELD: oid,
+            "fecha_hora_hecho": minuto * 60000,
+            "año_hecho": dt.year,
+            "mes_hecho": dt.month,
+            "dia_hecho": dt.day,
+            "departamento_hecho": dpto,
+            "provincia_hecho": prov,
+            "distrito_hecho": dist,
+            "id_tipo_hecho": id_tipo,
+            "tipo_hecho": tipo,
+            "id_materia_hecho": id_materia,
+            "materia_hecho": materia,
+            "turno_hecho": TURNOS[dt.hour // 6],
+            "direccion_hecho": f"AV. SINTETICA {rng.randint(1, 2000)}",
+            "lat_hecho": lat,
+            "long_hecho": lon,
+        })
+    return registros
+
+
+# --- Cláusulas WHERE ---
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<ts>timestamp\s*'[^']*')
+      | (?P<str>'(?:[^']|'')*')
+      | (?P<num>-?\d+(?:\.\d+)?)
+      | (?P<op><>|!=|>=|<=|=|<|>)
+      | (?P<punt>[(),])
+      | (?P<id>[^\W\d]\w*)
+    )""", re.VERBOSE | re.IGNORECASE)
+
+_COMPARADORES = {
+    "=": lambda a, b: a == b,
+    "<>": lambda a, b: a != b,
+    "!=": lambda a, b: a != b,
+    ">": lambda a, b: a > b,
+    "<": lambda a, b: a < b,
+    ">=": lambda a, b: a >= b,
+    "<=": lambda a, b: a <= b,
+}
+
+
+def _tokenizar(where):
+    tokens, pos = [], 0
+    where = where.strip()
+    while pos < len(where):
+        m = _TOKEN.match(where, pos)
+        if not m or m.end() == pos:
+            raise ValueError(f"WHERE no soportado cerca de: {where[pos:pos + 30]!r}")
+        pos = m.end()
+        tipo = m.lastgroup
+        texto = m.group(tipo)
+        if tipo == "ts":
+            tokens.append(("valor", _a_epoch_ms(texto[texto.index("'") + 1:-1])))
+        elif tipo == "str":
+            tokens.append(("valor", texto[1:-1].replace("''", "'")))
+        elif tipo == "num":
+            tokens.append(("valor", float(texto) if "." in texto else int(texto)))
+        elif tipo == "id" and texto.upper() in ("AND", "OR", "NOT", "BETWEEN", "IN", "IS", "NULL"):
+            tokens.append((texto.upper(), texto))
+        else:
+            tokens.append((tipo, texto))
+    return tokens
+
+
+class _ParserWhere:
+    """Descenso recursivo: or -> and -> not -> comparación."""
+
+    def __init__(self, where):
+        self.tokens = _tokenizar(where)
+        self.pos = 0
+
+    def _ver(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def _tomar(self, tipo=None):
+        token = self._ver()
+        if tipo is not None and token[0] != tipo and token[1] != tipo:
+            raise ValueError(f"Se esperaba {tipo!r} y llegó {token[1]!r}")
+        self.pos += 1
+        return token
+
+    def compilar(self):
+        predicado = self._or()
+        if self.pos != len(self.tokens):
+            raise ValueError(f"Token inesperado: {self._ver()[1]!r}")
+        return predicado
+
+    def _or(self):
+        partes = [self._and()]
+        while self._ver()[0] == "OR":
+            self._tomar()
+            partes.append(self._and())
+        return partes[0] if len(partes) == 1 else (lambda r: any(p(r) for p in partes))
+
+    def _and(self):
+        partes = [self._not()]
+        while self._ver()[0] == "AND":
+            self._tomar()
+            partes.append(self._not())
+        return partes[0] if len(partes) == 1 else (lambda r: all(p(r) for p in partes))
+
+    def _not(self):
+        if self._ver()[0] == "NOT":
+            self._tomar()
+            interno = self._not()
+            return lambda r: not interno(r)
+        if self._ver()[1] == "(":
+            self._tomar()
+            interno = self._or()
+            self._tomar(")")
+            return interno
+        return self._comparacion()
+
+    def _operando(self):
+        tipo, texto = self._tomar()
+        if tipo == "valor":
+            return lambda r, v=texto: v
+        if tipo == "id":
+            return lambda r, c=texto: r.get(c)
+        raise ValueError(f"Operando inválido: {texto!r}")
+
+    def _comparacion(self):
+        izq = self._operando()
+        tipo, texto = self._tomar()
+        if tipo == "NOT":
+            # "x NOT IN (...)" / "x NOT BETWEEN a AND b"
+            self.pos -= 2
+            self.tokens.pop(self.pos + 1)
+            interno = self._comparacion()
+            return lambda r: izq(r) is not None and not interno(r)
+        if tipo == "BETWEEN":
+            bajo = self._operando()
+            self._tomar("AND")
+            alto = self._operando()
+            return lambda r: _comparable(izq(r)) and bajo(r) <= izq(r) <= alto(r)
+        if tipo == "IN":
+            self._tomar("(")
+            valores = [self._operando()(None)]
+            while self._ver()[1] == ",":
+                self._tomar()
+                valores.append(self._operando()(None))
+            self._tomar(")")
+            conjunto = set(valores)
+            return lambda r: izq(r) in conjunto
+        if tipo == "IS":
+            negado = self._ver()[0] == "NOT"
+            if negado:
+                self._tomar()
+            self._tomar("NULL")
+            return (lambda r: izq(r) is not None) if negado else (lambda r: izq(r) is None)
+        if tipo == "op":
+            der = self._operando()
+            comparar = _COMPARADORES[texto]
+            return lambda r: _comparable(izq(r)) and comparar(izq(r), der(r))
+        raise ValueError(f"Operador no soportado: {texto!r}")
+
+
+def _comparable(valor):
+    return valor is not None
+
+
+def compilar_where(where):
+    """Cláusula WHERE -> predicado ``registro -> bool``."""
+    if not where or not where.strip():
+        return lambda r: True
+    return _ParserWhere(where).compilar()
+
+
+# --- Servidor ---
+
+class ServidorArcGIS:
+    """Servidor HTTP en un hilo de fondo que responde como la capa de denuncias.
+
+    Parameters
+    ----------
+    registros : list of dict
+        Datos servidos (ver ``generar_denuncias``).
+    max_record_count : int
+        Máximo de registros por respuesta, como el ``maxRecordCount`` del servicio.
+    latencia, latencia_por_registro : float
+        Segundos de espera fijos por petición y adicionales por registro devuelto.
+    tasa_error, tasa_html : float
+        Probabilidad de responder HTTP 503, o una página HTML de error con estado 200.
+    soporta_pbf, comprimir : bool
+        Si se acepta ``f=pbf`` y si se usa gzip cuando el cliente lo anuncia.
+    """
+
+    def __init__(self, registros, host="127.0.0.1", puerto=0, max_record_count=MAX_RECORD_COUNT,
+                 latencia=0.0, latencia_por_registro=0.0, tasa_error=0.0, tasa_html=0.0, semilla=0,
+                 soporta_pbf=True, comprimir=True):
+        self.registros = registros
+        self.por_oid = {r[OID_FIELD]: r for r in registros}
+        self.max_record_count = max_record_count
+        self.latencia = latencia
+        self.latencia_por_registro = latencia_por_registro
+        self.tasa_error = tasa_error
+        self.tasa_html = tasa_html
+        self.soporta_pbf = soporta_pbf
+        self.comprimir = comprimir
+        # (campos, geometría) -> {objectid: Feature codificado}; así el costo de
+        # codificar en Python no se mezcla con lo que se mide del cliente
+        self._features_pbf = {}
+        self._rng = random.Random(semilla)
+        self._lock = threading.Lock()
+        self._stats = self._stats_vacias()
+        self._httpd = ThreadingHTTPServer((host, puerto), self._crear_handler())
+        self._httpd.daemon_threads = True
+        self._hilo = None
+
+    @staticmethod
+    def _stats_vacias():
+        return {"peticiones": 0, "bytes_enviados": 0, "registros_servidos": 0,
+                "errores_503": 0, "errores_html": 0}
+
+    @property
+    def url_capa(self):
+        host, puerto = self._httpd.server_address[:2]
+        return f"http://{host}:{puerto}{RUTA_CAPA}"
+
+    @property
+    def url_query(self):
+        return self.url_capa + "/query"
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.detener()
+
+    def estadisticas(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def reiniciar_estadisticas(self):
+        with self._lock:
+            self._stats = self._stats_vacias()
+
+    def contar(self, where):
+        """Registros que cumplen ``where`` (el total esperado de una descarga)."""
+        predicado = compilar_where(where)
+        return sum(1 for r in self.registros if predicado(r))
+
+    def _anotar(self, **incrementos):
+        with self._lock:
+            for clave, valor in incrementos.items():
+                self._stats[clave] += valor
+
+    def _sortear_error(self):
+        with self._lock:
+            x = self._rng.random()
+        if x < self.tasa_error:
+            return "503"
+        if x < self.tasa_error + self.tasa_html:
+            return "html"
+        return None
+
+    # --- respuestas ---
+
+    def metadatos(self):
+        return {
+            "id": 0,
+            "name": "denuncias",
+            "type": "Feature Layer",
+            "geometryType": "esriGeometryPoint",
+            "objectIdField": OID_FIELD,
+            "maxRecordCount": self.max_record_count,
+            "supportedQueryFormats": "JSON, geoJSON, PBF" if self.soporta_pbf else "JSON, geoJSON",
+            "advancedQueryCapabilities": {
+                "supportsPagination": True,
+                "supportsOrderBy": True,
+                "supportsStatistics": True,
+                "supportsReturningQueryExtent": True,
+            },
+            "fields": [{"name": n, "type": t, "alias": n} for n, t in CAMPOS],
+        }
+
+    def consultar(self, params):
+        """Resuelve una consulta ``/query``; devuelve ``(cuerpo, n_registros)``.
+
+        ``cuerpo`` es un dict (JSON) o ``bytes`` para ``f=pbf``.
+        """
+        formato = params.get("f", "json").lower()
+        if formato == "pbf" and not self.soporta_pbf:
+            raise ValueError("Invalid or missing input parameters: unsupported format 'pbf'.")
+        where = params.get("where", "1=1")
+        predicado = compilar_where(where)
+
+        if params.get("objectIds"):
+            oids = [int(x) for x in params["objectIds"].split(",") if x.strip()]
+            candidatos = (self.por_oid[o] for o in oids if o in self.por_oid)
+        else:
+            candidatos = iter(self.registros)
+        filas = [r for r in candidatos if predicado(r)]
+
+        if params.get("outStatistics"):
+            return _estadisticas(filas, params), 0
+        if _es_verdadero(params.get("returnCountOnly")):
+            return {"count": len(filas)}, 0
+        if _es_verdadero(params.get("returnIdsOnly")):
+            return {"objectIdFieldName": OID_FIELD,
+                    "objectIds": sorted(r[OID_FIELD] for r in filas)}, 0
+
+        orden = params.get("orderByFields")
+        if orden and orden.strip() != "1":
+            for campo in reversed([c.strip() for c in orden.split(",")]):
+                nombre, _, sentido = campo.partition(" ")
+                filas.sort(key=lambda r: (r.get(nombre) is None, r.get(nombre)),
+                           reverse=sentido.strip().upper() == "DESC")
+
+        offset = int(params.get("resultOffset") or 0)
+        limite = min(int(params.get("resultRecordCount") or self.max_record_count), self.max_record_count)
+        pagina = filas[offset:offset + limite]
+        excedido = offset + limite < len(filas)
+
+        campos = _campos_salida(params.get("outFields", "*"))
+        con_geometria = params.get("returnGeometry", "true").lower() != "false"
+        if formato == "pbf":
+            cache = self._features_pbf.setdefault((tuple(campos), con_geometria), {})
+            cuerpo = _pbf(pagina, campos, con_geometria, excedido, cache)
+        elif formato == "geojson":
+            cuerpo = _geojson(pagina, campos, con_geometria, excedido)
+        else:
+            cuerpo = _esrijson(pagina, campos, con_geometria, excedido)
+        return cuerpo, len(pagina)
+
+    def _crear_handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _responder(self, estado, cuerpo, tipo="application/json; charset=utf-8"):
+                self.send_response(estado)
+                self.send_header("Content-Type", tipo)
+                if (servidor.comprimir and len(cuerpo) >= MIN_BYTES_GZIP
+                        and "gzip" in self.headers.get("Accept-Encoding", "")):
+                    cuerpo = gzip.compress(cuerpo, compresslevel=6)
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+                servidor._anotar(peticiones=1, bytes_enviados=len(cuerpo))
+
+            def _atender(self, params):
+                ruta = urlparse(self.path).path.rstrip("/")
+                error = servidor._sortear_error()
+                if error is not None:
+                    if servidor.latencia:
+                        time.sleep(servidor.latencia)
+                    if error == "503":
+                        servidor._anotar(errores_503=1)
+                        return self._responder(503, PAGINA_ERROR, "text/html")
+                    servidor._anotar(errores_html=1)
+                    return self._responder(200, PAGINA_ERROR, "text/html")
+
+                try:
+                    if ruta == RUTA_CAPA:
+                        cuerpo, n = servidor.metadatos(), 0
+                    elif ruta == RUTA_CAPA + "/query":
+                        cuerpo, n = servidor.consultar(params)
+                    else:
+                        return self._responder(404, b'{"error": {"code": 404, "message": "Not found"}}')
+                except (ValueError, KeyError) as exc:
+                    cuerpo, n = {"error": {"code": 400, "message": str(exc)}}, 0
+
+                espera = servidor.latencia + servidor.latencia_por_registro * n
+                if espera:
+                    time.sleep(espera)
+                servidor._anotar(registros_servidos=n)
+                if isinstance(cuerpo, bytes):
+                    return self._responder(200, cuerpo, "application/x-protobuf")
+                self._responder(200, json.dumps(cuerpo, ensure_ascii=False).encode("utf-8"))
+
+            def do_GET(self):
+                self._atender(_aplanar(parse_qs(urlparse(self.path).query)))
+
+            def do_POST(self):
+                largo = int(self.headers.get("Content-Length") or 0)
+                cuerpo = self.rfile.read(largo).decode("utf-8")
+                params = _aplanar(parse_qs(urlparse(self.path).query))
+                params.update(_aplanar(parse_qs(cuerpo)))
+                self._atender(params)
+
+        return Handler
+
+
+def _aplanar(qs):
+    return {k: v[-1] for k, v in qs.items()}
+
+
+def _es_verdadero(valor):
+    return str(valor).lower() == "true"
+
+
+def _campos_salida(out_fields):
+    if not out_fields or out_fields.strip() == "*":
+        return [n for n, _ in CAMPOS]
+    pedidos = {c.strip() for c in out_fields.split(",")}
+    return [n for n, _ in CAMPOS if n in pedidos or n == OID_FIELD]
+
+
+def _esrijson(filas, campos, con_geometria, excedido):
+    tipos = dict(CAMPOS)
+    features = []
+    for r in filas:
+        feature = {"attributes": {c: r.get(c) for c in campos}}
+        if con_geometria:
+            feature["geometry"] = {"x": r["long_hecho"], "y": r["lat_hecho"]}
+        features.append(feature)
+    cuerpo = {
+        "objectIdFieldName": OID_FIELD,
+        "geometryType": "esriGeometryPoint",
+        "spatialReference": {"wkid": 4326, "latestWkid": 4326},
+        "fields": [{"name": c, "type": tipos[c], "alias": c} for c in campos],
+        "features": features,
+    }
+    if excedido:
+        cuerpo["exceededTransferLimit"] = True
+    return cuerpo
+
+
+def _geojson(filas, campos, con_geometria, excedido):
+    features = []
+    for r in filas:
+        geometria = ({"type": "Point", "coordinates": [r["long_hecho"], r["lat_hecho"]]}
+                     if con_geometria else None)
+        features.append({"type": "Feature", "id": r[OID_FIELD], "geometry": geometria,
+                         "properties": {c: r.get(c) for c in campos}})
+    cuerpo = {"type": "FeatureCollection", "features": features}
+    if excedido:
+        cuerpo["properties"] = {"exceededTransferLimit": True}
+    return cuerpo
+
+
+_ESTADISTICAS = {
+    "count": lambda vs: sum(v is not None for v in vs),
+    "sum": lambda vs: sum(v for v in vs if v is not None),
+    "min": lambda vs: min((v for v in vs if v is not None), default=None),
+    "max": lambda vs: max((v for v in vs if v is not None), default=None),
+    "avg": lambda vs: (lambda xs: sum(xs) / len(xs) if xs else None)([v for v in vs if v is not None]),
+}
+
+
+def _estadisticas(filas, params):
+    """``outStatistics`` + ``groupByFieldsForStatistics`` -> esriJSON con una fila por grupo."""
+    estadisticas = json.loads(params["outStatistics"])
+    grupo = [c.strip() for c in (params.get("groupByFieldsForStatistics") or "").split(",") if c.strip()]
+    # Sin groupBy siempre hay una fila, aunque el filtro no devuelva registros
+    grupos = {} if grupo else {(): []}
+    for r in filas:
+        grupos.setdefault(tuple(r.get(c) for c in grupo), []).append(r)
+    features = []
+    for clave, miembros in grupos.items():
+        atributos = dict(zip(grupo, clave))
+        for e in estadisticas:
+            tipo = e["statisticType"].lower()
+            if tipo not in _ESTADISTICAS:
+                raise ValueError(f"statisticType no soportado: {tipo}")
+            nombre = e.get("outStatisticFieldName") or f"{tipo}_{e['onStatisticField']}"
+            atributos[nombre] = _ESTADISTICAS[tipo]([m.get(e["onStatisticField"]) for m in miembros])
+        features.append({"attributes": atributos})
+    return {"fields": [{"name": c} for c in grupo], "features": features}
+
+
+# --- f=pbf (esriPBuffer.FeatureCollectionPBuffer) ---
+
+def _pb_varint(n):
+    salida = bytearray()
+    while True:
+        b = n & 0x7F
+        n >>= 7
+        if n:
+            salida.append(b | 0x80)
+        else:
+            salida.append(b)
+            return bytes(salida)
+
+
+def _pb_zigzag(n):
+    return (n << 1) ^ (n >> 63)
+
+
+def _pb_campo(numero, contenido):
+    """Campo length-delimited (tipo de cable 2)."""
+    return _pb_varint(numero << 3 | 2) + _pb_varint(len(contenido)) + contenido
+
+
+def _pb_entero(numero, n):
+    return _pb_varint(numero << 3) + _pb_varint(n)
+
+
+def _pb_double(numero, x):
+    return _pb_varint(numero << 3 | 1) + struct.pack("<d", x)
+
+
+def _pb_valor(v):
+    if v is None:
+        return b""
+    if isinstance(v, bool):
+        return _pb_entero(9, int(v))
+    if isinstance(v, int):
+        return _pb_entero(6, v & 0xFFFFFFFFFFFFFFFF)
+    if isinstance(v, float):
+        return _pb_double(3, v)
+    return _pb_campo(1, str(v).encode("utf-8"))
+
+
+def _pb_feature(r, campos, con_geometria):
+    feature = b"".join(_pb_campo(1, _pb_valor(r.get(c))) for c in campos)
+    if con_geometria:
+        x = round((r["long_hecho"] - TRASLADO_PBF[0]) / ESCALA_PBF)
+        y = round((TRASLADO_PBF[1] - r["lat_hecho"]) / ESCALA_PBF)
+        coords = _pb_varint(_pb_zigzag(x)) + _pb_varint(_pb_zigzag(y))
+        feature += _pb_campo(2, _pb_campo(2, _pb_varint(1)) + _pb_campo(3, coords))
+    return _pb_campo(15, feature)
+
+
+def _pbf(filas, campos, con_geometria, excedido, cache=None):
+    tipos = dict(CAMPOS)
+    escala = _pb_double(1, ESCALA_PBF) + _pb_double(2, ESCALA_PBF)
+    traslado = _pb_double(1, TRASLADO_PBF[0]) + _pb_double(2, TRASLADO_PBF[1])
+    partes = [
+        _pb_campo(1, OID_FIELD.encode("utf-8")),
+        _pb_entero(7, 0),  # esriGeometryTypePoint
+        _pb_campo(8, _pb_entero(1, 4326) + _pb_entero(2, 4326)),
+        _pb_entero(9, int(excedido)),
+        _pb_campo(12, _pb_entero(1, 0) + _pb_campo(2, escala) + _pb_campo(3, traslado)),
+    ]
+    for c in campos:
+        partes.append(_pb_campo(13, _pb_campo(1, c.encode("utf-8")) + _pb_entero(2, TIPOS_PBF[tipos[c]])))
+    for r in filas:
+        if cache is None:
+            partes.append(_pb_feature(r, campos, con_geometria))
+            continue
+        feature = cache.get(r[OID_FIELD])
+        if feature is None:
+            feature = cache[r[OID_FIELD]] = _pb_feature(r, campos, con_geometria)
+        partes.append(feature)
+    resultado = _pb_campo(1, b"".join(partes))
+    return _pb_campo(2, resultado)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor ArcGIS local con denuncias sintéticas.")
+    parser.add_argument("--registros", type=int, default=20000)
+    parser.add_argument("--desde", default="2020-01-01")
+    parser.add_argument("--hasta", default="2020-06-30 23:59:59")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--max-record-count", type=int, default=MAX_RECORD_COUNT)
+    parser.add_argument("--latencia", type=float, default=0.0, help="Segundos fijos por petición")
+    parser.add_argument("--latencia-por-registro", type=float, default=0.0)
+    parser.add_argument("--tasa-error", type=float, default=0.0, help="Probabilidad de HTTP 503")
+    parser.add_argument("--tasa-html", type=float, default=0.0, help="Probabilidad de página HTML de error")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--sin-pbf", action="store_true", help="Rechaza f=pbf, como un servidor antiguo")
+    parser.add_argument("--sin-gzip", action="store_true", help="No comprime las respuestas")
+    args = parser.parse_args(argv)
+
+    registros = generar_denuncias(args.registros, args.desde, args.hasta, args.semilla)
+    servidor = ServidorArcGIS(
+        registros, host=args.host, puerto=args.puerto, max_record_count=args.max_record_count,
+        latencia=args.latencia, latencia_por_registro=args.latencia_por_registro,
+        tasa_error=args.tasa_error, tasa_html=args.tasa_html, semilla=args.semilla,
+        soporta_pbf=not args.sin_pbf, comprimir=not args.sin_gzip,
+    )
+    print(f"Sirviendo {len(registros)} denuncias sintéticas en {servidor.url_query}", flush=True)
+    print("Ctrl+C para detener.", flush=True)
+    try:
+        servidor._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""Modo de agregados: conteos calculados por el servidor con ``outStatistics``.
+
+Las visualizaciones de conteos (``vis_04``-``vis_08``, ``visualizar_denuncias.py``)
+solo necesitan cuántas denuncias hay por departamento, distrito, tipo o turno.
+En lugar de descargar millones de filas para agruparlas en pandas, aquí se
+pide al servicio ``outStatistics`` + ``groupByFieldsForStatistics``: cada
+respuesta trae una fila por grupo.
+
+Las consultas se reparten por semestre, igual que la descarga cruda (así
+ninguna respuesta se acerca al ``maxRecordCount``), se lanzan en paralelo con
+el limitador de tasa compartido y los conteos parciales se suman. Cada tabla
+se guarda en ``data/3. processed/agregados/<nombre>.csv``, con el filtro con
+que se calculó al lado (``<nombre>.json``).
+
+Los gráficos también pueden contar el archivo procesado del EDA, que ya no
+tiene las filas con coordenadas fuera de Perú (paso 09). Para que las dos
+fuentes cuenten lo mismo, el servidor aplica ese recorte en el ``where``
+(``WHERE_COORDENADAS``, sobre ``lat_hecho``/``long_hecho``, que el EDA usa
+como ``lat``/``lon``); una tabla calculada con otro filtro no se usa. La
+tabla que devuelve ``conteos`` lleva su fuente en ``attrs["fuente"]`` y los
+gráficos la muestran.
+
+Uso:
+    python src/data_collection/agregados.py
+    python src/data_collection/agregados.py --tablas lima_callao_por_turno --desde 2024 --hasta 2025
+"""
+import os
+import sys
+import json
+import argparse
+import concurrent.futures
+
+import requests
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from data_collection import ingesta
+from data_collection.limites import LimitadorTasa, PoliticaReintentos, TASA_DEFECTO
+from data_collection.parseo import decodificar
+from eda.etapas import LAT_MAX, LAT_MIN, LON_MAX, LON_MIN
+from eda.tablas import leer_tabla
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+AGREGADOS_DIR = os.path.join(BASE_DIR, 'data', '3. processed', 'agregados')
+
+CAMPO_CONTEO = "conteo"
+CAMPO_OID = "objectid"
+WHERE_LIMA_CALLAO = "provincia_hecho IN ('LIMA', 'CALLAO')"
+# El recorte del paso 09 del EDA (filtrar_atipicos): se cuentan las mismas filas que en el archivo procesado
+WHERE_COORDENADAS = (f"lat_hecho BETWEEN {LAT_MIN} AND {LAT_MAX} "
+                     f"AND long_hecho BETWEEN {LON_MIN} AND {LON_MAX}")
+FUENTE_SERVIDOR = "conteos del servidor (outStatistics), coordenadas dentro de Perú"
+
+# Tabla -> (campos de agrupación, filtro adicional). Una por gráfico de conteos.
+TABLAS = {
+    "por_departamento": (["departamento_hecho"], None),                           # visualizar_denuncias.py
+    "lima_callao_por_turno": (["turno_hecho"], WHERE_LIMA_CALLAO),                 # vis_04
+    "lima_callao_por_tipo": (["tipo_hecho"], WHERE_LIMA_CALLAO),                   # vis_05
+    "lima_callao_por_materia": (["materia_hecho"], WHERE_LIMA_CALLAO),             # vis_06
+    "lima_callao_por_tipo_turno": (["tipo_hecho", "turno_hecho"], WHERE_LIMA_CALLAO),  # vis_07
+    "lima_callao_por_distrito": (["distrito_hecho"], WHERE_LIMA_CALLAO),           # vis_08
+}
+
+
+def ruta_tabla(nombre, directorio=AGREGADOS_DIR):
+    return os.path.join(directorio, f"{nombre}.csv")
+
+
+def ruta_meta(nombre, directorio=AGREGADOS_DIR):
+    return os.path.join(directorio, f"{nombre}.json")
+
+
+def where_tabla(nombre, where_particion):
+    """Filtro de una consulta: la partición, el recorte de coordenadas y el filtro propio de la tabla."""
+    _, filtro = TABLAS[nombre]
+    partes = [where_particion, f"({WHERE_COORDENADAS})"] + ([f"({filtro})"] if filtro else [])
+    return " AND ".join(partes)
+
+
+def _filtro_guardado(nombre, directorio):
+    try:
+        with open(ruta_meta(nombre, directorio), encoding="utf-8") as f:
+            return json.load(f).get("coordenadas")
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def form_estadisticas(where_clause, campos):
+    estadisticas = [{"statisticType": "count", "onStatisticField": CAMPO_OID,
+                     "outStatisticFieldName": CAMPO_CONTEO}]
+    return {
+        "where": where_clause,
+        "outStatistics": json.dumps(estadisticas),
+        "groupByFieldsForStatistics": ",".join(campos),
+        "f": "json",
+    }
+
+
+def consultar_estadisticas(session, where_clause, campos):
+    """Conteo por grupo para un filtro -> DataFrame ``campos + [conteo]``."""
+    r = session.post(ingesta.BASE_QUERY_URL, data=form_estadisticas(where_clause, campos),
+                     timeout=ingesta.TIMEOUT, verify=False)
+    r.raise_for_status()
+    j = decodificar(r.content)
+    if "error" in j:
+        raise RuntimeError(f"Error de la API: {j['error']}")
+    if j.get("exceededTransferLimit"):
+        raise RuntimeError(f"Demasiados grupos para una respuesta ({where_clause}); use particiones menores")
+    filas = [f.get("attributes", {}) for f in j.get("features", [])]
+    df = pd.DataFrame(filas)
+    # Algunos servidores devuelven los alias en mayúsculas
+    df = df.rename(columns={c: c.lower() for c in df.columns})
+    if df.empty:
+        return pd.DataFrame(columns=campos + [CAMPO_CONTEO])
+    return df[campos + [CAMPO_CONTEO]]
+
+
+def sumar_parciales(parciales, campos):
+    """Suma los conteos de varias particiones por grupo, de mayor a menor."""
+    parciales = [p for p in parciales if not p.empty]
+    if not parciales:
+        return pd.DataFrame(columns=campos + [CAMPO_CONTEO])
+    total = pd.concat(parciales, ignore_index=True)
+    total[CAMPO_CONTEO] = total[CAMPO_CONTEO].astype("int64")
+    total = total.groupby(campos, dropna=False, as_index=False)[CAMPO_CONTEO].sum()
+    return total.sort_values(CAMPO_CONTEO, ascending=False, ignore_index=True)
+
+
+def descargar_agregados(tablas=None, desde=ingesta.ANIOS_DEFECTO[0], hasta=ingesta.ANIOS_DEFECTO[-1],
+                        out_dir=AGREGADOS_DIR, max_concurrencia=ingesta.MAX_CONCURRENCIA,
+                        tasa=TASA_DEFECTO, estado_limitador=None):
+    """Calcula en el servidor las tablas pedidas y las guarda como CSV.
+
+    Devuelve ``{nombre: DataFrame}``; una tabla con alguna partición fallida
+    no se escribe (queda la versión anterior, si la hay).
+    """
+    tablas = tablas or list(TABLAS)
+    particiones = ingesta.periodos_entre(desde, hasta)
+    limitador = LimitadorTasa(tasa, ruta_estado=estado_limitador)
+    reintentos = PoliticaReintentos(ingesta.MAX_REINTENTOS, base=ingesta.BACKOFF_BASE)
+    session = ingesta.crear_sesion(max_concurrencia)
+
+    def consultar(where, campos):
+        def _consultar():
+            limitador.adquirir()
+            return consultar_estadisticas(session, where, campos)
+        return reintentos.ejecutar(_consultar)
+
+    os.makedirs(out_dir, exist_ok=True)
+    resultados = {}
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrencia) as executor:
+            futuros = {}
+            for nombre in tablas:
+                campos, _ = TABLAS[nombre]
+                for particion in particiones:
+                    where = where_tabla(nombre, particion.where)
+                    futuros[executor.submit(consultar, where, campos)] = (nombre, particion.etiqueta)
+
+            parciales = {nombre: [] for nombre in tablas}
+            fallidas = set()
+            for futuro in concurrent.futures.as_completed(futuros):
+                nombre, etiqueta = futuros[futuro]
+                try:
+                    parciales[nombre].append(futuro.result())
+                except Exception as exc:
+                    fallidas.add(nombre)
+                    print(f"[{nombre}] La partición {etiqueta} falló: {exc}", flush=True)
+    finally:
+        session.close()
+
+    for nombre in tablas:
+        if nombre in fallidas:
+            print(f"[{nombre}] No se guardó: hay particiones fallidas.", flush=True)
+            continue
+        campos, _ = TABLAS[nombre]
+        tabla = sumar_parciales(parciales[nombre], campos)
+        tabla.to_csv(ruta_tabla(nombre, out_dir), index=False, encoding="utf-8")
+        with open(ruta_meta(nombre, out_dir), "w", encoding="utf-8") as f:
+            json.dump({"coordenadas": WHERE_COORDENADAS, "desde": desde, "hasta": hasta}, f, ensure_ascii=False)
+        resultados[nombre] = tabla
+        print(f"[{nombre}] Guardado: {ruta_tabla(nombre, out_dir)} "
+              f"({len(tabla)} grupos, {tabla[CAMPO_CONTEO].sum():,} denuncias)", flush=True)
+    return resultados
+
+
+def conteos(nombre, respaldo=None, directorio=AGREGADOS_DIR):
+    """Tabla de conteos para un gráfico: ``campos + [conteo]``.
+
+    Usa la tabla de agregados si existe, se calculó con el recorte de
+    coordenadas actual y no es más antigua que ``respaldo``; si no, cuenta
+    las filas del archivo procesado con ``eda.tablas.leer_tabla`` (solo
+    ``campos``, con las categorías congeladas). Como con ``value_counts``, los grupos
+    con valores nulos no se incluyen. La fuente usada queda en
+    ``tabla.attrs["fuente"]``.
+    """
+    campos, _ = TABLAS[nombre]
+    ruta = ruta_tabla(nombre, directorio)
+    if os.path.exists(ruta) and (respaldo is None or not os.path.exists(respaldo)
+                                 or os.path.getmtime(ruta) >= os.path.getmtime(respaldo)):
+        if _filtro_guardado(nombre, directorio) == WHERE_COORDENADAS:
+            print(f"Usando agregados del servidor: {ruta}")
+            tabla = pd.read_csv(ruta).dropna(subset=campos).reset_index(drop=True)
+            tabla.attrs["fuente"] = FUENTE_SERVIDOR
+            return tabla
+        print(f"Los agregados de {ruta} no tienen el recorte de coordenadas del EDA: "
+              f"vuelva a ejecutar agregados.py. Se cuenta el archivo procesado.")
+    if respaldo is None:
+        raise FileNotFoundError(ruta)
+    df = leer_tabla(respaldo, columns=campos)
+    # observed: con columnas categóricas, solo las combinaciones que aparecen
+    tabla = df.groupby(campos, as_index=False, observed=True).size().rename(columns={"size": CAMPO_CONTEO})
+    tabla = tabla.sort_values(CAMPO_CONTEO, ascending=False, ignore_index=True)
+    tabla.attrs["fuente"] = f"{os.path.basename(respaldo)} (EDA)"
+    return tabla
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Conteos agregados en el servidor (outStatistics) para los gráficos.")
+    parser.add_argument("--tablas", nargs="+", choices=list(TABLAS), help="Por defecto, todas")
+    parser.add_argument("--desde", type=int, default=ingesta.ANIOS_DEFECTO[0])
+    parser.add_argument("--hasta", type=int, default=ingesta.ANIOS_DEFECTO[-1])
+    parser.add_argument("--out-dir", default=AGREGADOS_DIR)
+    parser.add_argument("--max-concurrencia", type=int, default=ingesta.MAX_CONCURRENCIA)
+    parser.add_argument("--tasa", type=float, default=TASA_DEFECTO,
+                        help="Peticiones por segundo máximas (sumando todos los workers)")
+    parser.add_argument("--estado-limitador",
+                        help="Archivo para compartir el limitador entre procesos (o $INGESTA_LIMITADOR)")
+    args = parser.parse_args(argv)
+
+    requests.packages.urllib3.disable_warnings(requests.packages.urllib3.exceptions.InsecureRequestWarning)
+    return descargar_agregados(args.tablas, args.desde, args.hasta, args.out_dir,
+                               args.max_concurrencia, args.tasa, args.estado_limitador)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Caché en disco de respuestas HTTP de la ingesta, direccionada por contenido.
+
+La clave de cada respuesta es el hash de la URL y del cuerpo del formulario
+enviado, así que pedir el mismo lote de objectIds dos veces devuelve el mismo
+archivo. El tamaño total se acota con desalojo LRU: la fecha de modificación
+del archivo marca cuándo se guardó (para el TTL) y la de acceso, cuándo se
+usó por última vez (para el LRU).
+
+Solo se guardan respuestas ya parseadas con éxito; una página de error o un
+JSON con ``error`` nunca llega a la caché.
+"""
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+CACHE_SUBDIR = "_cache"
+# Tamaño máximo por defecto de la caché (bytes)
+MAX_BYTES_DEFECTO = 2 * 1024 ** 3
+
+
+def clave(url, data):
+    """Hash de la petición: URL + formulario con los campos ordenados."""
+    cuerpo = urlencode(sorted((k, str(v)) for k, v in data.items()))
+    return hashlib.sha256(f"{url}\n{cuerpo}".encode("utf-8")).hexdigest()
+
+
+class CacheRespuestas:
+    """Caché LRU en disco, segura entre hilos.
+
+    Parameters
+    ----------
+    directorio : str
+        Carpeta de la caché (se crea si no existe).
+    max_bytes : int
+        Al superarse, se eliminan las respuestas usadas hace más tiempo.
+    """
+
+    def __init__(self, directorio, max_bytes=MAX_BYTES_DEFECTO):
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self.aciertos = 0
+        self.fallos = 0
+        self._lock = threading.Lock()
+        self._indice = OrderedDict()  # clave -> bytes, del menos al más recientemente usado
+        self._total = 0
+        os.makedirs(directorio, exist_ok=True)
+        self._cargar_indice()
+
+    def _ruta(self, k):
+        return os.path.join(self.directorio, k[:2], k)
+
+    def _cargar_indice(self):
+        entradas = []
+        for raiz, _, archivos in os.walk(self.directorio):
+            for nombre in archivos:
+                if nombre.endswith(".tmp"):
+                    continue
+                st = os.stat(os.path.join(raiz, nombre))
+                entradas.append((st.st_atime, nombre, st.st_size))
+        for _, k, tamano in sorted(entradas):
+            self._indice[k] = tamano
+            self._total += tamano
+        with self._lock:
+            self._recortar()
+
+    @property
+    def total_bytes(self):
+        return self._total
+
+    def leer(self, url, data, ttl=None):
+        """Contenido guardado para la petición, o ``None``.
+
+        ``ttl`` en segundos: ``None`` no caduca y ``0`` desactiva la caché
+        para esta lectura. Las entradas caducadas se descartan.
+        """
+        if ttl == 0:
+            return None
+        k = clave(url, data)
+        ruta = self._ruta(k)
+        with self._lock:
+            if k not in self._indice:
+                self.fallos += 1
+                return None
+            try:
+                st = os.stat(ruta)
+                if ttl is not None and time.time() - st.st_mtime > ttl:
+                    self._eliminar(k)
+                    self.fallos += 1
+                    return None
+                with open(ruta, "rb") as f:
+                    contenido = f.read()
+                os.utime(ruta, (time.time(), st.st_mtime))
+            except FileNotFoundError:
+                self._indice.pop(k, None)
+                self.fallos += 1
+                return None
+            self._indice.move_to_end(k)
+            self.aciertos += 1
+            return contenido
+
+    def guardar(self, url, data, contenido):
+        k = clave(url, data)
+        ruta = self._ruta(k)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        ruta_tmp = f"{ruta}.{threading.get_ident()}.tmp"
+        with open(ruta_tmp, "wb") as f:
+            f.write(contenido)
+        os.replace(ruta_tmp, ruta)
+        with self._lock:
+            self._total += len(contenido) - self._indice.pop(k, 0)
+            self._indice[k] = len(contenido)
+            self._recortar()
+
+    def _recortar(self):
+        """Desaloja las entradas menos usadas hasta volver a ``max_bytes``."""
+        while self._total > self.max_bytes and len(self._indice) > 1:
+            self._eliminar(next(iter(self._indice)))
+
+    def _eliminar(self, k):
+        self._total -= self._indice.pop(k, 0)
+        try:
+            os.remove(self._ruta(k))
+        except FileNotFoundError:
+            pass
+
+    def __repr__(self):
+        return (f"CacheRespuestas({self.directorio!r}, {len(self._indice)} entradas, "
+                f"{self._total / 1024 ** 2:.1f} MB, aciertos={self.aciertos}, fallos={self.fallos})")
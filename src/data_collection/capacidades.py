@@ -0,0 +1,130 @@
+"""Capacidades de la capa ArcGIS (``MapServer/0?f=json``), sondeadas una vez y guardadas en disco.
+
+Los metadatos de la capa dicen de antemano lo que antes se averiguaba a
+fuerza de errores: el ``maxRecordCount`` (tope real de registros por
+respuesta, también al pedir por objectIds), los formatos que acepta
+``/query``, si pagina con ``resultOffset`` y el esquema de campos. Con eso,
+cada lote sale directamente con el mejor formato soportado y un tamaño que
+el servidor no va a truncar.
+
+El sondeo se guarda en un JSON por URL de capa y se reutiliza mientras no
+supere ``TTL_CAPACIDADES``.
+"""
+import os
+import json
+import time
+
+ARCHIVO_CAPACIDADES = "_capacidades.json"
+# Segundos que vale un sondeo guardado
+TTL_CAPACIDADES = 7 * 24 * 3600
+
+
+def url_capa(url_query):
+    """``.../MapServer/0/query`` -> ``.../MapServer/0``."""
+    url = url_query.rstrip("/")
+    return url[:-len("/query")] if url.endswith("/query") else url
+
+
+class CapacidadesCapa:
+    """Lo que la ingesta necesita saber de la capa."""
+
+    def __init__(self, max_record_count=None, formatos=None, paginacion=False, campos=None,
+                 oid_field="objectid", consultado=None):
+        self.max_record_count = max_record_count
+        self.formatos = set(formatos or ())
+        self.paginacion = paginacion
+        self.campos = dict(campos or {})
+        self.oid_field = oid_field
+        self.consultado = consultado if consultado is not None else time.time()
+
+    @classmethod
+    def desde_metadatos(cls, meta):
+        if "error" in meta:
+            raise RuntimeError(f"Metadatos de la capa con error: {meta['error']}")
+        formatos = {f.strip().lower() for f in (meta.get("supportedQueryFormats") or "").split(",") if f.strip()}
+        avanzadas = meta.get("advancedQueryCapabilities") or {}
+        return cls(
+            max_record_count=meta.get("maxRecordCount"),
+            formatos=formatos,
+            paginacion=bool(avanzadas.get("supportsPagination")),
+            campos={c["name"]: c.get("type") for c in meta.get("fields") or [] if "name" in c},
+            oid_field=meta.get("objectIdField") or meta.get("objectIdFieldName") or "objectid",
+        )
+
+    def a_dict(self):
+        return {
+            "max_record_count": self.max_record_count,
+            "formatos": sorted(self.formatos),
+            "paginacion": self.paginacion,
+            "campos": self.campos,
+            "oid_field": self.oid_field,
+            "consultado": self.consultado,
+        }
+
+    def soporta(self, formato):
+        """Sin ``supportedQueryFormats`` en los metadatos no se descarta ningún formato."""
+        return not self.formatos or formato.lower() in self.formatos
+
+    def tope_lote(self, maximo):
+        """``maximo`` acotado por el ``maxRecordCount`` de la capa."""
+        return min(maximo, self.max_record_count) if self.max_record_count else maximo
+
+    def filtrar_out_fields(self, out_fields):
+        """Quita de ``out_fields`` los campos que la capa no tiene; devuelve ``(out_fields, descartados)``.
+
+        Un campo inexistente hace que el servidor rechace cada petición.
+        """
+        if out_fields == "*" or not self.campos:
+            return out_fields, []
+        existentes = {c.lower() for c in self.campos}
+        pedidos = [c for c in out_fields.split(",") if c]
+        descartados = [c for c in pedidos if c.lower() not in existentes]
+        return ",".join(c for c in pedidos if c not in descartados), descartados
+
+    def __repr__(self):
+        return (f"CapacidadesCapa(maxRecordCount={self.max_record_count}, "
+                f"formatos={sorted(self.formatos)}, paginacion={self.paginacion}, campos={len(self.campos)})")
+
+
+def _leer(ruta):
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _guardar(ruta, guardadas):
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    tmp = f"{ruta}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(guardadas, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, ruta)
+
+
+def sondear(session, url_query, timeout=60):
+    """Pide los metadatos de la capa y devuelve sus ``CapacidadesCapa``."""
+    r = session.post(url_capa(url_query), data={"f": "json"}, timeout=timeout, verify=False)
+    r.raise_for_status()
+    return CapacidadesCapa.desde_metadatos(r.json())
+
+
+def obtener_capacidades(session, url_query, ruta=None, ttl=TTL_CAPACIDADES, timeout=60, sondeo=None):
+    """Capacidades de la capa: las guardadas en ``ruta`` si siguen vigentes, o un sondeo nuevo.
+
+    ``ttl`` en segundos; ``None`` no caduca y ``0`` fuerza el sondeo.
+    ``sondeo`` reemplaza a ``sondear`` (p. ej. para pasarlo por el limitador
+    de tasa y los reintentos del llamador); recibe ``(session, url_query, timeout)``.
+    """
+    clave = url_capa(url_query)
+    guardadas = _leer(ruta) if ruta else {}
+    previa = guardadas.get(clave)
+    if previa and (ttl is None or time.time() - previa.get("consultado", 0) <= ttl):
+        return CapacidadesCapa(**previa)
+
+    capacidades = (sondeo or sondear)(session, url_query, timeout)
+    if ruta:
+        guardadas = _leer(ruta)
+        guardadas[clave] = capacidades.a_dict()
+        _guardar(ruta, guardadas)
+    return capacidades
@@ -0,0 +1,197 @@
+"""Checkpoint reanudable de la descarga por lotes de objectIds.
+
+Cada partición tiene su propio directorio con:
+
+- ``particion.json``: la cláusula WHERE y los ``outFields`` que generaron el checkpoint.
+- ``manifest.jsonl``: una línea por lote completado (rango de objectIds,
+  archivo parcial y filas). Es append-only, así que un corte a mitad de la
+  ejecución deja, como mucho, una línea incompleta que se ignora al leer.
+- ``lote_<inicio>_<fin>.csv``: las filas ya normalizadas de cada lote.
+
+Los rangos completados se guardan como intervalos de objectId y no como
+índices de lote, de modo que al reanudar se puede usar un tamaño de lote
+distinto sin perder lo ya descargado.
+
+``CheckpointTramos`` usa el mismo manifiesto para la descarga por cursores
+keyset (``programador.py``): cada línea es una página, con el intervalo de
+claves ``(ms, objectid)`` que cubre.
+"""
+import os
+import json
+import shutil
+import bisect
+import threading
+
+from data_collection.escritura import escribir_parte
+
+MANIFEST = "manifest.jsonl"
+META = "particion.json"
+
+
+class _Manifiesto:
+    """Directorio de parciales con su ``particion.json`` y su ``manifest.jsonl``."""
+
+    def __init__(self, directorio, where, out_fields="*"):
+        self.directorio = directorio
+        self.where = where
+        self.out_fields = out_fields
+        self._lock = threading.Lock()
+        self._vaciar()
+        os.makedirs(directorio, exist_ok=True)
+        self._validar_particion()
+        self._cargar()
+
+    @property
+    def _ruta_manifest(self):
+        return os.path.join(self.directorio, MANIFEST)
+
+    def _validar_particion(self):
+        """Descarta el checkpoint si fue creado con otro WHERE u otros campos."""
+        ruta_meta = os.path.join(self.directorio, META)
+        if os.path.exists(ruta_meta):
+            with open(ruta_meta, encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("where") == self.where and meta.get("out_fields", "*") == self.out_fields:
+                return
+            self.limpiar()
+            os.makedirs(self.directorio, exist_ok=True)
+        with open(ruta_meta, "w", encoding="utf-8") as f:
+            json.dump({"where": self.where, "out_fields": self.out_fields}, f, ensure_ascii=False)
+
+    def _cargar(self):
+        if not os.path.exists(self._ruta_manifest):
+            return
+        with open(self._ruta_manifest, encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    entrada = json.loads(linea)
+                except json.JSONDecodeError:
+                    continue  # línea truncada por un corte abrupto
+                archivo = entrada.get("archivo")
+                if archivo and not os.path.exists(os.path.join(self.directorio, archivo)):
+                    continue  # el parcial se perdió: el lote se vuelve a descargar
+                self._registrar(entrada)
+
+    def _anotar(self, entrada):
+        with self._lock:
+            with open(self._ruta_manifest, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entrada) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._registrar(entrada)
+
+    def limpiar(self):
+        shutil.rmtree(self.directorio, ignore_errors=True)
+        self._vaciar()
+
+
+class Checkpoint(_Manifiesto):
+    """Manifiesto de lotes completados para una partición."""
+
+    def _vaciar(self):
+        self._rangos = []
+        self._inicios = []   # intervalos cubiertos, fusionados y ordenados
+        self._fines = []
+
+    def _registrar(self, entrada):
+        self._rangos.append(entrada)
+        inicio, fin = entrada["inicio"], entrada["fin"]
+        # Un lote reanudado puede abarcar intervalos ya cubiertos: se fusionan
+        izq = bisect.bisect_left(self._fines, inicio)
+        der = bisect.bisect_right(self._inicios, fin)
+        if izq < der:
+            inicio = min(inicio, self._inicios[izq])
+            fin = max(fin, self._fines[der - 1])
+        self._inicios[izq:der] = [inicio]
+        self._fines[izq:der] = [fin]
+
+    def _cubierto(self, oid):
+        pos = bisect.bisect_right(self._inicios, oid) - 1
+        return pos >= 0 and oid <= self._fines[pos]
+
+    @property
+    def lotes_completados(self):
+        return len(self._rangos)
+
+    def pendientes(self, oids):
+        """Filtra los objectIds que todavía no pertenecen a ningún lote completado."""
+        if not self._rangos:
+            return list(oids)
+        return [oid for oid in oids if not self._cubierto(oid)]
+
+    def guardar_lote(self, id_chunk, df):
+        """Persiste el parcial de un lote y lo anota en el manifiesto."""
+        inicio, fin = int(id_chunk[0]), int(id_chunk[-1])
+        archivo = None
+        if df is not None and not df.empty:
+            archivo = f"lote_{inicio}_{fin}.csv"
+            escribir_parte(df, os.path.join(self.directorio, archivo))
+        self._anotar({"inicio": inicio, "fin": fin, "archivo": archivo,
+                      "filas": 0 if df is None else len(df)})
+
+    def archivos_parciales(self):
+        """Pares ``(ruta, filas)`` de los parciales en orden de objectId."""
+        rangos = sorted(self._rangos, key=lambda r: r["inicio"])
+        return [(os.path.join(self.directorio, r["archivo"]), r["filas"]) for r in rangos if r["archivo"]]
+
+    @property
+    def max_oid(self):
+        """Mayor objectId cubierto por los lotes completados."""
+        return self._fines[-1] if self._fines else None
+
+
+class CheckpointTramos(_Manifiesto):
+    """Manifiesto de páginas completadas de un periodo recorrido con cursores keyset.
+
+    Cada página cubre las claves ``(ms, objectid)`` del intervalo
+    ``(desde, hasta]``: ``desde`` es la clave del cursor antes de pedirla
+    (``(ini, -1)`` al empezar un tramo en ``ini``) y ``hasta``, la última
+    clave recibida. Al reanudar, los huecos entre intervalos son los tramos
+    que faltan, sea cual sea el reparto de tramos de la ejecución anterior.
+    """
+
+    def _vaciar(self):
+        self._paginas = []
+
+    def _registrar(self, entrada):
+        self._paginas.append(entrada)
+
+    @property
+    def paginas_completadas(self):
+        return len(self._paginas)
+
+    @property
+    def filas(self):
+        return sum(p["filas"] for p in self._paginas)
+
+    def guardar_pagina(self, desde, hasta, df, archivo):
+        """Persiste el parcial de una página (si trae filas) y la anota en el manifiesto."""
+        if df.empty:
+            archivo = None
+        else:
+            escribir_parte(df, os.path.join(self.directorio, archivo))
+        self._anotar({"desde": list(desde), "hasta": list(hasta), "archivo": archivo, "filas": len(df)})
+        return len(df)
+
+    def huecos(self, desde_ms, hasta_ms):
+        """Tramos ``(clave, fin, incluye_fin)`` de ``[desde_ms, hasta_ms]`` sin página que los cubra.
+
+        ``clave`` es la clave ya cubierta desde la que sigue el cursor. El
+        último hueco (hasta ``hasta_ms``) se devuelve siempre: el manifiesto
+        no sabe si el tramo que lo cubría llegó a su página vacía.
+        """
+        cursor = (desde_ms, -1)
+        huecos = []
+        for desde, hasta in sorted((tuple(p["desde"]), tuple(p["hasta"])) for p in self._paginas):
+            if desde > cursor:
+                # Un tramo empieza en un segundo entero, (ms, -1); una clave real
+                # solo aparece si se perdió el parcial de la página anterior
+                huecos.append((cursor, desde[0], desde[1] >= 0))
+            cursor = max(cursor, hasta)
+        huecos.append((cursor, hasta_ms, True))
+        return huecos
+
+    def archivos_parciales(self):
+        """Pares ``(ruta, filas)`` de los parciales en orden de clave."""
+        paginas = sorted(self._paginas, key=lambda p: p["desde"])
+        return [(os.path.join(self.directorio, p["archivo"]), p["filas"]) for p in paginas if p["archivo"]]
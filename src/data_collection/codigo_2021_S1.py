@@ -1,10 +1,16 @@
 import os
+import sys
 import unicodedata
 import requests
 import pandas as pd
 import geopandas as gpd
 from shapely.geometry import Point
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from data_collection.cursores import descargar_por_cursores
+from data_collection.fechas import derivar_campos_fecha
+from data_collection.limites import LimitadorTasa, PoliticaReintentos
+
 BASE_QUERY_URL = "https://seguridadciudadana.mininter.gob.pe/arcgis/rest/services/servicios_ogc/denuncias/MapServer/0/query"
 
 OUT_DIR = r"C:\Users\Tekim\Desktop\WebScrap\data"
@@ -12,8 +18,14 @@ OUT_CSV = os.path.join(OUT_DIR, "denuncias_2021_S1.csv")
 
 OUT_FIELDS = "*"
 PAGE_SIZE = 1000
+# Cursores keyset simultáneos por periodo
+N_CURSORES = 4
 TIMEOUT = 60
 
+# Limitador compartido con los demás scripts si ejecutar_todos.py define INGESTA_LIMITADOR
+LIMITADOR = LimitadorTasa()
+REINTENTOS = PoliticaReintentos()
+
 
 def normalize_name(s: str) -> str:
     if not isinstance(s, str):
@@ -56,6 +68,7 @@ def fetch_page(session, where_clause, order_by="1", use_geojson_first=True):
     }
     if use_geojson_first:
         try:
+            LIMITADOR.adquirir()
             r = session.get(BASE_QUERY_URL, params=params, timeout=TIMEOUT, verify=False)
             r.raise_for_status()
             txt = r.text.strip()
@@ -68,6 +81,7 @@ def fetch_page(session, where_clause, order_by="1", use_geojson_first=True):
 
     # Fallback a JSON
     params["f"] = "json"
+    LIMITADOR.adquirir()
     r = session.get(BASE_QUERY_URL, params=params, timeout=TIMEOUT, verify=False)
     r.raise_for_status()
     data = r.json()
@@ -82,46 +96,24 @@ def fetch_page(session, where_clause, order_by="1", use_geojson_first=True):
 def fetch_all():
     """
     Descarga todos los registros para 2021 Semestre 1,
-    iterando por fecha para superar el límite de registros del servidor.
+    con N_CURSORES cursores keyset sobre (fecha_hora_hecho, objectid) en
+    paralelo: los empates de fecha no cortan la paginación (ver cursores.py).
     """
     session = requests.Session()
-    all_pages = []
 
     start_date = pd.to_datetime("2021-01-01 00:00:00+00:00")
     end_date = pd.to_datetime("2021-06-30 23:59:59+00:00")
-    last_timestamp_ms = int(start_date.timestamp() * 1000)
+    start_timestamp_ms = int(start_date.timestamp() * 1000)
     end_timestamp_ms = int(end_date.timestamp() * 1000)
 
     print(f"[2021-S1] Iniciando descarga desde: {start_date.strftime('%Y-%m-%d')} hasta: {end_date.strftime('%Y-%m-%d')}", flush=True)
 
-    while last_timestamp_ms <= end_timestamp_ms:
-        last_date_str = pd.to_datetime(last_timestamp_ms, unit='ms').strftime('%Y-%m-%d %H:%M:%S')
-        end_date_str = pd.to_datetime(end_timestamp_ms, unit='ms').strftime('%Y-%m-%d %H:%M:%S')
-        where_clause = f"fecha_hora_hecho > timestamp '{last_date_str}' AND fecha_hora_hecho <= timestamp '{end_date_str}'"
-        print(f"[2021-S1] Buscando registros desde {last_date_str}...", flush=True)
-
-        gdf, has_more = fetch_page(session, where_clause, order_by="fecha_hora_hecho")
-
-        if gdf.empty:
-            print(f"[2021-S1] No se encontraron más registros. Descarga completa.", flush=True)
-            break
-
-        all_pages.append(gdf)
+    def pedir_pagina(where_clause, order_by):
+        return REINTENTOS.ejecutar(fetch_page, session, where_clause, order_by=order_by)
 
-        current_max_timestamp = gdf['fecha_hora_hecho'].max()
-
-        if current_max_timestamp == last_timestamp_ms:
-            print(f"[2021-S1] No hay más registros nuevos (timestamp no avanza). Descarga completa.", flush=True)
-            break
-
-        last_timestamp_ms = current_max_timestamp
-
-        last_date_found = pd.to_datetime(last_timestamp_ms, unit='ms')
-        print(f"[2021-S1] Lote descargado. Última fecha: {last_date_found.strftime('%Y-%m-%d %H:%M:%S')}. ¿Más?: {has_more}", flush=True)
-
-        if not has_more or last_timestamp_ms >= end_timestamp_ms:
-            print(f"[2021-S1] Período completo descargado.", flush=True)
-            break
+    all_pages = descargar_por_cursores(pedir_pagina, start_timestamp_ms, end_timestamp_ms,
+                                       N_CURSORES, etiqueta="[2021-S1]")
+    print(f"[2021-S1] Período completo descargado.", flush=True)
 
     if not all_pages:
         return gpd.GeoDataFrame()
@@ -160,7 +152,7 @@ def main():
         return
 
     preferred = [
-        "fecha_hecho", "hora_hecho", "fecha_hora_hecho",
+        "fecha_hora_hecho",
         "anio_hecho", "mes_hecho", "dia_hecho",
         "departamento_hecho", "provincia_hecho", "distrito_hecho",
         "tipo_hecho", "id_tipo_hecho", "materia_hecho", "id_materia_hecho",
@@ -172,13 +164,8 @@ def main():
     df_out = pd.DataFrame(gdf[cols]).dropna(subset=["lat", "lon"])
     df_out = df_out[(df_out["lat"].between(-90, 90)) & (df_out["lon"].between(-180, 180))].copy()
 
-    # Convertir y separar fecha y hora
-    if 'fecha_hora_hecho' in df_out.columns:
-        df_out['fecha_hora_hecho'] = pd.to_datetime(df_out['fecha_hora_hecho'], unit='ms', errors='coerce')
-
-        # Crear solo fecha_hecho y hora_hecho
-        df_out['fecha_hecho'] = df_out['fecha_hora_hecho'].dt.strftime('%d/%m/%Y')
-        df_out['hora_hecho'] = df_out['fecha_hora_hecho'].dt.strftime('%H:%M:%S')
+    # Timestamp nativo + día/hora/día de la semana como enteros (sin strftime)
+    derivar_campos_fecha(df_out)
 
     df_out.to_csv(OUT_CSV, index=False, encoding="utf-8")
     print(f"[2021-S1] Guardado: {OUT_CSV} Filas: {len(df_out)}", flush=True)
@@ -0,0 +1,110 @@
+"""Paginación keyset por ``(fecha_hora_hecho, objectid)`` con cursores en paralelo.
+
+Los scripts v1 recorrían el periodo con un solo cursor sobre
+``fecha_hora_hecho > último``: una petición tras otra, y si más de una página
+de registros compartía el mismo instante, los que quedaban fuera de la página
+se perdían. Aquí el cursor avanza por la clave compuesta, así que ningún
+empate de fechas corta la paginación, y el periodo se reparte en ``N`` rangos
+de tiempo contiguos que se recorren a la vez.
+
+El módulo no hace peticiones: recibe ``pedir_pagina(where, order_by) ->
+(gdf, hay_mas)``, la ``fetch_page`` de cada script.
+"""
+import concurrent.futures
+
+import pandas as pd
+
+CAMPO_FECHA = "fecha_hora_hecho"
+CAMPO_OID = "objectid"
+ORDEN = f"{CAMPO_FECHA},{CAMPO_OID}"
+# Cursores simultáneos por defecto
+N_CURSORES = 4
+
+
+def _texto(ms):
+    return pd.to_datetime(ms, unit='ms').strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _literal(ms):
+    """Epoch en ms -> literal ``timestamp '...'``.
+
+    Con milisegundos solo si el instante los tiene: un cursor en
+    ``12:00:00.500`` escrito como ``'12:00:00'`` volvería a pedir la fila
+    en la que se quedó (su fecha es mayor que el literal).
+    """
+    ms = int(ms)
+    if ms % 1000:
+        return f"timestamp '{_texto(ms)}.{ms % 1000:03d}'"
+    return f"timestamp '{_texto(ms)}'"
+
+
+def _a_ms(valor):
+    if isinstance(valor, pd.Timestamp):
+        if valor.tzinfo is not None:
+            valor = valor.tz_convert(None)
+        return valor.value // 1_000_000
+    return int(valor)
+
+
+def rangos(desde_ms, hasta_ms, n):
+    """Parte ``[desde_ms, hasta_ms]`` en hasta ``n`` rangos contiguos ``(ini, fin, incluye_fin)``.
+
+    Los cortes caen en segundos enteros, para que los literales ``timestamp``
+    los representen exactamente.
+    """
+    if hasta_ms <= desde_ms:
+        return [(desde_ms, hasta_ms, True)]
+    paso = max(1000, (hasta_ms - desde_ms) // max(1, n) // 1000 * 1000)
+    cortes = list(range(desde_ms, hasta_ms, paso))[:n] + [hasta_ms]
+    return [(ini, fin, fin == hasta_ms) for ini, fin in zip(cortes, cortes[1:])]
+
+
+def where_rango(ini, fin, incluye_fin, clave=None):
+    """WHERE del rango ``[ini, fin)`` (o ``[ini, fin]``), a partir de la clave ``(ms, oid)`` ya vista."""
+    partes = [f"{CAMPO_FECHA} {'<=' if incluye_fin else '<'} {_literal(fin)}"]
+    if clave is None:
+        partes.insert(0, f"{CAMPO_FECHA} >= {_literal(ini)}")
+    else:
+        ms, oid = clave
+        partes.insert(0, f"({CAMPO_FECHA} > {_literal(ms)} OR "
+                         f"({CAMPO_FECHA} = {_literal(ms)} AND {CAMPO_OID} > {oid}))")
+    return " AND ".join(partes)
+
+
+def avanzar(clave, nueva):
+    """La clave del cursor tras una página; error si no pasó de ``clave`` (la paginación entraría en bucle)."""
+    if clave is not None and nueva <= clave:
+        raise RuntimeError(f"El cursor no avanza: la página terminó en ({_texto(nueva[0])}, {nueva[1]}), "
+                           f"sin pasar de ({_texto(clave[0])}, {clave[1]})")
+    return nueva
+
+
+def recorrer(pedir_pagina, ini, fin, incluye_fin=False, etiqueta=""):
+    """Un cursor: pide páginas ordenadas por ``(fecha, objectid)`` hasta agotar el rango."""
+    paginas = []
+    clave = None
+    while True:
+        gdf, hay_mas = pedir_pagina(where_rango(ini, fin, incluye_fin, clave), ORDEN)
+        if gdf.empty:
+            break
+        paginas.append(gdf)
+        ultima = gdf.sort_values([CAMPO_FECHA, CAMPO_OID]).iloc[-1]
+        clave = avanzar(clave, (_a_ms(ultima[CAMPO_FECHA]), int(ultima[CAMPO_OID])))
+        print(f"{etiqueta} Cursor {_texto(ini)}: {sum(len(p) for p in paginas)} registros, "
+              f"última fecha {_texto(clave[0])}", flush=True)
+        if not hay_mas:
+            break
+    return paginas
+
+
+def descargar_por_cursores(pedir_pagina, desde_ms, hasta_ms, n_cursores=N_CURSORES, etiqueta=""):
+    """Recorre ``[desde_ms, hasta_ms]`` con ``n_cursores`` cursores en paralelo.
+
+    Devuelve la lista de páginas (GeoDataFrames) en orden cronológico.
+    """
+    tramos = rangos(desde_ms, hasta_ms, n_cursores)
+    print(f"{etiqueta} {len(tramos)} cursores en paralelo sobre ({CAMPO_FECHA}, {CAMPO_OID})", flush=True)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(tramos)) as executor:
+        futuros = [executor.submit(recorrer, pedir_pagina, ini, fin, incluye, etiqueta)
+                   for ini, fin, incluye in tramos]
+        return [pagina for futuro in futuros for pagina in futuro.result()]
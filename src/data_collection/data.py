@@ -1,21 +1,37 @@
 import os
+import sys
+import time
 import unicodedata
 import requests
 import pandas as pd
 import geopandas as gpd
 from shapely.geometry import Point
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from data_collection.capacidades import ARCHIVO_CAPACIDADES, obtener_capacidades, sondear
+from data_collection.lotes import ControladorLote, es_error_de_capacidad
+from data_collection.limites import LimitadorTasa, PoliticaReintentos, Cortacircuitos
+from data_collection.perfiles import out_fields
+
 BASE_QUERY_URL = "https://seguridadciudadana.mininter.gob.pe/arcgis/rest/services/servicios_ogc/denuncias/MapServer/0/query"
 
 # Filtros
 WHERE = "(año_hecho = 2024 AND mes_hecho = 7 AND departamento_hecho = 'LIMA')"
 
-OUT_DIR = r"C:\Users\Tekim\Desktop\WebScrap\data"
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+OUT_DIR = os.path.join(BASE_DIR, 'data', '1. raw')
 OUT_CSV = os.path.join(OUT_DIR, "denuncias_LIMA_2024_07.csv")
 
-OUT_FIELDS = "*"
+OUT_FIELDS = out_fields()   # perfil_defecto de config/config.yaml
 TIMEOUT = 60
 BATCH_SIZE = 1000   # tamaño inicial del bloque de objectIds
+BATCH_MIN = 50
+BATCH_MAX = 2000
+
+# Limitador de tasa (compartido entre procesos si se define INGESTA_LIMITADOR)
+LIMITADOR = LimitadorTasa()
+REINTENTOS = PoliticaReintentos()
+CIRCUITO = Cortacircuitos(LIMITADOR)
 
 def normalize_name(s: str) -> str:
     if not isinstance(s, str):
@@ -42,17 +58,20 @@ def json_to_gdf(esri_json):
     gdf = gdf.set_crs(epsg=wkid or 4326, allow_override=True).to_crs(epsg=4326)
     return gdf
 
+def _sondear(*args):
+    LIMITADOR.adquirir()
+    return sondear(*args)
+
 def get_meta(session):
-    # leer metadatos del layer (POST para ser consistentes)
-    r = session.post(BASE_QUERY_URL.replace("/query", ""), data={"f": "json"}, timeout=TIMEOUT, verify=False)
-    r.raise_for_status()
-    meta = r.json()
-    oid_field = meta.get("objectIdField", meta.get("objectIdFieldName", "OBJECTID"))
-    return oid_field
+    # capacidades del layer (maxRecordCount, formatos, campos); el sondeo se
+    # guarda en OUT_DIR, por URL de la capa, y se reutiliza entre ejecuciones
+    ruta = os.path.join(OUT_DIR, ARCHIVO_CAPACIDADES)
+    return obtener_capacidades(session, BASE_QUERY_URL, ruta, timeout=TIMEOUT, sondeo=_sondear)
 
 def get_all_object_ids(session, oid_field):
     # pedir solo IDs (POST)
     data = {"where": WHERE, "returnIdsOnly": "true", "f": "json"}
+    LIMITADOR.adquirir()
     r = session.post(BASE_QUERY_URL, data=data, timeout=TIMEOUT, verify=False)
     r.raise_for_status()
     j = r.json()
@@ -67,6 +86,7 @@ def _post_geojson(session, ids_str):
         "outSR": "4326",
         "f": "geojson"
     }
+    LIMITADOR.adquirir()
     r = session.post(BASE_QUERY_URL, data=data, timeout=TIMEOUT, verify=False)
     r.raise_for_status()
     txt = r.text.strip()
@@ -82,25 +102,32 @@ def _post_json(session, ids_str):
         "outSR": "4326",
         "f": "json"
     }
+    LIMITADOR.adquirir()
     r = session.post(BASE_QUERY_URL, data=data, timeout=TIMEOUT, verify=False)
     r.raise_for_status()
     return json_to_gdf(r.json())
 
-def fetch_by_ids_chunk(session, ids_chunk):
+def fetch_by_ids_chunk(session, ids_chunk, usar_geojson=True):
     """Descarga un bloque de registros por objectIds usando POST."""
     ids_str = ",".join(map(str, ids_chunk))
+    if not usar_geojson:
+        # la capa no declara geoJSON: directo a esriJSON, sin intento fallido
+        return _post_json(session, ids_str)
     # 1) intentar GeoJSON
     try:
         return _post_geojson(session, ids_str)
-    except Exception:
+    except Exception as e:
+        if es_error_de_capacidad(e):
+            raise  # lo resuelve el bucle reduciendo el bloque, no otro formato
         # 2) caer a esriJSON
         return _post_json(session, ids_str)
 
 def fetch_all():
     session = requests.Session()
 
-    oid_field = get_meta(session)
-    oids = get_all_object_ids(session, oid_field)
+    capacidades = REINTENTOS.ejecutar(get_meta, session)
+    usar_geojson = capacidades.soporta("geojson")
+    oids = REINTENTOS.ejecutar(get_all_object_ids, session, capacidades.oid_field)
     total = len(oids)
     if not oids:
         print("No hay registros para el WHERE dado.")
@@ -109,29 +136,39 @@ def fetch_all():
 
     all_gdfs = []
     i = 0
-    current_batch = BATCH_SIZE
-    # bucle manual para poder reducir tamaño de bloque si aparece 414
+    # tamaño de bloque adaptativo: crece si el servidor responde bien y se
+    # reduce ante 414, timeouts o 5xx
+    # el tope es el maxRecordCount de la capa: más allá, el servidor trunca
+    lotes = ControladorLote(inicial=BATCH_SIZE, minimo=BATCH_MIN, maximo=capacidades.tope_lote(BATCH_MAX))
+    intento = 1
     while i < total:
+        current_batch = lotes.tamano
         end = min(i + current_batch, total)
         chunk = oids[i:end]
+        inicio = time.monotonic()
         try:
-            gdf = fetch_by_ids_chunk(session, chunk)
+            gdf = fetch_by_ids_chunk(session, chunk, usar_geojson)
+            lotes.registrar_exito(time.monotonic() - inicio)
+            CIRCUITO.registrar_exito()
+            intento = 1
             if not gdf.empty:
                 all_gdfs.append(gdf)
             i = end
             pct = min(100, int(i * 100 / total))
             print(f"Descarga: {i} / {total}  ({pct}%)  [chunk={current_batch}]")
-            # si todo bien varias veces, podemos intentar subir un poco el chunk (opcional)
-            # current_batch = min(BATCH_SIZE, current_batch + 200)
-        except requests.HTTPError as e:
-            # si es 414, reducimos el chunk y reintentamos
-            if e.response is not None and e.response.status_code == 414:
-                if current_batch <= 50:
-                    raise  # muy pequeño, abortar
-                current_batch = max(50, current_batch // 2)
-                print(f"414 URI Too Long → reduciendo chunk a {current_batch} y reintentando…")
-            else:
-                raise
+        except Exception as e:
+            if es_error_de_capacidad(e) and current_batch > BATCH_MIN:
+                nuevo = lotes.registrar_fallo()
+                print(f"{e} → reduciendo chunk a {nuevo} y reintentando…")
+                continue
+            if intento >= REINTENTOS.max_intentos:
+                raise  # error persistente: abortar
+            if CIRCUITO.registrar_fallo(e):
+                print(f"Páginas HTML de error consecutivas → pausa de {CIRCUITO.pausa:.0f}s")
+            espera = REINTENTOS.espera(intento)
+            print(f"{e} → reintento {intento} en {espera:.1f}s…")
+            time.sleep(espera)
+            intento += 1
 
     if not all_gdfs:
         return gpd.GeoDataFrame()
@@ -0,0 +1,87 @@
+"""Escritura en streaming de la salida de la ingesta.
+
+Cada lote descargado se normaliza y se escribe como un archivo parcial en
+cuanto llega, así que en memoria solo viven los lotes en vuelo (acotados por
+la concurrencia) y nunca el dataset completo. Al final de la partición los
+parciales se unen en el CSV de salida copiándolos línea a línea.
+"""
+import os
+import shutil
+
+import pandas as pd
+
+# Filas por chunk al reescribir un CSV existente sin los registros corregidos
+FILAS_REESCRITURA = 200_000
+
+
+def escribir_parte(df, ruta):
+    """Escribe un parcial de forma atómica (un corte no deja archivos a medias)."""
+    ruta_tmp = ruta + ".tmp"
+    df.to_csv(ruta_tmp, index=False, encoding="utf-8")
+    os.replace(ruta_tmp, ruta)
+    return len(df)
+
+
+def _cabecera(ruta):
+    with open(ruta, encoding="utf-8", newline="") as f:
+        return f.readline()
+
+
+def ids_de_partes(partes, columna_id="objectid"):
+    """objectIds de los parciales (solo se lee esa columna)."""
+    ids = set()
+    for ruta, _ in partes:
+        ids.update(pd.read_csv(ruta, usecols=[columna_id])[columna_id])
+    return ids
+
+
+def _copiar_sin_ids(origen, salida, ids, columna_id):
+    """Copia las filas de ``origen`` (sin cabecera) salvo las de ``ids``; los valores pasan como texto."""
+    ids = {str(i) for i in ids}
+    for chunk in pd.read_csv(origen, dtype=str, keep_default_na=False, chunksize=FILAS_REESCRITURA):
+        chunk[~chunk[columna_id].isin(ids)].to_csv(salida, index=False, header=False)
+
+
+def unir_partes(partes, destino, anexar=False, reemplazar_ids=None, columna_id="objectid"):
+    """Une los parciales en ``destino`` sin cargar el dataset en memoria.
+
+    ``partes`` es una lista de tuplas ``(ruta, filas)``. Los parciales con la
+    misma cabecera que el destino se copian tal cual; si la cabecera difiere,
+    el parcial (uno a la vez) pasa por pandas para alinear columnas.
+    Con ``anexar`` y ``reemplazar_ids`` (registros ya guardados que se
+    volvieron a descargar corregidos), las filas del destino con esos IDs se
+    descartan y quedan las de los parciales; como eso reescribe el destino,
+    se escribe en ``.tmp`` y se reemplaza al final. Devuelve el número de
+    filas escritas desde los parciales.
+    """
+    anexar = anexar and os.path.exists(destino)
+    reescribir = anexar and bool(reemplazar_ids)
+    cabecera = _cabecera(destino) if anexar else None
+    columnas = pd.read_csv(destino, nrows=0).columns if anexar else None
+    escrito = destino + ".tmp" if reescribir else destino
+    filas = 0
+
+    with open(escrito, "a" if anexar and not reescribir else "w", encoding="utf-8", newline="") as salida:
+        if reescribir:
+            salida.write(cabecera)
+            _copiar_sin_ids(destino, salida, reemplazar_ids, columna_id)
+        for ruta, filas_parte in partes:
+            if cabecera is None:
+                cabecera = _cabecera(ruta)
+                columnas = pd.read_csv(ruta, nrows=0).columns
+                salida.write(cabecera)
+
+            if _cabecera(ruta) == cabecera:
+                with open(ruta, encoding="utf-8", newline="") as parte:
+                    parte.readline()
+                    shutil.copyfileobj(parte, salida)
+                filas += filas_parte
+                continue
+
+            df = pd.read_csv(ruta, low_memory=False)
+            df.reindex(columns=columnas).to_csv(salida, index=False, header=False)
+            filas += len(df)
+
+    if reescribir:
+        os.replace(escrito, destino)
+    return filas
@@ -0,0 +1,52 @@
+"""Fecha del hecho como timestamp nativo más campos enteros derivados.
+
+El servicio entrega ``fecha_hora_hecho`` en milisegundos desde epoch. Antes
+la ingesta la convertía y además generaba ``fecha_hecho`` (``'%d/%m/%Y'``) y
+``hora_hecho`` (``'%H:%M:%S'``) con ``.dt.strftime``: dos formateos de texto
+por fila que el paso 03 del EDA volvía a descartar. Ahora solo se guarda el
+timestamp y, calculados con aritmética entera sobre los milisegundos, el día,
+la hora y el día de la semana. El texto se genera al presentar (gráficos,
+reportes), no al ingerir.
+"""
+import numpy as np
+import pandas as pd
+
+CAMPO_FECHA = "fecha_hora_hecho"
+# Días desde 1970-01-01 (ordinal de la fecha, int32)
+CAMPO_DIA = "dia_epoch_hecho"
+# Hora del día, 0-23
+CAMPO_HORA = "hora_num_hecho"
+# Día de la semana, 0 = lunes ... 6 = domingo (como ``Timestamp.weekday``)
+CAMPO_DIA_SEMANA = "dia_semana_hecho"
+CAMPOS_DERIVADOS = (CAMPO_DIA, CAMPO_HORA, CAMPO_DIA_SEMANA)
+
+DIAS_SEMANA = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+
+MS_POR_DIA = 86_400_000
+MS_POR_HORA = 3_600_000
+# 1970-01-01 fue jueves
+DIA_SEMANA_EPOCH = 3
+
+
+def _entero(valores, validos, dtype):
+    return pd.arrays.IntegerArray(np.where(validos, valores, 0).astype(dtype), ~validos)
+
+
+def derivar_campos_fecha(df, campo=CAMPO_FECHA):
+    """Convierte ``campo`` (ms desde epoch) a ``datetime64[ms]`` y añade los derivados enteros.
+
+    Modifica ``df`` y lo devuelve. Los valores no numéricos quedan como
+    ``NaT`` y sus derivados como nulos (``Int32``/``Int8``).
+    """
+    if campo not in df.columns:
+        return df
+    ms = pd.to_numeric(df[campo], errors="coerce").to_numpy(dtype="float64")
+    validos = ~np.isnan(ms)
+    enteros = np.where(validos, ms, 0).astype("int64")
+    dias = enteros // MS_POR_DIA
+
+    df[campo] = pd.to_datetime(np.where(validos, enteros, np.iinfo("int64").min).astype("datetime64[ms]"))
+    df[CAMPO_DIA] = _entero(dias, validos, "int32")
+    df[CAMPO_HORA] = _entero((enteros - dias * MS_POR_DIA) // MS_POR_HORA, validos, "int8")
+    df[CAMPO_DIA_SEMANA] = _entero((dias + DIA_SEMANA_EPOCH) % 7, validos, "int8")
+    return df
@@ -0,0 +1,64 @@
+"""Estado de la ingesta incremental (delta) por partición.
+
+Después de cada descarga exitosa se guarda la marca de agua (el mayor
+``objectid`` ingerido) en ``<out_dir>/_estado/<etiqueta>.json``. En modo
+incremental el motor solo pide al servidor los IDs por encima de esa marca
+y anexa esas filas al dataset existente. Con una ventana reciente de
+``fecha_hora_hecho`` se piden todos los hechos de esos días: los objectIds
+nuevos se anexan y los que ya estaban guardados se reemplazan por la versión
+descargada (ver ``escritura.unir_partes`` y ``parquet.unir_partes_parquet``).
+"""
+import os
+import json
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+ESTADO_SUBDIR = "_estado"
+OID_FIELD = "objectid"
+
+
+def _ruta_estado(out_dir, etiqueta):
+    return os.path.join(out_dir, ESTADO_SUBDIR, f"{etiqueta}.json")
+
+
+def leer_marca(out_dir, etiqueta):
+    """Devuelve el último objectid ingerido para la partición, o ``None``."""
+    ruta = _ruta_estado(out_dir, etiqueta)
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f).get("max_objectid")
+
+
+def guardar_marca(out_dir, etiqueta, max_objectid):
+    ruta = _ruta_estado(out_dir, etiqueta)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    estado = {
+        "max_objectid": int(max_objectid),
+        "actualizado": datetime.now().isoformat(timespec="seconds"),
+    }
+    ruta_tmp = ruta + ".tmp"
+    with open(ruta_tmp, "w", encoding="utf-8") as f:
+        json.dump(estado, f, ensure_ascii=False, indent=2)
+    os.replace(ruta_tmp, ruta)
+
+
+def where_incremental(where, marca=None, ventana_dias=None):
+    """Restringe una cláusula WHERE a los registros nuevos (o recientes, con ``ventana_dias``).
+
+    Con ``ventana_dias`` se piden los hechos de los últimos N días, también
+    los ya guardados, para recoger sus correcciones; si no, los objectIds por
+    encima de la marca de agua.
+    """
+    if ventana_dias is not None:
+        desde = (datetime.now() - timedelta(days=ventana_dias)).strftime('%Y-%m-%d %H:%M:%S')
+        return f"({where}) AND fecha_hora_hecho >= timestamp '{desde}'"
+    return f"({where}) AND {OID_FIELD} > {int(marca)}"
+
+
+def ids_existentes(ruta_csv):
+    """objectIds ya presentes en el dataset (solo se lee esa columna)."""
+    if not os.path.exists(ruta_csv):
+        return set()
+    return set(pd.read_csv(ruta_csv, usecols=[OID_FIELD])[OID_FIELD])
@@ -0,0 +1,961 @@
+"""Motor de ingesta parametrizado para el servicio ArcGIS de denuncias.
+
+Reemplaza a los scripts generados ``codigo_<año>_S<n>_v2.py``: todas las
+particiones (periodos o cláusulas WHERE) se descargan dentro de un único
+event loop de asyncio, con un límite global de peticiones simultáneas contra
+``MapServer/0/query`` y una sola sesión HTTP (un solo pool de conexiones).
+
+Uso:
+    python src/data_collection/ingesta.py --periodos 2020-S1 2020-S2
+    python src/data_collection/ingesta.py --desde 2020 --hasta 2025
+    python src/data_collection/ingesta.py --where "(año_hecho >= 2020)" --etiqueta completo
+    python src/data_collection/ingesta.py --periodos 2025-S2 --incremental
+    python src/data_collection/ingesta.py --desde 2024 --hasta 2024 --csv
+
+La salida principal es Parquet particionado por año/mes del hecho
+(``<out-dir>/denuncias/anio=/mes=``, ver ``parquet.py``); el CSV por
+partición es opcional (``--csv``).
+"""
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import shutil
+import argparse
+import functools
+import unicodedata
+import concurrent.futures
+from datetime import datetime
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from data_collection.cache import CACHE_SUBDIR, MAX_BYTES_DEFECTO, CacheRespuestas
+from data_collection.capacidades import ARCHIVO_CAPACIDADES, TTL_CAPACIDADES, obtener_capacidades, sondear
+from data_collection.checkpoint import Checkpoint
+from data_collection.escritura import ids_de_partes, unir_partes
+from data_collection.fechas import derivar_campos_fecha
+from data_collection import parquet
+from data_collection.limites import Cortacircuitos, LimitadorTasa, PoliticaReintentos, TASA_DEFECTO
+from data_collection.lotes import ControladorLote, es_error_de_capacidad
+from data_collection.perfiles import TODOS_LOS_CAMPOS, out_fields as out_fields_de_perfil, perfiles_disponibles
+from data_collection.parseo import (
+    ErrorAPI, FormatoNoSoportado, decodificar, esrijson_a_columnas, geojson_a_columnas, pbf_a_columnas,
+    rechaza_formato,
+)
+from data_collection.planificador import OBJETIVO_DEFECTO, Unidad, planificar
+from data_collection.telemetria import Telemetria, codigo_http, imprimir_resumen
+from data_collection.incremental import (
+    guardar_marca, ids_existentes, leer_marca, where_incremental,
+)
+
+# --- CONFIGURACIÓN ---
+BASE_QUERY_URL = "https://seguridadciudadana.mininter.gob.pe/arcgis/rest/services/servicios_ogc/denuncias/MapServer/0/query"
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+OUT_DIR = os.path.join(BASE_DIR, 'data', '1. raw')
+CHECKPOINT_SUBDIR = "_checkpoints"
+
+# --- PARÁMETROS DE OPTIMIZACIÓN ---
+# Límite global de peticiones simultáneas, compartido por todas las particiones
+MAX_CONCURRENCIA = 12
+# Tamaño de lote inicial; el controlador AIMD lo ajusta entre CHUNK_MIN y CHUNK_MAX
+CHUNK_SIZE = 1000
+CHUNK_MIN = 50
+CHUNK_MAX = 2000
+TIMEOUT = 120
+# Reintentos por lote antes de darlo por fallido en esta ejecución
+# (backoff exponencial con jitter, ver limites.PoliticaReintentos)
+MAX_REINTENTOS = 4
+BACKOFF_BASE = 2.0
+# Registros aproximados por tramo de objectid al enumerar los IDs de una
+# partición (una petición ``returnIdsOnly`` por tramo)
+IDS_POR_TRAMO = 50_000
+# Tramos ya enumerados que pueden esperar a ser despachados
+TRAMOS_EN_COLA = 2
+
+# TTL de la caché de respuestas según la antigüedad del periodo:
+# (días desde el cierre del periodo, segundos de vida; None = no caduca).
+# Un periodo abierto, o sin fecha de cierre conocida, siempre va a la red.
+TTL_CACHE = [
+    (180, None),
+    (0, 7 * 24 * 3600),
+]
+
+ANIOS_DEFECTO = [2020, 2021, 2022, 2023, 2024, 2025]
+
+
+class Particion:
+    """Unidad de trabajo de la ingesta: una etiqueta y su cláusula WHERE.
+
+    ``fin`` es el instante en que cierra el periodo (si se conoce); decide
+    cuánto tiempo pueden servirse sus respuestas desde la caché.
+    """
+
+    def __init__(self, etiqueta, where, fin=None):
+        self.etiqueta = etiqueta
+        self.where = where
+        self.fin = fin
+
+    @property
+    def nombre_csv(self):
+        return f"denuncias_{self.etiqueta}_v2.csv"
+
+    def __repr__(self):
+        return f"Particion({self.etiqueta!r}, {self.where!r})"
+
+
+def periodo_semestral(anio, semestre):
+    """Construye la partición de un semestre, igual que ``generar_scripts_v2.py``."""
+    if semestre == 1:
+        start_month, end_month = 1, 6
+    else:
+        start_month, end_month = 7, 12
+    where = f"(año_hecho = {anio} AND mes_hecho BETWEEN {start_month} AND {end_month})"
+    fin = datetime(anio, 7, 1) if semestre == 1 else datetime(anio + 1, 1, 1)
+    return Particion(f"{anio}_S{semestre}", where, fin)
+
+
+def parse_periodo(texto):
+    """Convierte '2020-S1' (o '2020_S1') en una ``Particion`` semestral."""
+    m = re.fullmatch(r"(\d{4})[-_]S([12])", texto.strip(), flags=re.IGNORECASE)
+    if not m:
+        raise ValueError(f"Periodo inválido: '{texto}'. Formato esperado: 2020-S1")
+    return periodo_semestral(int(m.group(1)), int(m.group(2)))
+
+
+def periodos_entre(desde, hasta):
+    """Todas las particiones semestrales entre dos años (inclusive)."""
+    return [periodo_semestral(anio, s) for anio in range(desde, hasta + 1) for s in (1, 2)]
+
+
+def ttl_cache(particion, ahora=None):
+    """Segundos que una respuesta de la partición vale en caché (0 = no usar caché)."""
+    ahora = ahora or datetime.now()
+    if particion.fin is None or particion.fin > ahora:
+        return 0
+    dias_cerrado = (ahora - particion.fin).days
+    for dias_min, ttl in TTL_CACHE:
+        if dias_cerrado >= dias_min:
+            return ttl
+    return 0
+
+
+def normalize_name(s: str) -> str:
+    if not isinstance(s, str):
+        return s
+    s1 = ''.join(c for c in unicodedata.normalize('NFKD', s) if not unicodedata.combining(c))
+    s1 = s1.replace('Ñ', 'N').replace('ñ', 'n')
+    s1 = s1.strip().lower().replace(' ', '_')
+    return s1
+
+
+def crear_sesion(max_conexiones=MAX_CONCURRENCIA):
+    """Sesión HTTP única con un pool dimensionado al límite global de concurrencia.
+
+    Anuncia todas las codificaciones de transferencia que urllib3 sabe
+    descomprimir (gzip/deflate y, si están instalados, br/zstd).
+    """
+    session = requests.Session()
+    session.headers["Accept-Encoding"] = urllib3.util.make_headers(accept_encoding=True)["accept-encoding"]
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_conexiones)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _form_ids(where_clause):
+    return {"where": where_clause, "returnIdsOnly": "true", "f": "json"}
+
+
+def _ids_de_respuesta(contenido):
+    j = decodificar(contenido)
+    oids = j.get("objectIds") or j.get("objectIDs") or []
+    return sorted(oids)
+
+
+def get_all_object_ids(session, where_clause, cache=None):
+    """Obtiene la lista completa de Object IDs para un filtro dado."""
+    data = _form_ids(where_clause)
+    r = session.post(BASE_QUERY_URL, data=data, timeout=TIMEOUT, verify=False)
+    r.raise_for_status()
+    oids = _ids_de_respuesta(r.content)
+    if cache is not None:
+        cache.guardar(BASE_QUERY_URL, data, r.content)
+    return oids
+
+
+def _form_rango_ids(where_clause):
+    estadisticas = [{"statisticType": tipo, "onStatisticField": "objectid", "outStatisticFieldName": alias}
+                    for tipo, alias in (("count", "total"), ("min", "minimo"), ("max", "maximo"))]
+    return {"where": where_clause, "outStatistics": json.dumps(estadisticas), "f": "json"}
+
+
+def _rango_de_respuesta(contenido):
+    j = decodificar(contenido)
+    features = j.get("features") or []
+    # Algunos servidores devuelven los alias en mayúsculas
+    attrs = {k.lower(): v for k, v in (features[0].get("attributes") or {}).items()} if features else {}
+    total = int(attrs.get("total") or 0)
+    if total == 0:
+        return 0, None, None
+    return total, int(attrs["minimo"]), int(attrs["maximo"])
+
+
+def rango_object_ids(session, where_clause, cache=None):
+    """``(total, mínimo, máximo)`` de objectid para un filtro, en una sola consulta ``outStatistics``."""
+    data = _form_rango_ids(where_clause)
+    r = session.post(BASE_QUERY_URL, data=data, timeout=TIMEOUT, verify=False)
+    r.raise_for_status()
+    rango = _rango_de_respuesta(r.content)
+    if cache is not None:
+        cache.guardar(BASE_QUERY_URL, data, r.content)
+    return rango
+
+
+def rango_desde_cache(cache, where_clause, ttl):
+    """``(total, mínimo, máximo)`` guardado en la caché para el filtro, o ``None``."""
+    contenido = cache.leer(BASE_QUERY_URL, _form_rango_ids(where_clause), ttl)
+    return None if contenido is None else _rango_de_respuesta(contenido)
+
+
+def tramos_object_ids(total, minimo, maximo, ids_por_tramo=IDS_POR_TRAMO):
+    """Parte ``[minimo, maximo]`` en tramos contiguos de unos ``ids_por_tramo`` registros.
+
+    El ancho sale de la densidad media de objectIds del filtro; es un
+    generador, así que nunca se materializa la lista de tramos.
+    """
+    ancho = max(1, int(ids_por_tramo * (maximo - minimo + 1) / total))
+    for inicio in range(minimo, maximo + 1, ancho):
+        yield inicio, min(inicio + ancho - 1, maximo)
+
+
+def where_tramo(where_clause, inicio, fin):
+    return f"({where_clause}) AND objectid BETWEEN {inicio} AND {fin}"
+
+
+def contar_registros(session, where_clause):
+    """Número de registros que cumplen el filtro (``returnCountOnly``)."""
+    data = {"where": where_clause, "returnCountOnly": "true", "f": "json"}
+    r = session.post(BASE_QUERY_URL, data=data, timeout=TIMEOUT, verify=False)
+    r.raise_for_status()
+    return int(decodificar(r.content).get("count", 0))
+
+
+def ids_desde_cache(cache, where_clause, ttl):
+    """Object IDs guardados en la caché para el filtro, o ``None``."""
+    contenido = cache.leer(BASE_QUERY_URL, _form_ids(where_clause), ttl)
+    return None if contenido is None else _ids_de_respuesta(contenido)
+
+
+# Formatos de respuesta por lote, del más compacto al más verboso, y su parser
+FORMATOS = (("pbf", pbf_a_columnas), ("geojson", geojson_a_columnas), ("json", esrijson_a_columnas))
+# (url, formato) que el servidor rechazó: no se vuelven a intentar en el proceso
+FORMATOS_NO_SOPORTADOS = set()
+
+
+def _form_lote(id_chunk, formato, out_fields=TODOS_LOS_CAMPOS):
+    return {
+        "objectIds": ",".join(map(str, id_chunk)), "outFields": out_fields, "returnGeometry": "true",
+        "outSR": "4326", "f": formato
+    }
+
+
+def _post_lote(session, id_chunk, formato, parser, cache=None, out_fields=TODOS_LOS_CAMPOS, medicion=None):
+    """POST de un lote en ``formato``; si se pasa ``medicion`` (dict), deja en él los tiempos y bytes."""
+    medicion = {} if medicion is None else medicion
+    medicion.update(formato=formato, codigo=None, bytes=None, parseo_s=None)
+    inicio = time.monotonic()
+    data = _form_lote(id_chunk, formato, out_fields)
+    r = session.post(BASE_QUERY_URL, data=data, timeout=TIMEOUT, verify=False)
+    medicion.update(codigo=r.status_code, bytes=len(r.content), servidor_s=r.elapsed.total_seconds(),
+                    red_s=time.monotonic() - inicio)
+    _rechazo_de_formato(r)
+    r.raise_for_status()
+    inicio = time.monotonic()
+    df = parser(r.content)
+    medicion["parseo_s"] = time.monotonic() - inicio
+    # Se guarda después de parsear: una respuesta de error nunca entra a la caché
+    if cache is not None:
+        cache.guardar(BASE_QUERY_URL, data, r.content)
+    return df
+
+
+def _cronometrar(fn, *args):
+    inicio = time.monotonic()
+    resultado = fn(*args)
+    return resultado, time.monotonic() - inicio
+
+
+def _rechazo_de_formato(r):
+    """Lanza ``FormatoNoSoportado`` si un HTTP 4xx trae un error JSON que rechaza el formato.
+
+    Cualquier otro 4xx (400 por otro parámetro, 403, 408...) no dice nada del
+    formato y se deja a ``raise_for_status``.
+    """
+    if not 400 <= r.status_code < 500 or r.content.lstrip()[:1] != b"{":
+        return
+    try:
+        decodificar(r.content)
+    except ErrorAPI as exc:
+        if rechaza_formato(exc.error):
+            raise FormatoNoSoportado(exc.error) from None
+    except ValueError:
+        pass
+
+
+def formatos_soportados(capacidades=None):
+    """``FORMATOS`` que la capa declara en ``supportedQueryFormats`` (todos si no se sondeó)."""
+    if capacidades is None:
+        return FORMATOS
+    return tuple(f for f in FORMATOS if capacidades.soporta(f[0])) or FORMATOS
+
+
+def fetch_chunk(session, id_chunk, cache=None, out_fields=TODOS_LOS_CAMPOS, formatos=FORMATOS, medicion=None):
+    """Descarga un bloque de registros por objectIds.
+
+    Prueba ``formatos`` en orden (por defecto PBF, GeoJSON, esriJSON), pero
+    solo pasa al siguiente cuando la respuesta dice explícitamente que el
+    formato no se acepta (``FormatoNoSoportado``); ese formato queda
+    descartado para el resto del proceso. Cualquier otro error (5xx, página
+    HTML, error JSON de la API, timeout) se relanza tal cual para que lo
+    gestionen los reintentos y el cortacircuitos: probar otro formato solo
+    multiplicaría la carga sobre un servidor que ya falla. ``medicion``
+    recibe las métricas del último formato probado (ver ``telemetria.py``).
+    """
+    formatos = [f for f in formatos if (BASE_QUERY_URL, f[0]) not in FORMATOS_NO_SOPORTADOS]
+    for i, (formato, parser) in enumerate(formatos):
+        try:
+            return _post_lote(session, id_chunk, formato, parser, cache, out_fields, medicion)
+        except FormatoNoSoportado:
+            FORMATOS_NO_SOPORTADOS.add((BASE_QUERY_URL, formato))
+            if i == len(formatos) - 1:
+                raise
+
+
+def chunk_desde_cache(cache, id_chunk, ttl, out_fields=TODOS_LOS_CAMPOS):
+    """Lote parseado desde la caché (en cualquiera de los formatos), o ``None``."""
+    for formato, parser in FORMATOS:
+        contenido = cache.leer(BASE_QUERY_URL, _form_lote(id_chunk, formato, out_fields), ttl)
+        if contenido is not None:
+            return parser(contenido)
+    return None
+
+
+def normalizar_lote(df):
+    """Deduplica un lote, normaliza nombres y ajusta lat/lon.
+
+    El parser ya entrega ``lat``/``lon`` en WGS84. Los lotes cubren rangos
+    disjuntos de objectIds, así que deduplicar dentro de cada lote basta para
+    que la salida completa no tenga repetidos.
+    """
+    df = df.rename(columns={c: normalize_name(c) for c in df.columns})
+    df = df.drop_duplicates(subset=['objectid'])
+
+    # si existen lat_hecho/long_hecho válidos, sobrescriben a la geometría
+    if "lat_hecho" in df.columns and "long_hecho" in df.columns:
+        lat_num = pd.to_numeric(df["lat_hecho"], errors="coerce")
+        lon_num = pd.to_numeric(df["long_hecho"], errors="coerce")
+        mask = lat_num.notna() & lon_num.notna()
+        df.loc[mask, "lat"] = lat_num[mask]
+        df.loc[mask, "lon"] = lon_num[mask]
+
+    return df
+
+
+def preparar_salida(df):
+    """Ordena columnas, filtra coordenadas inválidas y deriva los campos de fecha (ver ``fechas.py``)."""
+    preferred = [
+        "fecha_hora_hecho",
+        "anio_hecho", "mes_hecho", "dia_hecho",
+        "departamento_hecho", "provincia_hecho", "distrito_hecho",
+        "tipo_hecho", "id_tipo_hecho", "materia_hecho", "id_materia_hecho",
+        "lat", "lon", "lat_hecho", "long_hecho"
+    ]
+    cols = [c for c in preferred if c in df.columns] + \
+           [c for c in df.columns if c not in preferred]
+
+    df_out = df[cols].dropna(subset=["lat", "lon"])
+    df_out = df_out[(df_out["lat"].between(-90, 90)) & (df_out["lon"].between(-180, 180))].copy()
+
+    return derivar_campos_fecha(df_out)
+
+
+def procesar_lote(df):
+    """Lote parseado -> filas listas para escribir en la salida."""
+    if df.empty:
+        return df
+    return preparar_salida(normalizar_lote(df))
+
+
+class MotorIngesta:
+    """Descarga varias particiones en un solo event loop.
+
+    Todas las peticiones pasan por el mismo semáforo (límite global de
+    concurrencia) y la misma sesión HTTP. ``requests`` es bloqueante, así que
+    cada petición se ejecuta en un pool de hilos del tamaño de ese límite.
+    """
+
+    def __init__(self, max_concurrencia=MAX_CONCURRENCIA, chunk_size=CHUNK_SIZE, out_dir=OUT_DIR,
+                 reiniciar=False, incremental=False, ventana_dias=None,
+                 tasa=TASA_DEFECTO, estado_limitador=None, cache_dir=None, cache_max_bytes=MAX_BYTES_DEFECTO,
+                 perfil=None, csv=False, telemetria=True):
+        self.max_concurrencia = max_concurrencia
+        self.chunk_size = chunk_size
+        self.out_dir = out_dir
+        self.reiniciar = reiniciar
+        self.incremental = incremental
+        self.ventana_dias = ventana_dias
+        self.lotes = ControladorLote(inicial=chunk_size, minimo=CHUNK_MIN, maximo=max(chunk_size, CHUNK_MAX))
+        self.limitador = LimitadorTasa(tasa, ruta_estado=estado_limitador)
+        self.reintentos = PoliticaReintentos(MAX_REINTENTOS, base=BACKOFF_BASE)
+        self.circuito = Cortacircuitos(self.limitador)
+        self.cache = CacheRespuestas(cache_dir, cache_max_bytes) if cache_dir else None
+        self.out_fields = out_fields_de_perfil(perfil)
+        self.capacidades = None
+        self.formatos = FORMATOS
+        self.parquet = parquet.disponible()
+        self.csv = csv or not self.parquet
+        if not self.parquet:
+            print("pyarrow no está instalado: la salida se escribe solo en CSV.", flush=True)
+        self.tipos_parquet = parquet.tipos_columnas() if self.parquet else None
+        # Sin archivo, la telemetría solo se acumula para el resumen final
+        self.guardar_telemetria = telemetria
+        self.telemetria = Telemetria()
+        self.session = None
+        self._semaforo = None
+        self._executor = None
+
+    def _llamar(self, fn, *args):
+        self.limitador.adquirir()
+        return fn(*args)
+
+    async def _en_hilo(self, fn, *args):
+        """Ejecuta una petición bloqueante respetando el límite global y la tasa."""
+        async with self._semaforo:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(self._llamar, fn, *args))
+
+    async def _con_reintentos(self, fn, *args):
+        """Como ``_en_hilo``, reintentando con la política de backoff compartida."""
+        for intento in range(1, self.reintentos.max_intentos + 1):
+            try:
+                return await self._en_hilo(fn, *args)
+            except Exception as exc:
+                self.circuito.registrar_fallo(exc)
+                if intento == self.reintentos.max_intentos:
+                    raise
+                await asyncio.sleep(self.reintentos.espera(intento))
+
+    async def _en_disco(self, fn, *args):
+        """Escritura bloqueante en disco, fuera del límite de peticiones HTTP."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args))
+
+    async def _sondear_capacidades(self):
+        """Ajusta formatos, tope de lote y ``outFields`` a las capacidades de la capa.
+
+        El sondeo se hace una vez (y se guarda en ``<out_dir>/_capacidades.json``);
+        si falla, la ingesta sigue con los valores por defecto.
+        """
+        def _sondear(*args):
+            return self.reintentos.ejecutar(self._llamar, sondear, *args)
+
+        ruta = os.path.join(self.out_dir, ARCHIVO_CAPACIDADES)
+        try:
+            capacidades = await self._en_disco(
+                functools.partial(obtener_capacidades, self.session, BASE_QUERY_URL, ruta,
+                                  TTL_CAPACIDADES, TIMEOUT, sondeo=_sondear)
+            )
+        except Exception as exc:
+            print(f"No se pudieron leer las capacidades de la capa ({exc}); "
+                  f"se usan los valores por defecto.", flush=True)
+            return
+        self.capacidades = capacidades
+        self.formatos = formatos_soportados(capacidades)
+        maximo = self.lotes.limitar(capacidades.tope_lote(self.lotes.maximo))
+        self.chunk_size = min(self.chunk_size, maximo)
+        self.out_fields, descartados = capacidades.filtrar_out_fields(self.out_fields)
+        if descartados:
+            print(f"Campos del perfil que la capa no tiene (se omiten): {', '.join(descartados)}", flush=True)
+        if self.parquet:
+            self.tipos_parquet = parquet.tipos_columnas(
+                {normalize_name(c): t for c, t in capacidades.campos.items()}
+            )
+        print(f"Capa: maxRecordCount={capacidades.max_record_count}, "
+              f"formatos={'/'.join(f for f, _ in self.formatos)}, lote máx.={maximo}", flush=True)
+
+    def _checkpoint(self, particion):
+        directorio = os.path.join(self.out_dir, CHECKPOINT_SUBDIR, particion.etiqueta)
+        if self.reiniciar:
+            shutil.rmtree(directorio, ignore_errors=True)
+        return Checkpoint(directorio, particion.where, self.out_fields)
+
+    async def _desde_cache(self, fn, *args):
+        """Lectura de la caché fuera del limitador; un archivo ilegible cuenta como fallo."""
+        try:
+            return await self._en_disco(fn, self.cache, *args)
+        except Exception:
+            return None
+
+    async def _descargar_lote(self, etiqueta, checkpoint, chunk, ttl=0, intento=1):
+        """Descarga un lote y lo escribe a disco en cuanto llega.
+
+        Con ``ttl`` distinto de 0 el lote se busca antes en la caché de
+        respuestas y, si viene de la red, se guarda en ella. Si falla, el lote
+        se reencola tras un backoff, partido al tamaño que el controlador AIMD
+        considere seguro en ese momento; si una de las partes agota sus
+        intentos, se cancelan las demás. Cada intento contra la red queda en
+        la telemetría.
+        """
+        tag = f"[{etiqueta}]"
+        usar_cache = self.cache is not None and ttl != 0
+        if usar_cache:
+            crudo = await self._desde_cache(chunk_desde_cache, chunk, ttl, self.out_fields)
+            if crudo is not None:
+                return await self._guardar_lote(etiqueta, checkpoint, chunk, crudo)
+
+        medicion = {}
+        inicio = time.monotonic()
+        try:
+            crudo, latencia = await self._en_hilo(
+                _cronometrar, fetch_chunk, self.session, chunk, self.cache if usar_cache else None,
+                self.out_fields, self.formatos, medicion
+            )
+        except Exception as exc:
+            self.telemetria.registrar(
+                etiqueta, "lote", intento=intento, ids=len(chunk), error=type(exc).__name__,
+                codigo=codigo_http(exc) or medicion.get("codigo"), formato=medicion.get("formato"),
+                red_s=medicion.get("red_s"), servidor_s=medicion.get("servidor_s"),
+            )
+            if es_error_de_capacidad(exc):
+                self.lotes.registrar_fallo()
+            if self.circuito.registrar_fallo(exc):
+                print(f"{tag} El servidor devuelve páginas de error HTML: "
+                      f"ingesta en pausa {self.circuito.pausa:.0f}s", flush=True)
+            if intento == MAX_REINTENTOS:
+                raise
+            espera = self.reintentos.espera(intento)
+            tamano = self.lotes.tamano
+            partes = [chunk[i:i + tamano] for i in range(0, len(chunk), tamano)]
+            print(f"{tag} Lote {chunk[0]}-{chunk[-1]} falló (intento {intento}/{MAX_REINTENTOS}): "
+                  f"{exc}. Reencolado en {espera:.0f}s como {len(partes)} lote(s) de hasta {tamano}", flush=True)
+            await asyncio.sleep(espera)
+            tareas = [asyncio.ensure_future(self._descargar_lote(etiqueta, checkpoint, parte, ttl, intento + 1))
+                      for parte in partes]
+            try:
+                filas = await asyncio.gather(*tareas)
+            except BaseException:
+                # El lote ya falló: las demás partes no deben seguir gastando la tasa compartida
+                for tarea in tareas:
+                    tarea.cancel()
+                await asyncio.gather(*tareas, return_exceptions=True)
+                raise
+            return sum(filas)
+
+        self.lotes.registrar_exito(latencia)
+        self.circuito.registrar_exito()
+        self.telemetria.registrar(
+            etiqueta, "lote", intento=intento, ids=len(chunk), registros=len(crudo),
+            codigo=medicion.get("codigo"), formato=medicion.get("formato"), bytes=medicion.get("bytes"),
+            red_s=medicion.get("red_s"), servidor_s=medicion.get("servidor_s"),
+            parseo_s=medicion.get("parseo_s"), espera_s=max(0.0, time.monotonic() - inicio - latencia),
+        )
+        return await self._guardar_lote(etiqueta, checkpoint, chunk, crudo)
+
+    async def _guardar_lote(self, etiqueta, checkpoint, chunk, crudo):
+        inicio = time.monotonic()
+        df = await self._en_disco(procesar_lote, crudo)
+        await self._en_disco(checkpoint.guardar_lote, chunk, df)
+        self.telemetria.sumar_proceso(etiqueta, time.monotonic() - inicio)
+        return len(df)
+
+    async def _ids_de(self, where, ttl):
+        """Object IDs de un filtro (caché primero si ``ttl`` lo permite), con reintentos."""
+        oids = None
+        if ttl != 0:
+            oids = await self._desde_cache(ids_desde_cache, where, ttl)
+        if oids is None:
+            oids = await self._con_reintentos(
+                get_all_object_ids, self.session, where, self.cache if ttl != 0 else None
+            )
+        return oids
+
+    async def _rango_ids(self, where, ttl):
+        rango = None
+        if ttl != 0:
+            rango = await self._desde_cache(rango_desde_cache, where, ttl)
+        if rango is None:
+            rango = await self._con_reintentos(
+                rango_object_ids, self.session, where, self.cache if ttl != 0 else None
+            )
+        return rango
+
+    async def _enumerar_ids(self, tag, particion, ttl, checkpoint, cola, estado):
+        """Productor de IDs pendientes: deja en ``cola`` una lista por tramo de objectid.
+
+        Una consulta ``outStatistics`` da el total y el rango de objectid del
+        filtro; luego se recorre ``objectid BETWEEN a AND b`` tramo a tramo.
+        La cola es acotada, así que en memoria solo hay unos pocos tramos y
+        los lotes empiezan a descargarse con el primero. Si el servidor no
+        calcula estadísticas, se piden todos los IDs de una vez, como antes.
+        Siempre termina poniendo ``None`` en la cola.
+        """
+        try:
+            try:
+                total, minimo, maximo = await self._rango_ids(particion.where, ttl)
+            except Exception as exc:
+                print(f"{tag} Sin estadísticas de objectid ({exc}); se piden todos los IDs de una vez.",
+                      flush=True)
+                oids = await self._ids_de(particion.where, ttl)
+                estado["total"] = len(oids)
+                await cola.put(checkpoint.pendientes(oids))
+                return
+
+            estado["total"] = total
+            if total == 0:
+                return
+            print(f"{tag} Se encontraron {total} registros en total (objectid {minimo}-{maximo}).", flush=True)
+            for inicio, fin in tramos_object_ids(total, minimo, maximo):
+                oids = await self._ids_de(where_tramo(particion.where, inicio, fin), ttl)
+                pendientes = checkpoint.pendientes(oids)
+                estado["cubiertos"] += len(oids) - len(pendientes)
+                if pendientes:
+                    await cola.put(pendientes)
+        except Exception as exc:
+            estado["error"] = exc
+        finally:
+            await cola.put(None)
+
+    async def fetch_all_parallel(self, particion):
+        """Descarga todos los registros de una partición a su checkpoint.
+
+        Los IDs se enumeran por tramos de objectid mientras los lotes ya se
+        están descargando (ver ``_enumerar_ids``). Devuelve el ``Checkpoint``
+        con los parciales ya escritos en disco, o ``None`` si quedaron lotes
+        fallidos: lo descargado se conserva y la siguiente ejecución solo pide
+        los lotes faltantes.
+        """
+        tag = f"[{particion.etiqueta}]"
+        ttl = ttl_cache(particion) if self.cache is not None else 0
+        checkpoint = self._checkpoint(particion)
+        print(f"{tag} Paso 1: Enumerando los IDs por tramos de objectid para el filtro: {particion.where}",
+              flush=True)
+        if checkpoint.lotes_completados:
+            print(f"{tag} Reanudando: {checkpoint.lotes_completados} lotes ya completados.", flush=True)
+        if ttl != 0:
+            # Periodo cerrado con caché: lotes de tamaño fijo, para que las
+            # claves (objectIds pedidos) se repitan entre ejecuciones
+            print(f"{tag} Paso 2: Descargando en lotes de {self.chunk_size} "
+                  f"(caché de respuestas activa).", flush=True)
+        else:
+            print(f"{tag} Paso 2: Descargando en lotes adaptativos "
+                  f"(inicial {self.lotes.tamano}, máx. {self.lotes.maximo}).", flush=True)
+
+        cola = asyncio.Queue(maxsize=TRAMOS_EN_COLA)
+        estado = {"total": None, "cubiertos": 0, "error": None}
+        productor = asyncio.ensure_future(self._enumerar_ids(tag, particion, ttl, checkpoint, cola, estado))
+
+        # Los lotes se cortan al despacharse, con el tamaño vigente del
+        # controlador; por eso solo se mantienen max_concurrencia en vuelo.
+        # Un lote puede juntar IDs de tramos consecutivos.
+        en_vuelo = {}
+        pendientes = []
+        enumerado = False
+        procesados = 0
+        fallidos = 0
+        while not enumerado or pendientes or en_vuelo:
+            while len(en_vuelo) < self.max_concurrencia:
+                tamano = self.chunk_size if ttl != 0 else self.lotes.tamano
+                if not pendientes or (len(pendientes) < tamano and not enumerado):
+                    break
+                chunk = pendientes[:tamano]
+                del pendientes[:tamano]
+                tarea = asyncio.ensure_future(self._descargar_lote(particion.etiqueta, checkpoint, chunk, ttl))
+                en_vuelo[tarea] = len(chunk)
+
+            esperando = set(en_vuelo)
+            siguiente = None
+            if not enumerado:
+                siguiente = asyncio.ensure_future(cola.get())
+                esperando.add(siguiente)
+            if not esperando:
+                break
+            hechas, _ = await asyncio.wait(esperando, return_when=asyncio.FIRST_COMPLETED)
+            if siguiente is not None:
+                if siguiente.done():
+                    tramo = siguiente.result()
+                    if tramo is None:
+                        enumerado = True
+                    else:
+                        pendientes.extend(tramo)
+                else:
+                    siguiente.cancel()
+            for tarea in hechas:
+                if tarea is siguiente:
+                    continue
+                procesados += en_vuelo.pop(tarea)
+                try:
+                    tarea.result()
+                    total = estado["total"] or 0
+                    hechos = procesados + estado["cubiertos"]
+                    progress = hechos / total * 100 if total else 0.0
+                    print(f"{tag} Progreso: {progress:.2f}% ({hechos}/{total} registros) "
+                          f"[lote={self.lotes.tamano}]", flush=True)
+                except Exception as exc:
+                    fallidos += 1
+                    print(f"{tag} Un lote falló tras {MAX_REINTENTOS} intentos: {exc}", flush=True)
+        await productor
+
+        if estado["error"] is not None:
+            print(f"{tag} Error fatal al enumerar los IDs: {estado['error']}", flush=True)
+            return None
+        if estado["total"] == 0:
+            print(f"{tag} No se encontraron registros para el filtro dado.", flush=True)
+            return checkpoint
+        if fallidos:
+            print(f"{tag} {fallidos} lotes fallidos. Lo descargado quedó en el checkpoint; "
+                  f"vuelva a ejecutar para completar solo los faltantes.", flush=True)
+            return None
+
+        print(f"{tag} Descarga completada.", flush=True)
+        return checkpoint
+
+    @property
+    def _raiz_parquet(self):
+        return os.path.join(self.out_dir, parquet.PARQUET_SUBDIR)
+
+    def _hay_dataset(self, particion, out_csv):
+        """La partición ya tiene salida en todos los formatos que se escriben."""
+        if self.parquet and not parquet.existe(self._raiz_parquet, particion.etiqueta):
+            return False
+        return not self.csv or os.path.exists(out_csv)
+
+    def _ids_guardados(self, particion, out_csv):
+        if self.parquet:
+            return parquet.ids_existentes(self._raiz_parquet, particion.etiqueta)
+        return ids_existentes(out_csv)
+
+    def _particion_delta(self, particion, out_csv):
+        """Partición restringida a registros nuevos, o ``None`` si toca descarga completa."""
+        if not self._hay_dataset(particion, out_csv):
+            return None
+        marca = leer_marca(self.out_dir, particion.etiqueta)
+        if marca is None and self.ventana_dias is None:
+            return None
+        where = where_incremental(particion.where, marca, self.ventana_dias)
+        return Particion(f"{particion.etiqueta}_delta", where)
+
+    async def _unir(self, particion, partes, out_csv, delta, corregidos):
+        """Escribe los parciales en cada salida; devuelve las filas escritas.
+
+        ``corregidos``: IDs ya guardados que vinieron otra vez en la descarga;
+        sus filas anteriores se reemplazan por las nuevas.
+        """
+        filas = None
+        if self.parquet:
+            filas = await self._en_disco(functools.partial(
+                parquet.unir_partes_parquet, partes, self._raiz_parquet, particion.etiqueta,
+                self.tipos_parquet, anexar=delta is not None, reemplazar_ids=corregidos,
+            ))
+        if self.csv:
+            filas_csv = await self._en_disco(functools.partial(
+                unir_partes, partes, out_csv, anexar=delta is not None, reemplazar_ids=corregidos,
+            ))
+            filas = filas_csv if filas is None else filas
+        return filas
+
+    async def _procesar(self, particion):
+        tag = f"[{particion.etiqueta}]"
+        out_csv = os.path.join(self.out_dir, particion.nombre_csv)
+
+        delta = self._particion_delta(particion, out_csv) if self.incremental else None
+        if delta is not None and self.ventana_dias is not None:
+            print(f"{tag} Modo incremental: hechos de los últimos {self.ventana_dias} días "
+                  f"(los ya guardados se actualizan).", flush=True)
+        elif delta is not None:
+            print(f"{tag} Modo incremental: solo registros nuevos.", flush=True)
+        elif self.incremental:
+            print(f"{tag} Sin dataset o marca de agua previa: se hace una descarga completa.", flush=True)
+
+        checkpoint = await self.fetch_all_parallel(delta or particion)
+        if checkpoint is None:
+            return particion.etiqueta, None
+        partes = checkpoint.archivos_parciales()
+        if not partes:
+            mensaje = "Sin registros nuevos." if delta is not None else "No se guardó ningún archivo."
+            print(f"{tag} {mensaje}", flush=True)
+            checkpoint.limpiar()
+            return particion.etiqueta, 0
+
+        destinos = ([self._raiz_parquet] if self.parquet else []) + ([out_csv] if self.csv else [])
+        print(f"{tag} Uniendo {len(partes)} parciales en {', '.join(destinos)}...", flush=True)
+        corregidos = None
+        if delta is not None and self.ventana_dias is not None:
+            # La ventana vuelve a traer registros ya guardados: se actualizan por objectid
+            existentes = await self._en_disco(self._ids_guardados, particion, out_csv)
+            corregidos = existentes & await self._en_disco(ids_de_partes, partes)
+        filas = await self._unir(particion, partes, out_csv, delta, corregidos)
+        if delta is not None:
+            actualizadas = len(corregidos or ())
+            print(f"{tag} ¡Éxito! Anexadas {filas - actualizadas} filas nuevas y actualizadas {actualizadas} "
+                  f"ya existentes en: {', '.join(destinos)}", flush=True)
+        else:
+            print(f"{tag} ¡Éxito! Guardado: {', '.join(destinos)} Filas: {filas}", flush=True)
+
+        marca = max(checkpoint.max_oid, leer_marca(self.out_dir, particion.etiqueta) or 0)
+        guardar_marca(self.out_dir, particion.etiqueta, marca)
+        # La partición quedó completa: el checkpoint ya no es necesario
+        checkpoint.limpiar()
+        return particion.etiqueta, filas
+
+    async def descargar(self, particiones):
+        """Descarga todas las particiones de forma concurrente y devuelve filas por etiqueta."""
+        os.makedirs(self.out_dir, exist_ok=True)
+        self._semaforo = asyncio.Semaphore(self.max_concurrencia)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_concurrencia)
+        self.session = crear_sesion(self.max_concurrencia)
+        if self.guardar_telemetria:
+            self.telemetria = Telemetria.en_directorio(self.out_dir)
+        try:
+            await self._sondear_capacidades()
+            resultados = await asyncio.gather(
+                *(self._procesar(p) for p in particiones), return_exceptions=True
+            )
+        finally:
+            self.session.close()
+            self._executor.shutdown(wait=True)
+            imprimir_resumen(self.telemetria.cerrar(), self.telemetria.ruta)
+        if self.cache is not None:
+            print(f"Caché de respuestas: {self.cache}", flush=True)
+
+        resumen = {}
+        for particion, res in zip(particiones, resultados):
+            if isinstance(res, Exception):
+                print(f"[{particion.etiqueta}] Error: {res}", flush=True)
+                resumen[particion.etiqueta] = None
+            else:
+                resumen[res[0]] = res[1]
+        return resumen
+
+
+def descargar_particiones(particiones, **kwargs):
+    """Punto de entrada síncrono: ejecuta el motor en un único event loop."""
+    requests.packages.urllib3.disable_warnings(requests.packages.urllib3.exceptions.InsecureRequestWarning)
+    motor = MotorIngesta(**kwargs)
+    return asyncio.run(motor.descargar(particiones))
+
+
+def planificar_particiones(desde, hasta, objetivo=OBJETIVO_DEFECTO, max_concurrencia=MAX_CONCURRENCIA,
+                           tasa=TASA_DEFECTO, estado_limitador=None):
+    """Particiones de ~``objetivo`` registros para los años dados, según ``returnCountOnly``.
+
+    Los conteos de cada nivel de división se piden en paralelo, respetando el
+    limitador de tasa compartido.
+    """
+    limitador = LimitadorTasa(tasa, ruta_estado=estado_limitador)
+    reintentos = PoliticaReintentos(MAX_REINTENTOS, base=BACKOFF_BASE)
+    session = crear_sesion(max_concurrencia)
+
+    def contar(where):
+        def _contar():
+            limitador.adquirir()
+            return contar_registros(session, where)
+        return reintentos.ejecutar(_contar)
+
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrencia) as executor:
+            plan = planificar(contar, [Unidad(desde, hasta)], objetivo, mapear=executor.map)
+    finally:
+        session.close()
+
+    print(f"Plan de particiones ({len(plan)} unidades, objetivo {objetivo:,} registros):", flush=True)
+    for unidad, n in plan:
+        print(f"  {unidad.etiqueta:<28} {n:>10,}", flush=True)
+    return [Particion(unidad.etiqueta, unidad.where, unidad.fin) for unidad, _ in plan]
+
+
+def construir_particiones(args):
+    if args.planificar:
+        return planificar_particiones(args.desde, args.hasta, args.objetivo, args.max_concurrencia,
+                                      args.tasa, args.estado_limitador)
+    if args.where:
+        return [Particion(args.etiqueta, args.where)]
+    if args.periodos:
+        return [parse_periodo(p) for p in args.periodos]
+    return periodos_entre(args.desde, args.hasta)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingesta de denuncias (ArcGIS MININTER) en un solo proceso.")
+    parser.add_argument("--periodos", nargs="+", help="Periodos semestrales, p. ej. 2020-S1 2024-S2")
+    parser.add_argument("--desde", type=int, default=ANIOS_DEFECTO[0], help="Primer año (todos sus semestres)")
+    parser.add_argument("--hasta", type=int, default=ANIOS_DEFECTO[-1], help="Último año (todos sus semestres)")
+    parser.add_argument("--where", help="Cláusula WHERE personalizada (una sola partición)")
+    parser.add_argument("--etiqueta", default="personalizado", help="Etiqueta para --where")
+    parser.add_argument("--planificar", action="store_true",
+                        help="Reparte --desde/--hasta en unidades de tamaño parecido (returnCountOnly)")
+    parser.add_argument("--objetivo", type=int, default=OBJETIVO_DEFECTO,
+                        help="Con --planificar, registros por unidad de trabajo")
+    parser.add_argument("--max-concurrencia", type=int, default=MAX_CONCURRENCIA)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Tamaño de lote inicial (luego adaptativo)")
+    parser.add_argument("--out-dir", default=OUT_DIR)
+    parser.add_argument("--tasa", type=float, default=TASA_DEFECTO,
+                        help="Peticiones por segundo máximas (sumando todos los workers)")
+    parser.add_argument("--estado-limitador",
+                        help="Archivo para compartir el limitador entre procesos (o $INGESTA_LIMITADOR)")
+    parser.add_argument("--perfil", choices=perfiles_disponibles() or None,
+                        help="Perfil de campos (outFields) de config/config.yaml; por defecto, perfil_defecto")
+    parser.add_argument("--cache", action="store_true",
+                        help="Reutiliza respuestas guardadas en disco para periodos ya cerrados")
+    parser.add_argument("--cache-dir", help="Carpeta de la caché (por defecto <out-dir>/_cache)")
+    parser.add_argument("--cache-max-mb", type=int, default=MAX_BYTES_DEFECTO // 1024 ** 2,
+                        help="Tamaño máximo de la caché; se desalojan las respuestas menos usadas")
+    parser.add_argument("--csv", action="store_true",
+                        help="Además del Parquet particionado, escribe denuncias_<etiqueta>_v2.csv por partición")
+    parser.add_argument("--sin-telemetria", action="store_true",
+                        help="No escribe <out-dir>/_telemetria/*.jsonl (el resumen se imprime igual)")
+    parser.add_argument("--reiniciar", action="store_true",
+                        help="Descarta los checkpoints existentes y descarga desde cero")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Solo descarga objectIds por encima de la última marca de agua y los anexa")
+    parser.add_argument("--ventana-dias", type=int,
+                        help="Con --incremental, re-consulta los hechos de los últimos N días "
+                             "y actualiza por objectid los que ya estaban guardados")
+    args = parser.parse_args(argv)
+
+    particiones = construir_particiones(args)
+    print(f"Iniciando ingesta de {len(particiones)} particiones "
+          f"(concurrencia global: {args.max_concurrencia}, lotes de {args.chunk_size}, "
+          f"perfil: {args.perfil or 'por defecto'})", flush=True)
+    resumen = descargar_particiones(
+        particiones,
+        max_concurrencia=args.max_concurrencia,
+        chunk_size=args.chunk_size,
+        out_dir=args.out_dir,
+        reiniciar=args.reiniciar,
+        incremental=args.incremental,
+        ventana_dias=args.ventana_dias,
+        tasa=args.tasa,
+        estado_limitador=args.estado_limitador,
+        cache_dir=(args.cache_dir or os.path.join(args.out_dir, CACHE_SUBDIR)) if args.cache else None,
+        cache_max_bytes=args.cache_max_mb * 1024 ** 2,
+        perfil=args.perfil,
+        csv=args.csv,
+        telemetria=not args.sin_telemetria,
+    )
+
+    print("\nResumen de la ingesta:", flush=True)
+    for etiqueta, filas in resumen.items():
+        estado = "ERROR" if filas is None else f"{filas:,} filas"
+        print(f"  {etiqueta:<20} {estado}", flush=True)
+    return resumen
+
+
+if __name__ == "__main__":
+    main()
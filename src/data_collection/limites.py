@@ -0,0 +1,172 @@
+"""Control de tráfico común a todos los workers de la ingesta.
+
+- ``LimitadorTasa``: token bucket. Dentro de un proceso se coordina con un
+  lock; entre procesos (scripts lanzados por ``ejecutar_todos.py``, varias
+  instancias del motor, ``data.py``) comparte su estado en un archivo JSON
+  protegido con un bloqueo de archivo, cuya ruta se indica con la variable de
+  entorno ``INGESTA_LIMITADOR``.
+- ``PoliticaReintentos``: backoff exponencial con jitter.
+- ``Cortacircuitos``: si el servidor empieza a devolver páginas HTML de error
+  en lugar de JSON, pausa a todos los workers que comparten el limitador.
+"""
+import os
+import json
+import time
+import random
+import threading
+import contextlib
+
+ENV_ESTADO = "INGESTA_LIMITADOR"
+
+# Peticiones por segundo contra el servicio, sumando todos los workers
+TASA_DEFECTO = 8.0
+
+
+@contextlib.contextmanager
+def _bloqueo_archivo(ruta):
+    """Bloqueo exclusivo entre procesos (fcntl en POSIX, msvcrt en Windows)."""
+    with open(ruta + ".lock", "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class LimitadorTasa:
+    """Token bucket compartido por hilos y, opcionalmente, por procesos.
+
+    Parameters
+    ----------
+    tasa : float
+        Tokens (peticiones) repuestos por segundo.
+    rafaga : float, optional
+        Capacidad del bucket; por defecto igual a ``tasa``.
+    ruta_estado : str, optional
+        Archivo de estado compartido entre procesos. Si se omite se usa
+        ``$INGESTA_LIMITADOR``; sin ninguno de los dos, el estado vive en memoria.
+    """
+
+    def __init__(self, tasa=TASA_DEFECTO, rafaga=None, ruta_estado=None):
+        self.tasa = tasa
+        self.rafaga = rafaga or max(1.0, tasa)
+        self.ruta_estado = ruta_estado or os.environ.get(ENV_ESTADO)
+        self._lock = threading.Lock()
+        self._estado = self._estado_inicial()
+
+    def _estado_inicial(self):
+        return {"tokens": self.rafaga, "t": time.time(), "pausa_hasta": 0.0}
+
+    def _leer(self):
+        try:
+            with open(self.ruta_estado, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return self._estado_inicial()
+
+    def _escribir(self, estado):
+        with open(self.ruta_estado, "w", encoding="utf-8") as f:
+            json.dump(estado, f)
+
+    def _transaccion(self, fn):
+        """Aplica ``fn`` al estado de forma atómica para hilos y procesos."""
+        with self._lock:
+            if not self.ruta_estado:
+                return fn(self._estado)
+            with _bloqueo_archivo(self.ruta_estado):
+                estado = self._leer()
+                resultado = fn(estado)
+                self._escribir(estado)
+                return resultado
+
+    def _tomar(self, estado):
+        ahora = time.time()
+        if estado["pausa_hasta"] > ahora:
+            return estado["pausa_hasta"] - ahora
+        estado["tokens"] = min(self.rafaga, estado["tokens"] + (ahora - estado["t"]) * self.tasa)
+        estado["t"] = ahora
+        if estado["tokens"] >= 1:
+            estado["tokens"] -= 1
+            return 0.0
+        return (1 - estado["tokens"]) / self.tasa
+
+    def adquirir(self):
+        """Bloquea hasta obtener un token (o hasta que termine una pausa)."""
+        while True:
+            espera = self._transaccion(self._tomar)
+            if espera <= 0:
+                return
+            time.sleep(espera)
+
+    def pausar(self, segundos):
+        """Detiene a todos los workers que comparten este limitador."""
+        def _pausar(estado):
+            estado["pausa_hasta"] = max(estado["pausa_hasta"], time.time() + segundos)
+        self._transaccion(_pausar)
+
+
+class PoliticaReintentos:
+    """Backoff exponencial con jitter ("equal jitter")."""
+
+    def __init__(self, max_intentos=4, base=2.0, tope=120.0):
+        self.max_intentos = max_intentos
+        self.base = base
+        self.tope = tope
+
+    def espera(self, intento):
+        """Segundos a esperar antes del reintento número ``intento`` (1, 2, ...)."""
+        techo = min(self.tope, self.base * 2 ** intento)
+        return techo / 2 + random.uniform(0, techo / 2)
+
+    def ejecutar(self, fn, *args, **kwargs):
+        """Llama a ``fn`` reintentando ante cualquier excepción."""
+        for intento in range(1, self.max_intentos + 1):
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                if intento == self.max_intentos:
+                    raise
+                time.sleep(self.espera(intento))
+
+
+def es_pagina_html(exc):
+    """True si el error corresponde a una página HTML de error del servidor."""
+    return isinstance(exc, ValueError) and "HTML" in str(exc)
+
+
+class Cortacircuitos:
+    """Pausa la ejecución completa ante páginas HTML de error consecutivas."""
+
+    def __init__(self, limitador, umbral=3, pausa=120.0):
+        self.limitador = limitador
+        self.umbral = umbral
+        self.pausa = pausa
+        self._consecutivos = 0
+        self._lock = threading.Lock()
+
+    def registrar_exito(self):
+        with self._lock:
+            self._consecutivos = 0
+
+    def registrar_fallo(self, exc):
+        """Devuelve True si este fallo abrió el circuito."""
+        if not es_pagina_html(exc):
+            return False
+        with self._lock:
+            self._consecutivos += 1
+            if self._consecutivos < self.umbral:
+                return False
+            self._consecutivos = 0
+        self.limitador.pausar(self.pausa)
+        return True
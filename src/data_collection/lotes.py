@@ -0,0 +1,87 @@
+"""Tamaño de lote adaptativo (AIMD) para las peticiones por objectIds.
+
+El tamaño crece de forma aditiva mientras las respuestas llegan rápido y sin
+errores, y se reduce de forma multiplicativa ante señales de saturación del
+servidor (414, timeouts, 5xx). Así el rendimiento sigue la capacidad real del
+servicio sin ajustar ``CHUNK_SIZE`` a mano en cada script.
+"""
+import threading
+
+import requests
+
+from data_collection.parseo import ErrorAPI
+
+
+def es_error_de_capacidad(exc):
+    """True si el error indica que el lote o la carga son demasiado grandes."""
+    if isinstance(exc, (requests.Timeout, requests.ConnectionError)):
+        return True
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        codigo = exc.response.status_code
+        return codigo == 414 or codigo >= 500
+    # ArcGIS también devuelve {"error": {"code": 500}} con HTTP 200
+    if isinstance(exc, ErrorAPI) and exc.codigo is not None:
+        return exc.codigo == 414 or exc.codigo >= 500
+    return False
+
+
+class ControladorLote:
+    """Controlador AIMD del tamaño de lote, seguro entre hilos.
+
+    Parameters
+    ----------
+    inicial, minimo, maximo : int
+        Tamaño inicial y cotas. ``maximo`` no debe superar el
+        ``maxRecordCount`` del servicio.
+    incremento : int
+        Aumento aditivo tras ``ventana`` éxitos sanos consecutivos.
+    factor : float
+        Factor multiplicativo de reducción ante un error de capacidad.
+    latencia_objetivo : float
+        Segundos por petición por encima de los cuales no se crece.
+    """
+
+    def __init__(self, inicial=1000, minimo=50, maximo=2000, incremento=100,
+                 factor=0.5, latencia_objetivo=15.0, ventana=4):
+        self.minimo = minimo
+        self.maximo = max(minimo, maximo)
+        self.incremento = incremento
+        self.factor = factor
+        self.latencia_objetivo = latencia_objetivo
+        self.ventana = ventana
+        self._tamano = min(max(inicial, minimo), self.maximo)
+        self._exitos = 0
+        self._lock = threading.Lock()
+
+    @property
+    def tamano(self):
+        return self._tamano
+
+    def registrar_exito(self, latencia):
+        """Anota una petición correcta y su latencia en segundos."""
+        with self._lock:
+            if latencia > self.latencia_objetivo:
+                self._exitos = 0
+                return self._tamano
+            self._exitos += 1
+            if self._exitos >= self.ventana:
+                self._exitos = 0
+                self._tamano = min(self.maximo, self._tamano + self.incremento)
+            return self._tamano
+
+    def limitar(self, maximo):
+        """Baja el tope (p. ej. al ``maxRecordCount`` sondeado de la capa)."""
+        with self._lock:
+            self.maximo = max(self.minimo, min(self.maximo, maximo))
+            self._tamano = min(self._tamano, self.maximo)
+            return self.maximo
+
+    def registrar_fallo(self):
+        """Reduce el tamaño tras un error de capacidad."""
+        with self._lock:
+            self._exitos = 0
+            self._tamano = max(self.minimo, int(self._tamano * self.factor))
+            return self._tamano
+
+    def __repr__(self):
+        return f"ControladorLote(tamano={self._tamano}, min={self.minimo}, max={self.maximo})"
@@ -0,0 +1,296 @@
+"""Salida de la ingesta como Parquet particionado al estilo Hive (``anio=/mes=``).
+
+El dataset queda en ``<out_dir>/denuncias/anio=<año>/mes=<mes>/<etiqueta>.parquet``:
+una carpeta por mes del hecho (``anio=0/mes=0`` si el registro no tiene
+fecha) y, dentro, un archivo por partición de la ingesta. Los tipos son los
+de la capa (``CapacidadesCapa.campos``) y no los que adivina un CSV:
+
+- ``fecha_hora_hecho`` como ``timestamp[ms]`` (entero int64 de epoch en el archivo)
+  y sus derivados enteros (``fechas.py``) en int32/int8.
+- coordenadas en ``float32``.
+- textos con codificación de diccionario (departamento, tipo, turno... se
+  repiten millones de veces).
+
+Los parciales CSV del checkpoint se leen de uno en uno y se acumulan por mes
+hasta ``FILAS_POR_GRUPO`` filas antes de escribir cada row group, así que en
+memoria nunca está la partición completa. Requiere ``pyarrow``; sin él la
+ingesta vuelve a escribir el CSV.
+"""
+import os
+import glob
+from datetime import datetime
+
+import pandas as pd
+
+from data_collection.fechas import CAMPO_DIA, CAMPO_DIA_SEMANA, CAMPO_FECHA, CAMPO_HORA
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow es opcional: sin él solo hay salida CSV
+    pa = pc = pq = None
+
+PARQUET_SUBDIR = "denuncias"
+COLUMNAS_PARTICION = ("anio", "mes")
+CAMPO_OID = "objectid"
+# Respaldo de la partición si falta la fecha (año_hecho normalizado es "ano_hecho")
+CAMPOS_ANIO = ("ano_hecho", "anio_hecho")
+CAMPO_MES = "mes_hecho"
+COORDENADAS = ("lat", "lon", "lat_hecho", "long_hecho")
+# Texto de fecha/hora de parciales anteriores a fechas.py: en Parquet basta el timestamp
+DERIVADAS = ("fecha_hecho", "hora_hecho")
+# Filas por row group (se acumulan por mes antes de escribir)
+FILAS_POR_GRUPO = 128_000
+COMPRESION = "zstd"
+SEPARADOR_DELTA = "__delta_"
+
+
+def disponible():
+    return pa is not None
+
+
+def _tipo_esri(tipo):
+    if tipo in ("esriFieldTypeOID", "esriFieldTypeInteger", "esriFieldTypeSmallInteger",
+                "esriFieldTypeBigInteger"):
+        return pa.int64()
+    if tipo == "esriFieldTypeDouble":
+        return pa.float64()
+    if tipo == "esriFieldTypeSingle":
+        return pa.float32()
+    if tipo == "esriFieldTypeDate":
+        return pa.timestamp("ms")
+    if tipo in ("esriFieldTypeString", "esriFieldTypeGUID", "esriFieldTypeGlobalID"):
+        return pa.dictionary(pa.int32(), pa.string())
+    return None
+
+
+def tipos_columnas(tipos_esri=None):
+    """``{columna normalizada: tipo esri}`` -> ``{columna: tipo Arrow}``.
+
+    Sin tipos de la capa (no se pudo sondear), solo se fijan el timestamp y
+    las coordenadas; el resto se infiere del primer parcial.
+    """
+    tipos = {}
+    for nombre, tipo in (tipos_esri or {}).items():
+        tipo_arrow = _tipo_esri(tipo)
+        if tipo_arrow is not None:
+            tipos[nombre] = tipo_arrow
+    tipos[CAMPO_FECHA] = pa.timestamp("ms")
+    tipos[CAMPO_OID] = pa.int64()
+    tipos[CAMPO_DIA] = pa.int32()
+    tipos[CAMPO_HORA] = pa.int8()
+    tipos[CAMPO_DIA_SEMANA] = pa.int8()
+    for nombre in COORDENADAS:
+        tipos[nombre] = pa.float32()
+    return tipos
+
+
+def _es_texto(tipo):
+    return pa.types.is_dictionary(tipo) or pa.types.is_string(tipo)
+
+
+def _columna(serie, tipo):
+    if tipo is None:
+        if serie.isna().all():
+            tipo = pa.dictionary(pa.int32(), pa.string())
+        elif serie.dtype == object:
+            return pa.array(serie.astype("string"), type=pa.string(), from_pandas=True).dictionary_encode()
+        else:
+            return pa.array(serie, from_pandas=True)
+    if pa.types.is_timestamp(tipo):
+        if not pd.api.types.is_datetime64_any_dtype(serie):
+            serie = pd.to_datetime(serie, errors="coerce")
+        return pa.array(serie, from_pandas=True).cast(tipo)
+    if _es_texto(tipo):
+        return pa.array(serie.astype("string"), type=pa.string(), from_pandas=True).dictionary_encode()
+    if serie.dtype == object:
+        serie = pd.to_numeric(serie, errors="coerce")
+    return pa.array(serie, from_pandas=True).cast(tipo)
+
+
+def a_tabla(df, tipos):
+    """DataFrame normalizado por la ingesta -> ``pa.Table`` con los tipos de la capa y ``anio``/``mes``."""
+    df = df.drop(columns=[c for c in DERIVADAS if c in df.columns])
+    arrays = {nombre: _columna(df[nombre], tipos.get(nombre)) for nombre in df.columns}
+    anio, mes = _anio_mes(df)
+    arrays["anio"] = pa.array(anio, type=pa.int16())
+    arrays["mes"] = pa.array(mes, type=pa.int8())
+    return pa.table(arrays)
+
+
+def _anio_mes(df):
+    """Año y mes de partición: los de ``fecha_hora_hecho``, o los campos ``año``/``mes`` del hecho.
+
+    Sin ninguno de los dos, la fila va a ``anio=0/mes=0``.
+    """
+    nulos = pd.Series(float("nan"), index=df.index)
+    fecha = pd.to_datetime(df[CAMPO_FECHA], errors="coerce") if CAMPO_FECHA in df.columns else None
+    anio = fecha.dt.year if fecha is not None else nulos
+    mes = fecha.dt.month if fecha is not None else nulos
+    for nombre in CAMPOS_ANIO:
+        if nombre in df.columns:
+            anio = anio.fillna(pd.to_numeric(df[nombre], errors="coerce"))
+    if CAMPO_MES in df.columns:
+        mes = mes.fillna(pd.to_numeric(df[CAMPO_MES], errors="coerce"))
+    return anio.fillna(0).astype("int64").to_numpy(), mes.fillna(0).astype("int64").to_numpy()
+
+
+def _alinear(tabla, esquema):
+    """Columnas y tipos de ``tabla`` iguales a los del archivo que ya se está escribiendo."""
+    columnas = []
+    for campo in esquema:
+        if campo.name in tabla.column_names:
+            columna = tabla.column(campo.name)
+            if not columna.type.equals(campo.type):
+                columna = columna.cast(campo.type)
+        else:
+            columna = pa.nulls(len(tabla), campo.type)
+        columnas.append(columna)
+    return pa.Table.from_arrays(columnas, schema=esquema)
+
+
+def _carpeta(raiz, anio, mes):
+    return os.path.join(raiz, f"anio={anio}", f"mes={mes}")
+
+
+def archivos(raiz, etiqueta):
+    """Archivos Parquet de una partición de la ingesta (la descarga completa y sus deltas)."""
+    base = os.path.join(glob.escape(raiz), "anio=*", "mes=*", glob.escape(etiqueta))
+    return sorted(glob.glob(base + ".parquet") + glob.glob(base + SEPARADOR_DELTA + "*.parquet"))
+
+
+def existe(raiz, etiqueta):
+    return bool(archivos(raiz, etiqueta))
+
+
+def ids_existentes(raiz, etiqueta):
+    """objectIds ya guardados para la partición (solo se lee esa columna)."""
+    ids = set()
+    for ruta in archivos(raiz, etiqueta):
+        ids.update(pq.read_table(ruta, columns=[CAMPO_OID]).column(CAMPO_OID).to_pylist())
+    return ids
+
+
+def eliminar(raiz, etiqueta):
+    """Borra los archivos de la partición (antes de reescribirla completa)."""
+    for ruta in archivos(raiz, etiqueta):
+        os.remove(ruta)
+
+
+def quitar_ids(rutas, ids, columna_id=CAMPO_OID):
+    """Reescribe los archivos de ``rutas`` sin las filas de ``ids``; borra los que quedan vacíos.
+
+    Solo se reescriben los archivos que contienen alguno de los IDs.
+    """
+    valores = pa.array(sorted(int(i) for i in ids), type=pa.int64())
+    for ruta in rutas:
+        mascara = pc.is_in(pq.read_table(ruta, columns=[columna_id]).column(columna_id), value_set=valores)
+        if not pc.any(mascara).as_py():
+            continue
+        tabla = pq.read_table(ruta).filter(pc.invert(mascara))
+        if len(tabla) == 0:
+            os.remove(ruta)
+            continue
+        pq.write_table(tabla, ruta + ".tmp", compression=COMPRESION)
+        os.replace(ruta + ".tmp", ruta)
+
+
+class EscritorParquet:
+    """Un ``ParquetWriter`` por mes, alimentado lote a lote.
+
+    Los archivos se escriben como ``.tmp`` y solo se renombran en ``cerrar``:
+    un corte a mitad no deja un mes a medio escribir con el nombre final.
+    """
+
+    def __init__(self, raiz, nombre, tipos=None, filas_por_grupo=FILAS_POR_GRUPO):
+        self.raiz = raiz
+        self.nombre = nombre
+        self.tipos = tipos or tipos_columnas()
+        self.filas_por_grupo = filas_por_grupo
+        self.filas = 0
+        self._escritores = {}
+        self._pendientes = {}
+
+    def escribir(self, df):
+        if df.empty:
+            return 0
+        tabla = a_tabla(df, self.tipos)
+        claves = pd.DataFrame({"anio": tabla.column("anio").to_pandas(),
+                               "mes": tabla.column("mes").to_pandas()})
+        for (anio, mes), indices in claves.groupby(["anio", "mes"]).indices.items():
+            anio, mes = int(anio), int(mes)
+            parte = tabla.take(indices).drop_columns(list(COLUMNAS_PARTICION))
+            grupo = self._pendientes.setdefault((anio, mes), [])
+            grupo.append(parte)
+            if sum(len(t) for t in grupo) >= self.filas_por_grupo:
+                self._vaciar((anio, mes))
+        self.filas += len(tabla)
+        return len(tabla)
+
+    def _vaciar(self, clave):
+        tablas = self._pendientes.pop(clave, [])
+        if not tablas:
+            return
+        escritor = self._escritores.get(clave)
+        if escritor is None:
+            carpeta = _carpeta(self.raiz, *clave)
+            os.makedirs(carpeta, exist_ok=True)
+            escritor = pq.ParquetWriter(self._ruta(clave) + ".tmp", tablas[0].schema, compression=COMPRESION)
+            self._escritores[clave] = escritor
+        tabla = pa.concat_tables([_alinear(t, escritor.schema) for t in tablas])
+        escritor.write_table(tabla)
+
+    def cerrar(self):
+        """Escribe lo acumulado y publica los archivos; devuelve las rutas escritas."""
+        for clave in list(self._pendientes):
+            self._vaciar(clave)
+        rutas = []
+        for clave, escritor in self._escritores.items():
+            escritor.close()
+            os.replace(self._ruta(clave) + ".tmp", self._ruta(clave))
+            rutas.append(self._ruta(clave))
+        self._escritores = {}
+        return rutas
+
+    def abortar(self):
+        """Descarta los archivos a medio escribir."""
+        for clave, escritor in self._escritores.items():
+            escritor.close()
+            os.remove(self._ruta(clave) + ".tmp")
+        self._escritores, self._pendientes = {}, {}
+
+    def _ruta(self, clave):
+        return os.path.join(_carpeta(self.raiz, *clave), f"{self.nombre}.parquet")
+
+
+def unir_partes_parquet(partes, raiz, etiqueta, tipos=None, anexar=False, reemplazar_ids=None,
+                        columna_id=CAMPO_OID):
+    """Une los parciales CSV del checkpoint en el dataset Parquet particionado.
+
+    Sin ``anexar`` se reemplazan los archivos previos de la etiqueta; con
+    ``anexar`` se escribe un archivo delta al lado de ellos. Con
+    ``reemplazar_ids`` (registros ya guardados que se volvieron a descargar
+    corregidos), después de publicar el delta esos IDs se quitan de los
+    archivos previos: un corte entre los dos pasos deja el registro
+    duplicado, nunca perdido. Devuelve el número de filas escritas.
+    """
+    tipos = tipos or tipos_columnas()
+    nombre = etiqueta
+    if anexar:
+        nombre = f"{etiqueta}{SEPARADOR_DELTA}{datetime.now():%Y%m%d%H%M%S}"
+    previos = archivos(raiz, etiqueta) if anexar and reemplazar_ids else []
+    texto = {c: "string" for c, t in tipos.items() if _es_texto(t)}
+    escritor = EscritorParquet(raiz, nombre, tipos)
+    try:
+        for ruta, _ in partes:
+            escritor.escribir(pd.read_csv(ruta, dtype=texto, low_memory=False))
+    except BaseException:
+        escritor.abortar()
+        raise
+    if not anexar:
+        eliminar(raiz, etiqueta)
+    escritor.cerrar()
+    if previos:
+        quitar_ids(previos, reemplazar_ids, columna_id)
+    return escritor.filas
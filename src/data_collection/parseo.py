@@ -0,0 +1,167 @@
+"""Parseo columnar (sin geometrías) de las respuestas de ``MapServer/0/query``.
+
+La ingesta solo necesita los atributos más ``lat``/``lon``, así que no se
+construye un ``Point`` de shapely por registro ni un GeoDataFrame: el cuerpo
+de la respuesta se decodifica (con ``orjson`` si está instalado) y se vuelca
+directamente a arrays de NumPy por columna. pyproj solo se importa si el
+servidor responde en un sistema de referencia distinto de WGS84.
+
+Las respuestas ``f=pbf`` (protocol buffers) ya llegan por columnas desde
+``pbf.decodificar_features``.
+"""
+import json
+import functools
+
+import numpy as np
+import pandas as pd
+
+from data_collection.pbf import decodificar_features
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # orjson es opcional
+    _loads = json.loads
+
+WGS84 = 4326
+
+
+class ErrorAPI(RuntimeError):
+    """Error en el cuerpo JSON (``{"error": {"code": ...}}``), a veces con HTTP 200."""
+
+    def __init__(self, error):
+        super().__init__(f"Error de la API: {error}")
+        self.error = error
+        try:
+            self.codigo = int(error.get("code"))
+        except (AttributeError, TypeError, ValueError):
+            self.codigo = None
+
+
+class FormatoNoSoportado(ErrorAPI):
+    """El servidor no acepta el formato pedido (p. ej. ``f=pbf`` en versiones antiguas)."""
+
+# Fragmentos del mensaje de error que indican un rechazo del parámetro ``f``
+_SENALES_DE_FORMATO = ("format", "pbf", "'f'", '"f"')
+
+# Tipos esri que se pueden volcar a float64 (None -> NaN)
+_TIPOS_FLOAT = {"esriFieldTypeDouble", "esriFieldTypeSingle"}
+# Tipos enteros: int64 si no hay nulos; si los hay, float64 (como haría pandas)
+_TIPOS_ENTEROS = {
+    "esriFieldTypeOID", "esriFieldTypeInteger", "esriFieldTypeSmallInteger",
+    "esriFieldTypeDate", "esriFieldTypeBigInteger",
+}
+
+
+def decodificar(contenido):
+    """bytes/str -> dict. Lanza ``ValueError`` si el servidor devolvió HTML."""
+    if isinstance(contenido, str):
+        contenido = contenido.encode("utf-8")
+    if contenido.lstrip()[:1] == b"<":
+        raise ValueError("Respuesta inesperada (HTML) en lugar de JSON")
+    data = _loads(contenido)
+    if "error" in data:
+        raise ErrorAPI(data["error"])
+    return data
+
+
+def rechaza_formato(error):
+    """True si el ``error`` de la API dice explícitamente que el formato no se acepta."""
+    if not isinstance(error, dict):
+        return False
+    texto = " ".join([str(error.get("message") or "")] + [str(d) for d in error.get("details") or []])
+    return any(senal in texto.lower() for senal in _SENALES_DE_FORMATO)
+
+
+@functools.lru_cache(maxsize=None)
+def _transformador(wkid):
+    from pyproj import Transformer
+    return Transformer.from_crs(wkid, WGS84, always_xy=True)
+
+
+def _columna(valores, tipo=None):
+    if tipo in _TIPOS_FLOAT:
+        return np.array(valores, dtype="float64")
+    if tipo in _TIPOS_ENTEROS:
+        if any(v is None for v in valores):
+            return np.array(valores, dtype="float64")
+        return np.array(valores, dtype="int64")
+    return valores
+
+
+def _a_dataframe(atributos, campos, xs, ys, wkid=WGS84):
+    """Lista de dicts de atributos + coordenadas -> DataFrame columnar."""
+    nombres = list(campos) if campos else list(dict.fromkeys(k for a in atributos for k in a))
+    valores = {nombre: [a.get(nombre) for a in atributos] for nombre in nombres}
+    return _columnas_a_dataframe(valores, campos, xs, ys, wkid)
+
+
+def _columnas_a_dataframe(valores, campos, xs, ys, wkid=WGS84):
+    """Listas de valores por columna + coordenadas -> DataFrame con ``lat``/``lon``."""
+    columnas = {nombre: _columna(lista, campos.get(nombre)) for nombre, lista in valores.items()}
+    x = np.array(xs, dtype="float64")
+    y = np.array(ys, dtype="float64")
+    if wkid not in (None, WGS84):
+        x, y = _transformador(wkid).transform(x, y)
+    columnas["lon"] = x
+    columnas["lat"] = y
+    return pd.DataFrame(columnas)
+
+
+def esrijson_a_columnas(contenido):
+    """Respuesta ``f=json`` -> DataFrame con atributos, ``lat`` y ``lon``."""
+    data = decodificar(contenido)
+    features = data.get("features") or []
+    if not features:
+        return pd.DataFrame()
+    sr = data.get("spatialReference") or {}
+    wkid = sr.get("latestWkid") or sr.get("wkid") or WGS84
+    campos = {c["name"]: c.get("type") for c in data.get("fields") or []}
+
+    atributos, xs, ys = [], [], []
+    for f in features:
+        g = f.get("geometry") or {}
+        xs.append(g.get("x"))
+        ys.append(g.get("y"))
+        atributos.append(f.get("attributes") or {})
+    return _a_dataframe(atributos, campos, xs, ys, wkid)
+
+
+def geojson_a_columnas(contenido):
+    """Respuesta ``f=geojson`` (siempre WGS84) -> DataFrame con atributos, ``lat`` y ``lon``."""
+    data = decodificar(contenido)
+    features = data.get("features") or []
+    if not features:
+        return pd.DataFrame()
+
+    atributos, xs, ys = [], [], []
+    for f in features:
+        coords = (f.get("geometry") or {}).get("coordinates") or (None, None)
+        xs.append(coords[0])
+        ys.append(coords[1])
+        atributos.append(f.get("properties") or {})
+    return _a_dataframe(atributos, {}, xs, ys)
+
+
+def pbf_a_columnas(contenido):
+    """Respuesta ``f=pbf`` -> DataFrame con atributos, ``lat`` y ``lon``.
+
+    Si el servidor contesta con JSON se lanza ``FormatoNoSoportado`` solo
+    cuando está claro que no entiende ``f=pbf`` (un error que lo dice, o un
+    cuerpo JSON sin error en lugar de PBF); cualquier otro error de la API es
+    ``ErrorAPI`` y una página HTML sigue siendo ``ValueError``.
+    """
+    inicio = bytes(contenido[:64]).lstrip()[:1]
+    if inicio == b"{":
+        data = _loads(contenido)
+        error = data.get("error")
+        if error is None or rechaza_formato(error):
+            raise FormatoNoSoportado(error if error is not None else "respuesta JSON en lugar de PBF")
+        raise ErrorAPI(error)
+    if inicio == b"<":
+        raise ValueError("Respuesta inesperada (HTML) en lugar de PBF")
+    data = decodificar_features(contenido)
+    if not data["x"]:
+        return pd.DataFrame()
+    return _columnas_a_dataframe(data["columnas"], data["campos"], data["x"], data["y"],
+                                 data["wkid"] or WGS84)
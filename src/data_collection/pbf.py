@@ -0,0 +1,222 @@
+"""Decodificador mínimo de ``f=pbf`` (esriPBuffer ``FeatureCollectionPBuffer``).
+
+El servicio puede responder las consultas en protocol buffers: bastante más
+compacto que GeoJSON/esriJSON y sin texto que decodificar. Solo se lee lo
+que usa la ingesta (campos, atributos, geometrías de punto, sistema de
+referencia, ``exceededTransferLimit``), directamente del formato de cable,
+sin depender de ``protobuf`` ni de un ``.proto`` compilado.
+
+Esquema (extracto de ``FeatureCollection.proto``)::
+
+    FeatureCollectionPBuffer { 2: QueryResult }
+    QueryResult              { 1: FeatureResult }
+    FeatureResult            { 8: SpatialReference, 9: exceededTransferLimit,
+                               12: Transform, 13: Field*, 15: Feature* }
+    Field                    { 1: name, 2: fieldType }
+    Feature                  { 1: Value*, 2: Geometry }
+    Geometry                 { 2: lengths (packed), 3: coords (packed sint64) }
+    Transform                { 1: quantizeOriginPostion, 2: Scale, 3: Translate }
+"""
+import struct
+
+# esriPBuffer.FieldType -> tipo esri (mismos nombres que en esriJSON)
+TIPOS_CAMPO = {
+    0: "esriFieldTypeSmallInteger", 1: "esriFieldTypeInteger", 2: "esriFieldTypeSingle",
+    3: "esriFieldTypeDouble", 4: "esriFieldTypeString", 5: "esriFieldTypeDate",
+    6: "esriFieldTypeOID", 7: "esriFieldTypeGeometry", 8: "esriFieldTypeBlob",
+    9: "esriFieldTypeRaster", 10: "esriFieldTypeGUID", 11: "esriFieldTypeGlobalID",
+    12: "esriFieldTypeXML",
+}
+ORIGEN_SUPERIOR_IZQUIERDO = 0
+
+_DOUBLE = struct.Struct("<d")
+_FLOAT = struct.Struct("<f")
+
+
+def _varint(buf, pos):
+    resultado = desplazamiento = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        resultado |= (b & 0x7F) << desplazamiento
+        if b < 0x80:
+            return resultado, pos
+        desplazamiento += 7
+
+
+def _zigzag(n):
+    return (n >> 1) ^ -(n & 1)
+
+
+def _campos(buf, inicio=0, fin=None):
+    """Itera ``(número, tipo_cable, valor)``; los length-delimited dan ``(inicio, fin)``."""
+    pos = inicio
+    fin = len(buf) if fin is None else fin
+    while pos < fin:
+        clave, pos = _varint(buf, pos)
+        tipo = clave & 7
+        if tipo == 0:
+            valor, pos = _varint(buf, pos)
+        elif tipo == 2:
+            largo, pos = _varint(buf, pos)
+            valor = (pos, pos + largo)
+            pos += largo
+        elif tipo == 1:
+            valor = (pos, pos + 8)
+            pos += 8
+        elif tipo == 5:
+            valor = (pos, pos + 4)
+            pos += 4
+        else:
+            raise ValueError(f"Tipo de cable protobuf no soportado: {tipo}")
+        yield clave >> 3, tipo, valor
+
+
+def _submensaje(buf, numero_buscado, inicio=0, fin=None):
+    for numero, tipo, valor in _campos(buf, inicio, fin):
+        if numero == numero_buscado and tipo == 2:
+            return valor
+    return None
+
+
+def _valor(buf, inicio, fin):
+    """``esriPBuffer.Value`` -> objeto Python (mensaje vacío = nulo)."""
+    if inicio >= fin:
+        return None
+    clave = buf[inicio]
+    numero, tipo = clave >> 3, clave & 7
+    if tipo == 2:
+        largo, pos = _varint(buf, inicio + 1)
+        return buf[pos:pos + largo].decode("utf-8") if numero == 1 else None
+    if tipo == 1:
+        return _DOUBLE.unpack_from(buf, inicio + 1)[0] if numero == 3 else None
+    if tipo == 5:
+        return _FLOAT.unpack_from(buf, inicio + 1)[0] if numero == 2 else None
+    v, _ = _varint(buf, inicio + 1)
+    if numero in (4, 8):
+        return _zigzag(v)
+    if numero == 6:
+        return v - (1 << 64) if v >= 1 << 63 else v
+    if numero in (5, 7):
+        return v
+    if numero == 9:
+        return bool(v)
+    return None
+
+
+def _enteros_empaquetados(buf, tipo, valor):
+    if tipo == 0:
+        return [valor]
+    inicio, fin = valor
+    numeros = []
+    while inicio < fin:
+        n, inicio = _varint(buf, inicio)
+        numeros.append(n)
+    return numeros
+
+
+def _doubles(buf, inicio, fin):
+    return {numero: _DOUBLE.unpack_from(buf, v[0])[0]
+            for numero, tipo, v in _campos(buf, inicio, fin) if tipo == 1}
+
+
+def _feature(buf, pos, fin, n_campos):
+    """``esriPBuffer.Feature`` -> ``(valores, coords)``.
+
+    Es el bucle caliente del decodificador (una vez por registro): las claves y
+    largos de un byte, que son casi todos, se leen sin llamar a ``_varint``.
+    """
+    fila = []
+    coords = []
+    while pos < fin:
+        clave = buf[pos]
+        pos += 1
+        if clave >= 0x80:
+            clave, pos = _varint(buf, pos - 1)
+        tipo = clave & 7
+        if tipo != 2:
+            # Campos escalares de Feature que no usamos
+            if tipo == 0:
+                _, pos = _varint(buf, pos)
+            else:
+                pos += 8 if tipo == 1 else 4
+            continue
+        largo = buf[pos]
+        pos += 1
+        if largo >= 0x80:
+            largo, pos = _varint(buf, pos - 1)
+        fin_sub = pos + largo
+        numero = clave >> 3
+        if numero == 1:
+            fila.append(_valor(buf, pos, fin_sub))
+        elif numero == 2:
+            for n_g, t_g, vg in _campos(buf, pos, fin_sub):
+                if n_g == 3:
+                    coords.extend(_zigzag(c) for c in _enteros_empaquetados(buf, t_g, vg))
+        pos = fin_sub
+    if len(fila) < n_campos:
+        fila.extend([None] * (n_campos - len(fila)))
+    return fila, coords
+
+
+def decodificar_features(contenido):
+    """Respuesta ``f=pbf`` -> diccionario columnar.
+
+    Devuelve ``{"campos": {nombre: tipo_esri}, "columnas": {nombre: [valores]},
+    "x": [...], "y": [...], "wkid": int, "excedido": bool}``.
+    """
+    buf = bytes(contenido)
+    resultado = _submensaje(buf, 2)
+    features = _submensaje(buf, 1, *resultado) if resultado else None
+    salida = {"campos": {}, "columnas": {}, "x": [], "y": [], "wkid": None, "excedido": False}
+    if features is None:
+        return salida
+
+    nombres = []
+    escala, traslado, origen = (1.0, 1.0), (0.0, 0.0), ORIGEN_SUPERIOR_IZQUIERDO
+    cuerpos = []
+    for numero, tipo, v in _campos(buf, *features):
+        if numero == 13:
+            nombre, tipo_campo = None, None
+            for n_campo, _, vc in _campos(buf, *v):
+                if n_campo == 1:
+                    nombre = buf[vc[0]:vc[1]].decode("utf-8")
+                elif n_campo == 2:
+                    tipo_campo = TIPOS_CAMPO.get(vc)
+            nombres.append(nombre)
+            salida["campos"][nombre] = tipo_campo
+        elif numero == 15:
+            cuerpos.append(v)
+        elif numero == 8:
+            sr = {n: vs for n, t, vs in _campos(buf, *v) if t == 0}
+            salida["wkid"] = sr.get(2) or sr.get(1)
+        elif numero == 9:
+            salida["excedido"] = bool(v)
+        elif numero == 12:
+            for n_t, t_t, vt in _campos(buf, *v):
+                if n_t == 1 and t_t == 0:
+                    origen = vt
+                elif n_t == 2:
+                    d = _doubles(buf, *vt)
+                    escala = (d.get(1, 1.0), d.get(2, 1.0))
+                elif n_t == 3:
+                    d = _doubles(buf, *vt)
+                    traslado = (d.get(1, 0.0), d.get(2, 0.0))
+
+    columnas = [[] for _ in nombres]
+    xs, ys = salida["x"], salida["y"]
+    n_campos = len(nombres)
+    for inicio, fin in cuerpos:
+        fila, coords = _feature(buf, inicio, fin, n_campos)
+        for columna, valor in zip(columnas, fila):
+            columna.append(valor)
+        if len(coords) >= 2:
+            xs.append(coords[0] * escala[0] + traslado[0])
+            ys.append(traslado[1] - coords[1] * escala[1] if origen == ORIGEN_SUPERIOR_IZQUIERDO
+                      else coords[1] * escala[1] + traslado[1])
+        else:
+            xs.append(None)
+            ys.append(None)
+
+    salida["columnas"] = dict(zip(nombres, columnas))
+    return salida
@@ -0,0 +1,48 @@
+"""Perfiles de campos (``outFields``) de la ingesta, declarados en ``config/config.yaml``.
+
+Cada perfil es ``"*"`` o una lista de campos del servicio. Pedir solo los
+campos que usa el resto del pipeline reduce el tamaño de cada respuesta, el
+tiempo de parseo y lo que se escribe a disco: las columnas fuera del perfil
+nunca llegan a descargarse.
+"""
+import os
+
+import yaml
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+CONFIG_PATH = os.path.join(BASE_DIR, 'config', 'config.yaml')
+
+TODOS_LOS_CAMPOS = "*"
+# Campos que la ingesta necesita siempre (checkpoint, deduplicación, fecha/hora)
+CAMPOS_OBLIGATORIOS = ["objectid", "fecha_hora_hecho"]
+
+
+def _config_ingesta(ruta=CONFIG_PATH):
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, encoding="utf-8") as f:
+        return (yaml.safe_load(f) or {}).get("ingesta") or {}
+
+
+def perfiles_disponibles(ruta=CONFIG_PATH):
+    return sorted((_config_ingesta(ruta).get("perfiles") or {}).keys())
+
+
+def out_fields(perfil=None, ruta=CONFIG_PATH):
+    """Valor de ``outFields`` para el perfil (o el ``perfil_defecto`` del config).
+
+    Sin sección ``ingesta`` en el config se piden todos los campos.
+    """
+    config = _config_ingesta(ruta)
+    perfil = perfil or config.get("perfil_defecto")
+    if perfil is None:
+        return TODOS_LOS_CAMPOS
+    perfiles = config.get("perfiles") or {}
+    if perfil not in perfiles:
+        raise ValueError(f"Perfil de ingesta desconocido: '{perfil}'. "
+                         f"Disponibles: {', '.join(sorted(perfiles)) or 'ninguno'}")
+    campos = perfiles[perfil]
+    if campos == TODOS_LOS_CAMPOS:
+        return TODOS_LOS_CAMPOS
+    faltantes = [c for c in CAMPOS_OBLIGATORIOS if c not in campos]
+    return ",".join(faltantes + list(campos))
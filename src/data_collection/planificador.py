@@ -0,0 +1,201 @@
+"""Planificador de particiones por volumen (``returnCountOnly``).
+
+Los semestres tienen tamaños muy dispares, así que la partición más grande
+marca el tiempo total de la ingesta. El planificador parte del rango de años
+completo, cuenta sus registros con ``returnCountOnly`` y divide
+recursivamente lo que supere el objetivo: primero por años, luego por meses,
+por departamento y, como último recurso, por días. Al final fusiona las
+unidades vecinas pequeñas, así que el resultado son unidades de trabajo de
+tamaño parecido.
+
+El módulo no hace peticiones: recibe la función que cuenta registros para una
+cláusula WHERE (ver ``ingesta.planificar_particiones``).
+"""
+import calendar
+from datetime import datetime, timedelta
+
+# Registros por unidad de trabajo a los que apunta el plan
+OBJETIVO_DEFECTO = 100_000
+# Una unidad no se divide mientras no supere objetivo * TOLERANCIA
+TOLERANCIA = 1.5
+
+# Orden fijo (docs/.../07_diccionario_categoricas.json): las divisiones por
+# departamento son siempre rebanadas contiguas de esta lista
+DEPARTAMENTOS = [
+    "AMAZONAS", "ANCASH", "APURIMAC", "AREQUIPA", "AYACUCHO", "CAJAMARCA",
+    "CALLAO", "CUSCO", "HUANCAVELICA", "HUANUCO", "ICA", "JUNIN",
+    "LA LIBERTAD", "LAMBAYEQUE", "LIMA", "LORETO", "MADRE DE DIOS",
+    "MOQUEGUA", "PASCO", "PIURA", "PUNO", "SAN MARTIN", "TACNA", "TUMBES",
+    "UCAYALI",
+]
+N_DPTOS = len(DEPARTAMENTOS)
+
+
+def _lista_sql(valores):
+    return ", ".join("'" + v.replace("'", "''") + "'" for v in valores)
+
+
+def _rango_sql(campo, ini, fin, completo):
+    if (ini, fin) == completo:
+        return None
+    if ini == fin:
+        return f"{campo} = {ini}"
+    return f"{campo} BETWEEN {ini} AND {fin}"
+
+
+class Unidad:
+    """Unidad de trabajo: rango de años, de meses, de días y de departamentos.
+
+    Los departamentos son la rebanada ``DEPARTAMENTOS[dpto_ini:dpto_fin]``; con
+    ``resto=True`` la unidad incluye además los valores fuera de la lista (o
+    nulos), de modo que las unidades siempre cubren todo el dataset.
+    """
+
+    def __init__(self, anio_ini, anio_fin=None, mes_ini=1, mes_fin=12, dpto_ini=0, dpto_fin=N_DPTOS,
+                 resto=True, dia_ini=1, dia_fin=31):
+        self.anio_ini = anio_ini
+        self.anio_fin = anio_ini if anio_fin is None else anio_fin
+        self.mes_ini, self.mes_fin = mes_ini, mes_fin
+        self.dpto_ini, self.dpto_fin, self.resto = dpto_ini, dpto_fin, resto
+        self.dia_ini, self.dia_fin = dia_ini, dia_fin
+
+    def _campos(self):
+        return (self.anio_ini, self.anio_fin, self.mes_ini, self.mes_fin,
+                self.dpto_ini, self.dpto_fin, self.resto, self.dia_ini, self.dia_fin)
+
+    def __eq__(self, otra):
+        return isinstance(otra, Unidad) and self._campos() == otra._campos()
+
+    def __hash__(self):
+        return hash(self._campos())
+
+    def _con(self, **cambios):
+        campos = dict(anio_ini=self.anio_ini, anio_fin=self.anio_fin, mes_ini=self.mes_ini,
+                      mes_fin=self.mes_fin, dpto_ini=self.dpto_ini, dpto_fin=self.dpto_fin,
+                      resto=self.resto, dia_ini=self.dia_ini, dia_fin=self.dia_fin)
+        campos.update(cambios)
+        return Unidad(**campos)
+
+    @property
+    def todos_los_dptos(self):
+        return self.dpto_ini == 0 and self.dpto_fin == N_DPTOS and self.resto
+
+    @property
+    def where(self):
+        partes = [
+            _rango_sql("año_hecho", self.anio_ini, self.anio_fin, None),
+            _rango_sql("mes_hecho", self.mes_ini, self.mes_fin, (1, 12)),
+            _rango_sql("dia_hecho", self.dia_ini, self.dia_fin, (1, 31)),
+        ]
+        if not self.todos_los_dptos:
+            if self.resto:
+                excluidos = DEPARTAMENTOS[:self.dpto_ini]
+                partes.append(f"(departamento_hecho NOT IN ({_lista_sql(excluidos)}) "
+                              f"OR departamento_hecho IS NULL)")
+            else:
+                incluidos = DEPARTAMENTOS[self.dpto_ini:self.dpto_fin]
+                partes.append(f"departamento_hecho IN ({_lista_sql(incluidos)})")
+        return "(" + " AND ".join(p for p in partes if p) + ")"
+
+    @property
+    def etiqueta(self):
+        etiqueta = str(self.anio_ini)
+        if self.anio_fin != self.anio_ini:
+            etiqueta += f"-{self.anio_fin}"
+        if (self.mes_ini, self.mes_fin) != (1, 12):
+            etiqueta += f"_M{self.mes_ini:02d}" + (f"-{self.mes_fin:02d}" if self.mes_fin != self.mes_ini else "")
+        if not self.todos_los_dptos:
+            if self.resto:
+                etiqueta += f"_DP{self.dpto_ini:02d}+"
+            elif self.dpto_fin - self.dpto_ini == 1:
+                etiqueta += "_" + DEPARTAMENTOS[self.dpto_ini].replace(" ", "-")
+            else:
+                etiqueta += f"_DP{self.dpto_ini:02d}-{self.dpto_fin - 1:02d}"
+        if (self.dia_ini, self.dia_fin) != (1, 31):
+            etiqueta += f"_D{self.dia_ini:02d}" + (f"-{self.dia_fin:02d}" if self.dia_fin != self.dia_ini else "")
+        return etiqueta
+
+    @property
+    def fin(self):
+        """Instante en que cierra el periodo de la unidad (para el TTL de la caché)."""
+        ultimo_dia = min(self.dia_fin, calendar.monthrange(self.anio_fin, self.mes_fin)[1])
+        return datetime(self.anio_fin, self.mes_fin, ultimo_dia) + timedelta(days=1)
+
+    @property
+    def orden(self):
+        return (self.anio_ini, self.mes_ini, self.dpto_ini, self.dia_ini)
+
+    def dividir(self):
+        """Dos mitades por la primera dimensión divisible, o ``[]`` si es indivisible."""
+        if self.anio_fin > self.anio_ini:
+            m = (self.anio_ini + self.anio_fin) // 2
+            return [self._con(anio_fin=m), self._con(anio_ini=m + 1)]
+        if self.mes_fin > self.mes_ini:
+            m = (self.mes_ini + self.mes_fin) // 2
+            return [self._con(mes_fin=m), self._con(mes_ini=m + 1)]
+        if self.resto and self.dpto_fin > self.dpto_ini:
+            m = (self.dpto_ini + self.dpto_fin) // 2
+            if m == self.dpto_ini:
+                m += 1
+            return [self._con(dpto_fin=m, resto=False), self._con(dpto_ini=m)]
+        if not self.resto and self.dpto_fin - self.dpto_ini > 1:
+            m = (self.dpto_ini + self.dpto_fin) // 2
+            return [self._con(dpto_fin=m), self._con(dpto_ini=m)]
+        if self.dia_fin > self.dia_ini:
+            m = (self.dia_ini + self.dia_fin) // 2
+            return [self._con(dia_fin=m), self._con(dia_ini=m + 1)]
+        return []
+
+    def fusionar(self, otra):
+        """Unidad que cubre ``self`` y la siguiente ``otra``, o ``None`` si no son contiguas."""
+        a, b = self, otra
+        iguales = lambda *campos: all(getattr(a, c) == getattr(b, c) for c in campos)
+        if (iguales("mes_ini", "mes_fin", "dpto_ini", "dpto_fin", "resto", "dia_ini", "dia_fin")
+                and a.anio_fin + 1 == b.anio_ini and a.mes_ini == 1 and a.mes_fin == 12
+                and a.todos_los_dptos and (a.dia_ini, a.dia_fin) == (1, 31)):
+            return a._con(anio_fin=b.anio_fin)
+        if (iguales("anio_ini", "anio_fin", "dpto_ini", "dpto_fin", "resto", "dia_ini", "dia_fin")
+                and a.mes_fin + 1 == b.mes_ini and a.todos_los_dptos and (a.dia_ini, a.dia_fin) == (1, 31)):
+            return a._con(mes_fin=b.mes_fin)
+        if (iguales("anio_ini", "anio_fin", "mes_ini", "mes_fin", "dia_ini", "dia_fin")
+                and not a.resto and a.dpto_fin == b.dpto_ini and (a.dia_ini, a.dia_fin) == (1, 31)):
+            return a._con(dpto_fin=b.dpto_fin, resto=b.resto)
+        if (iguales("anio_ini", "anio_fin", "mes_ini", "mes_fin", "dpto_ini", "dpto_fin", "resto")
+                and a.dia_fin + 1 == b.dia_ini):
+            return a._con(dia_fin=b.dia_fin)
+        return None
+
+    def __repr__(self):
+        return f"Unidad({self.etiqueta})"
+
+
+def planificar(contar, unidades, objetivo=OBJETIVO_DEFECTO, tolerancia=TOLERANCIA, mapear=map):
+    """Divide y fusiona ``unidades`` hasta unidades de ~``objetivo`` registros.
+
+    ``contar(where) -> int`` hace el ``returnCountOnly``; ``mapear`` permite
+    contar en paralelo cada nivel de la división (p. ej. ``executor.map``).
+    Devuelve una lista ordenada de ``(unidad, registros)`` sin unidades vacías.
+    """
+    hojas = []
+    nivel = list(unidades)
+    while nivel:
+        conteos = list(mapear(contar, [u.where for u in nivel]))
+        siguiente = []
+        for unidad, n in zip(nivel, conteos):
+            hijos = unidad.dividir() if n > objetivo * tolerancia else []
+            if hijos:
+                siguiente.extend(hijos)
+            else:
+                hojas.append((unidad, n))
+        nivel = siguiente
+
+    plan = []
+    for unidad, n in sorted(hojas, key=lambda h: h[0].orden):
+        if plan:
+            previa, n_previa = plan[-1]
+            fusion = previa.fusionar(unidad)
+            if fusion is not None and n_previa + n <= objetivo:
+                plan[-1] = (fusion, n_previa + n)
+                continue
+        plan.append((unidad, n))
+    return [(u, n) for u, n in plan if n > 0]
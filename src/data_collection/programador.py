@@ -0,0 +1,365 @@
+"""Programador global de la descarga por cursores keyset (scripts v1) en un solo proceso.
+
+``ejecutar_todos.py`` lanzaba un ``ProcessPoolExecutor`` cuyos workers abrían
+cada ``codigo_<año>_S<n>.py`` con ``subprocess``, reimprimían su salida línea
+a línea y estimaban el avance contando CSV cada 15 s: dos capas de procesos
+por periodo. Aquí todas las tareas (periodo, tramo de tiempo) salen de una
+sola cola dentro de un event loop:
+
+- la red va en corrutinas (``requests`` es bloqueante, así que cada petición
+  corre en un pool de hilos, con el limitador de tasa compartido);
+- el parseo de cada página (esriJSON -> filas normalizadas), que es CPU, va a
+  un pool de procesos;
+- cada página, tramo y periodo terminado se publica en una cola de eventos,
+  de la que sale el progreso; nada se sondea;
+- un worker que se queda sin tareas roba la mitad pendiente del tramo en
+  curso al que más le falta, así ningún periodo largo queda solo al final.
+
+Las páginas se escriben como parciales en cuanto llegan y se unen en
+``denuncias_<año>_S<n>.csv`` cuando termina el periodo. Cada página queda
+anotada en el manifiesto del periodo (``CheckpointTramos``), así que una
+ejecución cortada o un periodo con errores se reanuda desde los huecos que
+faltan. Los campos pedidos salen del perfil de ingesta (``perfiles.py``).
+"""
+import os
+import time
+import shutil
+import asyncio
+import functools
+import collections
+import multiprocessing
+import concurrent.futures
+from datetime import datetime
+
+import pandas as pd
+import requests
+
+from data_collection import ingesta
+from data_collection.checkpoint import CheckpointTramos
+from data_collection.cursores import (
+    CAMPO_FECHA, CAMPO_OID, N_CURSORES, ORDEN, _texto, avanzar, rangos, where_rango,
+)
+from data_collection.escritura import unir_partes
+from data_collection.limites import LimitadorTasa, PoliticaReintentos, TASA_DEFECTO
+from data_collection.parseo import esrijson_a_columnas
+from data_collection.perfiles import TODOS_LOS_CAMPOS, out_fields as out_fields_de_perfil
+
+PAGE_SIZE = 1000
+# Peticiones simultáneas (una por worker)
+MAX_CONCURRENCIA = 12
+# Cada mitad de un tramo robado cubre al menos esto (cada robo cuesta al
+# menos una petición más: la página vacía que cierra el tramo nuevo)
+MIN_MS_ROBO = 24 * 3600 * 1000
+PARTES_SUBDIR = "_partes_v1"
+
+
+class Periodo:
+    """Intervalo ``[desde_ms, hasta_ms]`` de ``fecha_hora_hecho`` que termina en un CSV."""
+
+    def __init__(self, etiqueta, desde_ms, hasta_ms):
+        self.etiqueta = etiqueta
+        self.desde_ms = desde_ms
+        self.hasta_ms = hasta_ms
+        self.tramos_activos = 0
+        self.filas = 0
+        self.fallido = False
+        self.checkpoint = None
+
+    @property
+    def nombre_csv(self):
+        return f"denuncias_{self.etiqueta}.csv"
+
+    def __repr__(self):
+        return f"Periodo({self.etiqueta!r}, {_texto(self.desde_ms)} - {_texto(self.hasta_ms)})"
+
+
+def _ms(texto):
+    return pd.Timestamp(texto).value // 1_000_000
+
+
+def periodo_semestral(anio, semestre):
+    """Mismo rango que ``codigo_<año>_S<n>.py``: del primer al último segundo del semestre."""
+    if semestre == 1:
+        desde, hasta = f"{anio}-01-01 00:00:00", f"{anio}-06-30 23:59:59"
+    else:
+        desde, hasta = f"{anio}-07-01 00:00:00", f"{anio}-12-31 23:59:59"
+    return Periodo(f"{anio}_S{semestre}", _ms(desde), _ms(hasta))
+
+
+def periodos_semestrales(desde, hasta):
+    return [periodo_semestral(anio, s) for anio in range(desde, hasta + 1) for s in (1, 2)]
+
+
+class Tarea:
+    """Tramo ``[ini, fin)`` (o ``[ini, fin]``) de un periodo, recorrido con un cursor keyset.
+
+    ``fin`` puede acortarse mientras se recorre: es lo que hace un robo.
+    """
+
+    def __init__(self, periodo, ini, fin, incluye_fin):
+        self.periodo = periodo
+        self.ini = ini
+        self.fin = fin
+        self.incluye_fin = incluye_fin
+        self.clave = None  # última (ms, objectid) recibida
+
+    @classmethod
+    def desde_clave(cls, periodo, clave, fin, incluye_fin):
+        """Tramo que sigue después de la clave ``clave`` (un hueco de un checkpoint)."""
+        tarea = cls(periodo, clave[0], fin, incluye_fin)
+        tarea.clave = clave
+        return tarea
+
+    @property
+    def restante(self):
+        return self.fin - (self.clave[0] if self.clave else self.ini)
+
+    def __repr__(self):
+        return f"Tarea({self.periodo.etiqueta}, {_texto(self.ini)} - {_texto(self.fin)})"
+
+
+def pedir_pagina(session, where, limitador, out_fields=TODOS_LOS_CAMPOS):
+    """Una página ordenada por ``(fecha, objectid)``; devuelve el cuerpo sin parsear."""
+    data = {
+        "where": where, "outFields": out_fields, "returnGeometry": "true", "outSR": "4326", "f": "json",
+        "orderByFields": ORDEN, "resultRecordCount": PAGE_SIZE,
+    }
+    limitador.adquirir()
+    r = session.post(ingesta.BASE_QUERY_URL, data=data, timeout=ingesta.TIMEOUT, verify=False)
+    r.raise_for_status()
+    return r.content
+
+
+def procesar_pagina(contenido):
+    """Parseo de una página (se ejecuta en el pool de procesos).
+
+    Devuelve ``(filas, registros, primera, ultima)``: las filas listas para
+    escribir, cuántos registros trajo el servidor y las claves
+    ``(ms, objectid)`` extremas de la página, que mueven el cursor.
+    """
+    df = esrijson_a_columnas(contenido)
+    if df.empty:
+        return df, 0, None, None
+    df = ingesta.normalizar_lote(df)
+    claves = df[[CAMPO_FECHA, CAMPO_OID]].dropna().sort_values([CAMPO_FECHA, CAMPO_OID])
+    primera = (int(claves.iloc[0][CAMPO_FECHA]), int(claves.iloc[0][CAMPO_OID]))
+    ultima = (int(claves.iloc[-1][CAMPO_FECHA]), int(claves.iloc[-1][CAMPO_OID]))
+    return ingesta.preparar_salida(df), len(df), primera, ultima
+
+
+class ProgramadorDescarga:
+    """Cola única de tramos para todos los periodos, con robo de trabajo entre workers."""
+
+    def __init__(self, periodos, out_dir=ingesta.OUT_DIR, max_concurrencia=MAX_CONCURRENCIA, procesos=None,
+                 tramos_por_periodo=N_CURSORES, tasa=TASA_DEFECTO, estado_limitador=None,
+                 perfil=None, reiniciar=False):
+        self.periodos = periodos
+        self.out_dir = out_dir
+        self.out_fields = out_fields_de_perfil(perfil)
+        self.reiniciar = reiniciar
+        self.max_concurrencia = max_concurrencia
+        self.procesos = procesos
+        self.tramos_por_periodo = tramos_por_periodo
+        self.limitador = LimitadorTasa(tasa, ruta_estado=estado_limitador)
+        self.reintentos = PoliticaReintentos(ingesta.MAX_REINTENTOS, base=ingesta.BACKOFF_BASE)
+        self.session = None
+        self._cola = collections.deque()
+        self._en_curso = set()
+        self._cambio = None
+        self._eventos = None
+        self._hilos = None
+        self._pool_procesos = None
+
+    # --- tareas ---
+
+    def _tareas(self, periodo):
+        """Tramos iniciales del periodo: un reparto nuevo o los huecos de su checkpoint."""
+        directorio = os.path.join(self.out_dir, PARTES_SUBDIR, periodo.etiqueta)
+        if self.reiniciar:
+            shutil.rmtree(directorio, ignore_errors=True)
+        periodo.checkpoint = CheckpointTramos(
+            directorio, where_rango(periodo.desde_ms, periodo.hasta_ms, True), self.out_fields
+        )
+        periodo.filas = periodo.checkpoint.filas
+        if not periodo.checkpoint.paginas_completadas:
+            return [Tarea(periodo, ini, fin, incluye)
+                    for ini, fin, incluye in rangos(periodo.desde_ms, periodo.hasta_ms, self.tramos_por_periodo)]
+        # Los huecos largos se reparten después con el robo de trabajo
+        return [Tarea.desde_clave(periodo, clave, fin, incluye)
+                for clave, fin, incluye in periodo.checkpoint.huecos(periodo.desde_ms, periodo.hasta_ms)]
+
+    def _siguiente(self):
+        """Próxima tarea de la cola o, si está vacía, la mitad robada de un tramo en curso."""
+        if self._cola:
+            return self._cola.popleft()
+        candidatas = [t for t in self._en_curso if t.restante >= 2 * MIN_MS_ROBO]
+        if not candidatas:
+            return None
+        victima = max(candidatas, key=lambda t: t.restante)
+        desde = victima.clave[0] if victima.clave else victima.ini
+        medio = (desde + victima.restante // 2) // 1000 * 1000
+        robada = Tarea(victima.periodo, medio, victima.fin, victima.incluye_fin)
+        victima.fin, victima.incluye_fin = medio, False
+        victima.periodo.tramos_activos += 1
+        self._publicar("robo", victima.periodo, robada)
+        return robada
+
+    def _dentro(self, df, tarea):
+        """Filas dentro del tramo: una página pedida antes de un robo puede pasarse del nuevo ``fin``."""
+        if df.empty or CAMPO_FECHA not in df.columns:
+            return df
+        fin = pd.Timestamp(tarea.fin, unit="ms")
+        mascara = df[CAMPO_FECHA] <= fin if tarea.incluye_fin else df[CAMPO_FECHA] < fin
+        return df[mascara]
+
+    # --- ejecución ---
+
+    async def _en_hilo(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._hilos, functools.partial(fn, *args))
+
+    async def _pagina(self, where):
+        for intento in range(1, self.reintentos.max_intentos + 1):
+            try:
+                return await self._en_hilo(pedir_pagina, self.session, where, self.limitador, self.out_fields)
+            except Exception:
+                if intento == self.reintentos.max_intentos:
+                    raise
+                await asyncio.sleep(self.reintentos.espera(intento))
+
+    async def _recorrer(self, tarea):
+        periodo = tarea.periodo
+        loop = asyncio.get_running_loop()
+        while True:
+            contenido = await self._pagina(where_rango(tarea.ini, tarea.fin, tarea.incluye_fin, tarea.clave))
+            df, registros, primera, ultima = await loop.run_in_executor(
+                self._pool_procesos, procesar_pagina, contenido
+            )
+            # Se pagina hasta una página vacía: con un maxRecordCount menor que
+            # PAGE_SIZE, una página corta no significa que se acabó el tramo
+            if registros == 0 or ultima is None:
+                return
+            df = self._dentro(df, tarea)
+            desde = tarea.clave or (tarea.ini, -1)
+            # El cursor avanza antes de ceder el control: un robo durante la
+            # escritura debe partir el tramo desde aquí, no desde la página anterior
+            tarea.clave = avanzar(tarea.clave, ultima)
+            # Si un robo acortó el tramo, la página solo cubre hasta el nuevo fin:
+            # lo demás es del tramo robado
+            hasta = tarea.clave if tarea.incluye_fin else min(tarea.clave, (tarea.fin, -1))
+            archivo = f"{primera[0]:015d}_{primera[1]:012d}.csv"
+            periodo.filas += await self._en_hilo(periodo.checkpoint.guardar_pagina, desde, hasta, df, archivo)
+            self._publicar("pagina", periodo, tarea)
+            async with self._cambio:
+                self._cambio.notify_all()
+
+    async def _worker(self):
+        while True:
+            tarea = self._siguiente()
+            if tarea is None:
+                if not self._en_curso:
+                    return
+                # Esperar a que un tramo avance (o termine) para volver a intentar el robo
+                async with self._cambio:
+                    await self._cambio.wait()
+                continue
+
+            self._en_curso.add(tarea)
+            try:
+                await self._recorrer(tarea)
+            except Exception as exc:
+                tarea.periodo.fallido = True
+                self._publicar("error", tarea.periodo, exc)
+            finally:
+                self._en_curso.discard(tarea)
+            await self._terminar_tramo(tarea.periodo)
+            async with self._cambio:
+                self._cambio.notify_all()
+
+    async def _terminar_tramo(self, periodo):
+        periodo.tramos_activos -= 1
+        if periodo.tramos_activos:
+            return
+        if periodo.fallido:
+            # Los parciales y el manifiesto se conservan para reanudar
+            self._publicar("periodo", periodo, None)
+            return
+        out_csv = os.path.join(self.out_dir, periodo.nombre_csv)
+        partes = periodo.checkpoint.archivos_parciales()
+        filas = await self._en_hilo(unir_partes, partes, out_csv) if partes else 0
+        periodo.checkpoint.limpiar()
+        if all(p.tramos_activos == 0 and not p.fallido for p in self.periodos):
+            shutil.rmtree(os.path.join(self.out_dir, PARTES_SUBDIR), ignore_errors=True)
+        self._publicar("periodo", periodo, filas)
+
+    # --- eventos ---
+
+    def _publicar(self, tipo, periodo, dato):
+        self._eventos.put_nowait((tipo, periodo, dato))
+
+    async def _informar(self, resumen):
+        """Consume los eventos de los workers e imprime el progreso."""
+        terminados = 0
+        while True:
+            evento = await self._eventos.get()
+            if evento is None:
+                return
+            tipo, periodo, dato = evento
+            hora = datetime.now().strftime('%H:%M:%S')
+            tag = f"[{hora}] [{periodo.etiqueta}]"
+            if tipo == "pagina":
+                print(f"{tag} {periodo.filas:,} registros, cursor en {_texto(dato.clave[0])} "
+                      f"({periodo.tramos_activos} tramos activos)", flush=True)
+            elif tipo == "reanudado":
+                print(f"{tag} Reanudado desde el checkpoint: {dato.paginas_completadas} páginas, "
+                      f"{periodo.filas:,} registros", flush=True)
+            elif tipo == "robo":
+                print(f"{tag} Tramo repartido: {_texto(dato.ini)} - {_texto(dato.fin)} pasa a otro worker",
+                      flush=True)
+            elif tipo == "error":
+                print(f"{tag} [ERROR] Un tramo falló tras {self.reintentos.max_intentos} intentos: {dato}",
+                      flush=True)
+            elif tipo == "periodo":
+                terminados += 1
+                resumen[periodo.etiqueta] = dato
+                estado = ("con errores: no se escribió el CSV (se reanuda en la próxima ejecución)"
+                          if dato is None else f"{dato:,} filas")
+                print(f"{tag} [COMPLETADO] {estado} - {terminados}/{len(self.periodos)} periodos", flush=True)
+
+    async def ejecutar(self):
+        """Descarga todos los periodos; devuelve ``{etiqueta: filas}`` (``None`` si falló)."""
+        self._cambio = asyncio.Condition()
+        self._eventos = asyncio.Queue()
+        os.makedirs(self.out_dir, exist_ok=True)
+        for periodo in self.periodos:
+            tareas = self._tareas(periodo)
+            periodo.tramos_activos = len(tareas)
+            self._cola.extend(tareas)
+            if periodo.checkpoint.paginas_completadas:
+                self._publicar("reanudado", periodo, periodo.checkpoint)
+
+        self.session = ingesta.crear_sesion(self.max_concurrencia)
+        self._hilos = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_concurrencia)
+        # spawn también en Linux: hacer fork con el event loop y el pool de hilos activos no es seguro
+        self._pool_procesos = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.procesos, mp_context=multiprocessing.get_context("spawn")
+        )
+        resumen = {}
+        informe = asyncio.ensure_future(self._informar(resumen))
+        try:
+            await asyncio.gather(*(self._worker() for _ in range(self.max_concurrencia)))
+        finally:
+            self._eventos.put_nowait(None)
+            await informe
+            self.session.close()
+            self._hilos.shutdown(wait=True)
+            self._pool_procesos.shutdown(wait=True)
+        return {p.etiqueta: resumen.get(p.etiqueta) for p in self.periodos}
+
+
+def descargar_periodos(periodos, **kwargs):
+    """Punto de entrada síncrono del programador."""
+    requests.packages.urllib3.disable_warnings(requests.packages.urllib3.exceptions.InsecureRequestWarning)
+    inicio = time.monotonic()
+    resumen = asyncio.run(ProgramadorDescarga(periodos, **kwargs).ejecutar())
+    print(f"Descarga terminada en {time.monotonic() - inicio:.1f}s", flush=True)
+    return resumen
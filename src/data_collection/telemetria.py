@@ -0,0 +1,198 @@
+"""Telemetría de la ingesta: una línea JSON por petición de lote y un resumen al final.
+
+Hasta ahora la única señal era el ``Progreso: x%`` de cada lote. Con esto se
+ve en qué se va el tiempo al ajustar ``--max-concurrencia`` y
+``--chunk-size``:
+
+- ``servidor_s``: hasta recibir las cabeceras (``Response.elapsed``), es
+  decir, lo que tarda el servicio en responder;
+- ``red_s``: la petición completa, incluida la descarga del cuerpo;
+- ``parseo_s``: decodificar la respuesta a columnas;
+- ``espera_s``: el tiempo en el semáforo y el limitador de tasa antes de salir;
+- ``proceso_s``: normalizar el lote y escribirlo en el checkpoint.
+
+Cada intento se registra con su código HTTP (414, 429, 5xx...) y su número
+de intento, así los reintentos se cuentan aparte. Las líneas van a
+``<out_dir>/_telemetria/ingesta_<fecha>.jsonl``; la última, con
+``"tipo": "resumen"``, trae los percentiles por partición y los registros/s.
+"""
+import os
+import json
+import time
+import threading
+from datetime import datetime
+
+import numpy as np
+
+TELEMETRIA_SUBDIR = "_telemetria"
+PERCENTILES = (50, 90, 99)
+
+
+def codigo_http(exc):
+    """Código HTTP de un error de ``requests`` (``None`` si no hubo respuesta)."""
+    respuesta = getattr(exc, "response", None)
+    return getattr(respuesta, "status_code", None)
+
+
+def _percentiles(valores, prefijo):
+    if not valores:
+        return {}
+    calculados = np.percentile(valores, PERCENTILES)
+    return {f"{prefijo}_p{p}": round(float(v), 4) for p, v in zip(PERCENTILES, calculados)}
+
+
+class _Acumulado:
+    """Métricas de una partición (o del total de la ejecución)."""
+
+    def __init__(self):
+        self.inicio = None
+        self.fin = None
+        self.peticiones = 0
+        self.fallidas = 0
+        self.reintentos = 0
+        self.codigos = {}
+        self.bytes = 0
+        self.registros = 0
+        self.latencias = []
+        self.servidor = []
+        self.parseo = []
+        self.espera = 0.0
+        self.proceso = 0.0
+
+    def sumar(self, evento):
+        self.inicio = evento["t"] if self.inicio is None else min(self.inicio, evento["t"])
+        self.fin = max(self.fin or 0.0, evento["t"])
+        self.peticiones += 1
+        if evento.get("intento", 1) > 1:
+            self.reintentos += 1
+        codigo = evento.get("codigo")
+        if codigo is not None:
+            self.codigos[str(codigo)] = self.codigos.get(str(codigo), 0) + 1
+        if evento.get("error"):
+            self.fallidas += 1
+            return
+        self.bytes += evento.get("bytes") or 0
+        self.registros += evento.get("registros") or 0
+        self.latencias.append(evento["red_s"])
+        if evento.get("servidor_s") is not None:
+            self.servidor.append(evento["servidor_s"])
+        self.parseo.append(evento.get("parseo_s") or 0.0)
+        self.espera += evento.get("espera_s") or 0.0
+
+    def resumen(self):
+        duracion = (self.fin - self.inicio) if self.inicio is not None else 0.0
+        errores_5xx = sum(n for c, n in self.codigos.items() if c.startswith("5"))
+        datos = {
+            "peticiones": self.peticiones,
+            "fallidas": self.fallidas,
+            "reintentos": self.reintentos,
+            "http_414": self.codigos.get("414", 0),
+            "http_429": self.codigos.get("429", 0),
+            "http_5xx": errores_5xx,
+            "codigos": self.codigos,
+            "bytes": self.bytes,
+            "registros": self.registros,
+            "duracion_s": round(duracion, 3),
+            "registros_s": round(self.registros / duracion, 1) if duracion > 0 else None,
+            "red_total_s": round(sum(self.latencias), 3),
+            "servidor_total_s": round(sum(self.servidor), 3),
+            "parseo_total_s": round(sum(self.parseo), 3),
+            "espera_total_s": round(self.espera, 3),
+            "proceso_total_s": round(self.proceso, 3),
+        }
+        datos.update(_percentiles(self.latencias, "red_s"))
+        datos.update(_percentiles(self.servidor, "servidor_s"))
+        datos.update(_percentiles(self.parseo, "parseo_s"))
+        return datos
+
+
+class Telemetria:
+    """Registro de peticiones compartido por los hilos del motor.
+
+    Parameters
+    ----------
+    ruta : str, optional
+        Archivo JSON lines. Sin ruta las métricas solo se acumulan en memoria
+        (para el resumen).
+    """
+
+    def __init__(self, ruta=None):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._particiones = {}
+        self._total = _Acumulado()
+        self._archivo = None
+        if ruta:
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            self._archivo = open(ruta, "a", encoding="utf-8")
+
+    @classmethod
+    def en_directorio(cls, out_dir):
+        nombre = f"ingesta_{datetime.now():%Y%m%d_%H%M%S}.jsonl"
+        return cls(os.path.join(out_dir, TELEMETRIA_SUBDIR, nombre))
+
+    def _escribir(self, evento):
+        if self._archivo is not None:
+            self._archivo.write(json.dumps(evento, ensure_ascii=False) + "\n")
+
+    def registrar(self, particion, tipo, **metricas):
+        """Registra un intento de petición de ``particion``.
+
+        ``metricas`` puede traer ``red_s``, ``servidor_s``, ``parseo_s``,
+        ``espera_s``, ``bytes``, ``ids``, ``registros``, ``codigo``,
+        ``formato``, ``intento`` y ``error``.
+        """
+        evento = {"t": time.time(), "particion": particion, "tipo": tipo}
+        evento.update({k: round(v, 4) if isinstance(v, float) else v
+                       for k, v in metricas.items() if v is not None})
+        evento.setdefault("red_s", 0.0)
+        with self._lock:
+            self._escribir(evento)
+            self._particiones.setdefault(particion, _Acumulado()).sumar(evento)
+            self._total.sumar(evento)
+
+    def sumar_proceso(self, particion, segundos):
+        """Tiempo de normalización y escritura de un lote ya registrado."""
+        with self._lock:
+            self._particiones.setdefault(particion, _Acumulado()).proceso += segundos
+            self._total.proceso += segundos
+
+    def resumen(self):
+        with self._lock:
+            return {
+                "particiones": {p: a.resumen() for p, a in self._particiones.items()},
+                "total": self._total.resumen(),
+            }
+
+    def cerrar(self):
+        """Escribe la línea de resumen, cierra el archivo y devuelve el resumen."""
+        resumen = self.resumen()
+        with self._lock:
+            self._escribir({"t": time.time(), "tipo": "resumen", **resumen})
+            if self._archivo is not None:
+                self._archivo.close()
+                self._archivo = None
+        return resumen
+
+
+def imprimir_resumen(resumen, ruta=None):
+    """Tabla de fin de ejecución: percentiles de latencia, errores y registros/s."""
+    if not resumen["particiones"]:
+        return
+    filas = list(resumen["particiones"].items()) + [("TOTAL", resumen["total"])]
+    print("\nTelemetría de la ingesta:", flush=True)
+    print(f"  {'Partición':<22} {'Pet.':>6} {'Reint.':>6} {'414':>4} {'429':>4} {'5xx':>4} "
+          f"{'MB':>8} {'p50 s':>7} {'p90 s':>7} {'p99 s':>7} {'Parseo s':>9} {'Reg/s':>9}", flush=True)
+    for etiqueta, r in filas:
+        registros_s = f"{r['registros_s']:,.0f}" if r["registros_s"] else "-"
+        print(f"  {etiqueta:<22} {r['peticiones']:>6} {r['reintentos']:>6} {r['http_414']:>4} "
+              f"{r['http_429']:>4} {r['http_5xx']:>4} {r['bytes'] / 1024 ** 2:>8.1f} "
+              f"{r.get('red_s_p50', 0):>7.3f} {r.get('red_s_p90', 0):>7.3f} {r.get('red_s_p99', 0):>7.3f} "
+              f"{r['parseo_total_s']:>9.2f} {registros_s:>9}", flush=True)
+    total = resumen["total"]
+    print(f"  Tiempo acumulado: servidor {total['servidor_total_s']:.1f}s, "
+          f"red {total['red_total_s']:.1f}s, parseo {total['parseo_total_s']:.1f}s, "
+          f"espera (semáforo/tasa) {total['espera_total_s']:.1f}s, "
+          f"proceso/escritura {total['proceso_total_s']:.1f}s", flush=True)
+    if ruta:
+        print(f"  Detalle por petición: {ruta}", flush=True)
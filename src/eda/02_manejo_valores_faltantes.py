@@ -1,66 +1,55 @@
-import pandas as pd
 import os
 import time
 import sys
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from utils.paths import PROCESSED_DATA_DIR
+from eda.etapas import COLUMNAS_FALTANTES, eliminar_faltantes
+from eda.paralelo import mapear_ordenado
+from eda.tablas import EscritorTabla, iterar_tabla
 
 # --- Configuración ---
 INPUT_FILE = os.path.join(PROCESSED_DATA_DIR, 'denuncias_final.csv') # Usando el archivo unificado
-OUTPUT_FILE = os.path.join(PROCESSED_DATA_DIR, 'denuncias_paso2_sin_nulos.csv') # Nuevo nombre descriptivo
+OUTPUT_FILE = os.path.join(PROCESSED_DATA_DIR, 'denuncias_paso2_sin_nulos.parquet') # Nuevo nombre descriptivo
 CHUNK_SIZE = 50000
 
-# Columnas a eliminar basadas en el diagnóstico inicial (más de 95% de valores faltantes)
-COLUMNS_TO_DROP = [
-    'tipologias_ia',
-    'cuadra_hecho',
-    'barrio',
-    'comisaria',
-    'departamento',
-    'provincia',
-    'distrito',
-    'indice_priorizacion',
-    'fecha_inaguracion'
-]
+# Columnas a eliminar basadas en el diagnóstico inicial (más de 95% de valores faltantes).
+# La lista vive en etapas.py, compartida con pipeline_eda.py
+COLUMNS_TO_DROP = COLUMNAS_FALTANTES
 
 # --- Inicio del Script ---
-print("Iniciando Paso 2: Manejo de valores faltantes (Eliminación de columnas).")
-print(f"Archivo de entrada: {os.path.basename(INPUT_FILE)}")
-print(f"Archivo de salida: {os.path.basename(OUTPUT_FILE)}")
-print(f"Columnas a eliminar: {COLUMNS_TO_DROP}")
-print("="*80)
+def main():
+    print("Iniciando Paso 2: Manejo de valores faltantes (Eliminación de columnas).")
+    print(f"Archivo de entrada: {os.path.basename(INPUT_FILE)}")
+    print(f"Archivo de salida: {os.path.basename(OUTPUT_FILE)}")
+    print(f"Columnas a eliminar: {COLUMNS_TO_DROP}")
+    print("="*80)
 
-start_time = time.time()
+    start_time = time.time()
 
-try:
-    # Usar un iterador de chunks para procesar el archivo grande
-    chunk_iter = pd.read_csv(INPUT_FILE, chunksize=CHUNK_SIZE, low_memory=False)
+    try:
+        # Usar un iterador de chunks para procesar el archivo grande
+        chunk_iter = iterar_tabla(INPUT_FILE, CHUNK_SIZE)
 
-    is_first_chunk = True
-    for i, chunk in enumerate(chunk_iter):
-        print(f"Procesando chunk {i+1}...")
+        # Eliminar las columnas especificadas; los chunks se reparten entre procesos (ver paralelo.py)
+        with EscritorTabla(OUTPUT_FILE) as escritor:
+            for i, chunk in enumerate(mapear_ordenado(eliminar_faltantes, chunk_iter)):
+                print(f"Chunk {i+1} procesado.")
+                escritor.escribir(chunk)
 
-        # Eliminar las columnas especificadas
-        chunk.drop(columns=COLUMNS_TO_DROP, inplace=True, errors='ignore')
+        end_time = time.time()
+        duration = end_time - start_time
 
-        if is_first_chunk:
-            # Para el primer chunk, escribir con encabezado
-            chunk.to_csv(OUTPUT_FILE, index=False, mode='w')
-            is_first_chunk = False
-        else:
-            # Para los siguientes, añadir sin encabezado
-            chunk.to_csv(OUTPUT_FILE, index=False, mode='a', header=False)
-    
-    end_time = time.time()
-    duration = end_time - start_time
+        print("\n" + "="*80)
+        print("Proceso completado.")
+        print(f"Se ha creado el archivo limpio en: {escritor.ruta}")
+        print(f"Tiempo total de procesamiento: {duration:.2f} segundos.")
 
-    print("\n" + "="*80)
-    print("Proceso completado.")
-    print(f"Se ha creado el archivo limpio en: {OUTPUT_FILE}")
-    print(f"Tiempo total de procesamiento: {duration:.2f} segundos.")
+    except FileNotFoundError:
+        print(f"Error: No se pudo encontrar el archivo de entrada en la ruta especificada:\n{INPUT_FILE}")
+    except Exception as e:
+        print(f"Ocurrió un error durante el procesamiento: {e}")
 
-except FileNotFoundError:
-    print(f"Error: No se pudo encontrar el archivo de entrada en la ruta especificada:\n{INPUT_FILE}")
-except Exception as e:
-    print(f"Ocurrió un error durante el procesamiento: {e}")
+
+if __name__ == "__main__":
+    main()
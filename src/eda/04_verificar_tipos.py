@@ -1,4 +1,3 @@
-import pandas as pd
 import os
 import time
 import numpy as np
@@ -6,9 +5,10 @@ import sys
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from utils.paths import PROCESSED_DATA_DIR
+from eda.tablas import iterar_tabla
 
 # --- Configuración ---
-INPUT_FILE = os.path.join(PROCESSED_DATA_DIR, 'denuncias_paso3_transformado.csv')
+INPUT_FILE = os.path.join(PROCESSED_DATA_DIR, 'denuncias_paso3_transformado.parquet')
 CHUNK_SIZE = 50000
 
 # Columnas a verificar
@@ -37,7 +37,7 @@ col_uniques = {col: set() for col in CATEGORICAL_COLS}
 
 try:
     # Usar un iterador de chunks para procesar el archivo grande
-    chunk_iter = pd.read_csv(INPUT_FILE, chunksize=CHUNK_SIZE, low_memory=False)
+    chunk_iter = iterar_tabla(INPUT_FILE, CHUNK_SIZE)
 
     total_rows = 0
     for i, chunk in enumerate(chunk_iter):
@@ -1,13 +1,13 @@
-import pandas as pd
 import os
 import time
 import sys
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from utils.paths import PROCESSED_DATA_DIR
+from eda.tablas import iterar_tabla
 
 # --- Configuración ---
-INPUT_FILE = os.path.join(PROCESSED_DATA_DIR, 'denuncias_paso5_renombrado.csv')
+INPUT_FILE = os.path.join(PROCESSED_DATA_DIR, 'denuncias_paso5_renombrado.parquet')
 CHUNK_SIZE = 100000
 COLUMN_TO_CHECK = 'objectid'
 
@@ -25,7 +25,7 @@ duplicate_count = 0
 
 try:
     # Usar un iterador de chunks para procesar el archivo grande
-    chunk_iter = pd.read_csv(INPUT_FILE, chunksize=CHUNK_SIZE, usecols=[COLUMN_TO_CHECK], low_memory=False)
+    chunk_iter = iterar_tabla(INPUT_FILE, CHUNK_SIZE, columns=[COLUMN_TO_CHECK])
 
     for i, chunk in enumerate(chunk_iter):
         print(f"Procesando chunk {i+1}...")
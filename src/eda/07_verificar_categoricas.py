@@ -1,4 +1,3 @@
-import pandas as pd
 import os
 import time
 import json
@@ -6,20 +5,16 @@ import sys
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from utils.paths import PROCESSED_DATA_DIR, BASE_DIR
+from eda.etapas import CATEGORICAL_COLS
+from eda.tablas import iterar_tabla
 
 # --- Configuración ---
-INPUT_FILE = os.path.join(PROCESSED_DATA_DIR, 'denuncias_paso5_renombrado.csv')
+INPUT_FILE = os.path.join(PROCESSED_DATA_DIR, 'denuncias_paso5_renombrado.parquet')
 REPORTS_DIR = os.path.join(BASE_DIR, 'docs', 'analysis_reports')
 os.makedirs(REPORTS_DIR, exist_ok=True)
 output_json_path = os.path.join(REPORTS_DIR, '07_diccionario_categoricas.json')
 CHUNK_SIZE = 100000
-
-# Columnas categóricas a investigar
-CATEGORICAL_COLS = [
-    'departamento_hecho', 'provincia_hecho', 'distrito_hecho',
-    'tipo_hecho', 'materia_hecho', 'turno_hecho', 'es_delito_x',
-    'macroregpol_hecho', 'regionpol_hecho', 'estado_coord'
-]
+# Columnas categóricas a investigar: CATEGORICAL_COLS (etapas.py)
 
 # --- Inicio del Script ---
 print("Iniciando Verificación de Valores Únicos para Columnas Categóricas.")
@@ -34,7 +29,7 @@ col_uniques = {col: set() for col in CATEGORICAL_COLS}
 
 try:
     # Usar un iterador de chunks para procesar el archivo grande
-    chunk_iter = pd.read_csv(INPUT_FILE, chunksize=CHUNK_SIZE, usecols=CATEGORICAL_COLS, low_memory=False)
+    chunk_iter = iterar_tabla(INPUT_FILE, CHUNK_SIZE, columns=CATEGORICAL_COLS)
 
     for i, chunk in enumerate(chunk_iter):
         print(f"Procesando chunk {i+1}...")
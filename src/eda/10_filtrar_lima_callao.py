@@ -1,10 +1,10 @@
-import pandas as pd
 import os
 from src.utils.paths import PROCESSED_DATA_DIR
+from src.eda.tablas import guardar_tabla, leer_tabla
 
 # Rutas de entrada y salida utilizando el módulo de rutas centralizado
-INPUT_CSV_PATH = os.path.join(PROCESSED_DATA_DIR, "denuncias_final.csv")
-OUTPUT_CSV_PATH = os.path.join(PROCESSED_DATA_DIR, "denuncias_lima_callao.csv")
+INPUT_CSV_PATH = os.path.join(PROCESSED_DATA_DIR, "denuncias_final.parquet")
+OUTPUT_CSV_PATH = os.path.join(PROCESSED_DATA_DIR, "denuncias_lima_callao.parquet")
 
 PROVINCIAS_OBJETIVO = ["LIMA", "CALLAO"]
 
@@ -12,12 +12,12 @@ PROVINCIAS_OBJETIVO = ["LIMA", "CALLAO"]
 
 def filtrar_csv_por_provincia():
     """
-    Lee el CSV completo, filtra por las provincias objetivo y guarda el resultado
-    en un nuevo archivo CSV.
+    Lee el archivo procesado completo, filtra por las provincias objetivo y
+    guarda el resultado en un nuevo Parquet (CSV si no hay pyarrow).
     """
     print(f"Paso 1: Leyendo el archivo CSV completo: {INPUT_CSV_PATH}")
     try:
-        df = pd.read_csv(INPUT_CSV_PATH)
+        df = leer_tabla(INPUT_CSV_PATH)
         print(f"Lectura completada. El archivo tiene {len(df)} filas.")
     except FileNotFoundError:
         print(f"Error: No se encontró el archivo CSV en la ruta: {INPUT_CSV_PATH}")
@@ -44,8 +44,8 @@ def filtrar_csv_por_provincia():
 
     print(f"Paso 3: Guardando el nuevo archivo CSV en: {OUTPUT_CSV_PATH}")
     try:
-        df_filtrado.to_csv(OUTPUT_CSV_PATH, index=False)
-        print("¡Archivo guardado exitosamente!")
+        ruta = guardar_tabla(df_filtrado, OUTPUT_CSV_PATH)
+        print(f"¡Archivo guardado exitosamente! ({ruta})")
     except Exception as e:
         print(f"Ocurrió un error al guardar el nuevo archivo CSV: {e}")
         return
@@ -0,0 +1,384 @@
+"""Pasos 02-09 del EDA como un DAG con caché por contenido: solo se recalcula lo que cambió.
+
+``pipeline_eda.py`` recorre los pasos en una sola pasada, pero siempre
+todos: retocar los límites del paso 09 vuelve a leer la unión cruda y a
+rehacer 02-08. Aquí cada paso se declara con su etapa y el paso del que
+depende, y su salida se guarda en ``_cache_eda/`` bajo una clave:
+
+    sha256(clave de la entrada + código de etapas.py que alcanza la etapa
+           + constantes que lee + fuente de tablas.py
+           + categorías (solo pasos con tabla) + versiones)
+
+El código se recorre desde la clase de la etapa: sus bases, las funciones y
+clases de ``etapas.py`` que nombra (y las que nombran esas, como
+``_mapear``), y el valor de las constantes que lee (``COLUMNAS_FALTANTES``,
+``DTYPE_MAPPING``, los límites geográficos...). ``tablas.py`` lee y escribe
+todas las tablas, así que su fuente entra entera. Las categorías
+(``--categorias``) solo fijan los tipos de las tablas escritas: las
+verificaciones 06 y 07 no dependen de ellas.
+
+La clave de la entrada es la del paso anterior (su salida es función de su
+clave), y para la unión cruda, el hash de su contenido (recordado por
+tamaño y fecha de modificación para no releer el archivo en cada
+ejecución). Si la clave de un paso no cambió, se reutiliza su salida y se
+vuelve a imprimir el reporte guardado; si cambió, se recalcula y con él
+todo lo que depende de él. Editar ``filtrar_atipicos`` o ``LAT_MIN`` en
+``etapas.py`` solo rehace el 09.
+
+Las verificaciones 06 y 07 son hojas del DAG (leen solo sus columnas de la
+salida del 05 y no producen tabla); la salida del último paso se publica en
+``denuncias_final.parquet``.
+
+Uso:
+    python src/eda/dag_eda.py
+    python src/eda/dag_eda.py --forzar 04
+    python src/eda/dag_eda.py --hasta 05
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import inspect
+import argparse
+import contextlib
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.paths import PROCESSED_DATA_DIR
+from eda import etapas as et
+from eda import tablas
+from eda.pipeline_eda import INPUT_FILE, OUTPUT_FILE, REPORTS_DIR, CHUNK_SIZE
+from eda.paralelo import PROCESOS, aplicar_etapas
+from eda.tablas import (
+    CATEGORIAS_DEFECTO, EscritorTabla, columnas_tabla, iterar_tabla, ruta_categorias, ruta_existente, usar_categorias,
+)
+
+CACHE_DIR = os.path.join(PROCESSED_DATA_DIR, '_cache_eda')
+MANIFIESTO = "manifiesto.json"
+# Subir al cambiar algo que altere las salidas y no esté en la clave (p. ej. paralelo.py)
+VERSION_CACHE = 3
+BLOQUE_HASH = 8 * 1024 ** 2
+# Valores de las constantes de etapas.py que entran en la clave
+TIPOS_CONSTANTE = (bool, int, float, str, list, tuple, dict, type(None))
+
+
+def _codigos(objeto):
+    """Objetos de código de una función o de los métodos de una clase, con los anidados."""
+    if inspect.isclass(objeto):
+        funciones = [getattr(v, "__func__", getattr(v, "fget", v)) for v in vars(objeto).values()]
+    else:
+        funciones = [objeto]
+    pila = [f.__code__ for f in funciones if inspect.isfunction(f)]
+    while pila:
+        codigo = pila.pop()
+        yield codigo
+        pila.extend(c for c in codigo.co_consts if inspect.iscode(c))
+
+
+def dependencias(objeto, modulo=et):
+    """Fuente de ``objeto`` y de todo lo de ``modulo`` que alcanza su código.
+
+    Devuelve ``{nombre: fuente}`` de las funciones y clases del módulo (las
+    bases de una clase, lo que nombra cada función, y así sucesivamente) y
+    ``{nombre: valor}`` de las constantes que leen. Los nombres se toman de
+    los ``co_names`` del bytecode, que también incluyen atributos: alguna
+    constante de más en la clave solo cuesta un recálculo de más.
+    """
+    resultado = {}
+    pendientes = [objeto]
+    while pendientes:
+        actual = pendientes.pop()
+        if actual.__name__ in resultado:
+            continue
+        resultado[actual.__name__] = inspect.getsource(actual)
+        if inspect.isclass(actual):
+            pendientes.extend(b for b in actual.__mro__[1:] if b.__module__ == modulo.__name__)
+        nombres = {n for codigo in _codigos(actual) for n in codigo.co_names}
+        for nombre in sorted(nombres - set(resultado)):
+            valor = vars(modulo).get(nombre)
+            if inspect.isfunction(valor) or inspect.isclass(valor):
+                if valor.__module__ == modulo.__name__:
+                    pendientes.append(valor)
+            elif nombre in vars(modulo) and isinstance(valor, TIPOS_CONSTANTE):
+                resultado[nombre] = valor
+    return resultado
+
+
+class Paso:
+    """Nodo del DAG.
+
+    Parameters
+    ----------
+    etapa : Etapa
+        Transformación (u observación) que se aplica a cada chunk; su código
+        y lo que alcanza en ``etapas.py`` entran en la clave (``dependencias``).
+    depende : str, optional
+        Paso cuya salida es la entrada; ``None`` para la unión cruda.
+    columnas : list, optional
+        Solo estas columnas de la entrada (las verificaciones).
+    salida : bool
+        ``False`` para las verificaciones, que solo dejan su reporte.
+    """
+
+    def __init__(self, etapa, depende=None, columnas=None, salida=True):
+        self.etapa = etapa
+        self.nombre = etapa.paso
+        self.depende = depende
+        self.columnas = columnas
+        self.salida = salida
+
+    def clave(self, clave_entrada, categorias=None):
+        """``categorias``: hash del archivo de categorías; solo cuenta si el paso escribe una tabla."""
+        contenido = json.dumps({
+            "version": VERSION_CACHE,
+            "pandas": pd.__version__,
+            "entrada": clave_entrada,
+            "codigo": dependencias(type(self.etapa)),
+            "tablas": inspect.getsource(tablas),
+            "categorias": categorias if self.salida else None,
+        }, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+
+def construir_dag(reports_dir=REPORTS_DIR):
+    """Los pasos de ``pipeline_eda.construir_etapas`` con sus dependencias, en orden topológico."""
+    os.makedirs(reports_dir, exist_ok=True)
+    return [
+        Paso(et.EtapaFaltantes(), None),
+        Paso(et.EtapaFechas(), "02"),
+        Paso(et.EtapaTipos(), "03"),
+        Paso(et.EtapaRenombrar(), "04"),
+        Paso(et.EtapaUnicidad(), "05", columnas=[et.COLUMNA_ID], salida=False),
+        Paso(et.EtapaCategoricas(os.path.join(reports_dir, '07_diccionario_categoricas.json')), "05",
+             columnas=et.CATEGORICAL_COLS, salida=False),
+        Paso(et.EtapaCodificacion(os.path.join(reports_dir, '08_diccionario_codificacion.json')), "05"),
+        Paso(et.EtapaAtipicos(), "08"),
+    ]
+
+
+def validar_categorias(pasos, categorias):
+    """Las categorías no pueden salir de un archivo que escribe un paso: cada ejecución invalidaría la caché."""
+    if categorias is None:
+        return
+    for paso in pasos:
+        ruta_json = getattr(paso.etapa, "ruta_json", None)
+        if ruta_json and os.path.abspath(ruta_json) == os.path.abspath(categorias):
+            raise ValueError(f"{categorias} lo reescribe el paso {paso.nombre}: "
+                             f"las categorías deben venir de un archivo fijo")
+
+
+def hash_categorias():
+    ruta = ruta_categorias()
+    if not ruta:
+        return None
+    with open(ruta, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def hash_archivo(ruta, memo):
+    """sha256 del contenido de ``ruta``; ``memo`` lo recuerda por tamaño y fecha de modificación."""
+    st = os.stat(ruta)
+    firma = [st.st_size, st.st_mtime_ns]
+    previo = memo.get(os.path.abspath(ruta))
+    if previo and previo["firma"] == firma:
+        return previo["hash"]
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(BLOQUE_HASH), b""):
+            h.update(bloque)
+    memo[os.path.abspath(ruta)] = {"firma": firma, "hash": h.hexdigest()}
+    return h.hexdigest()
+
+
+class CachePasos:
+    """Salidas y reportes de los pasos en disco, indexados en ``manifiesto.json``.
+
+    Se guarda la última versión de cada paso: al recalcularlo con otra clave
+    se borra la salida anterior.
+    """
+
+    def __init__(self, directorio=CACHE_DIR):
+        self.directorio = directorio
+        self.ruta_manifiesto = os.path.join(directorio, MANIFIESTO)
+        os.makedirs(directorio, exist_ok=True)
+        try:
+            with open(self.ruta_manifiesto, encoding="utf-8") as f:
+                self.manifiesto = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.manifiesto = {}
+        self.manifiesto.setdefault("pasos", {})
+        self.manifiesto.setdefault("entradas", {})
+
+    def ruta_salida(self, paso, clave):
+        return os.path.join(self.directorio, f"paso{paso.nombre}_{clave[:16]}.parquet")
+
+    def buscar(self, paso, clave):
+        """Entrada del manifiesto si ``paso`` ya se calculó con ``clave`` y sus archivos siguen ahí."""
+        entrada = self.manifiesto["pasos"].get(paso.nombre)
+        if not entrada or entrada["clave"] != clave:
+            return None
+        archivos = [entrada["salida"]] if entrada["salida"] else []
+        ruta_json = getattr(paso.etapa, "ruta_json", None)
+        if ruta_json:
+            archivos.append(ruta_json)
+        if not all(os.path.exists(a) for a in archivos):
+            return None
+        return entrada
+
+    def guardar(self, paso, entrada):
+        anterior = self.manifiesto["pasos"].get(paso.nombre)
+        if anterior and anterior["salida"] and anterior["salida"] != entrada["salida"]:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(anterior["salida"])
+        self.manifiesto["pasos"][paso.nombre] = entrada
+        self.escribir()
+
+    def escribir(self):
+        temporal = self.ruta_manifiesto + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(self.manifiesto, f, ensure_ascii=False, indent=2)
+        os.replace(temporal, self.ruta_manifiesto)
+
+
+def calcular_paso(paso, entrada, salida, chunk_size=CHUNK_SIZE, procesos=PROCESOS):
+    """Aplica la etapa a ``entrada`` chunk a chunk; devuelve ``(ruta escrita, filas, reporte)``."""
+    columnas = None
+    if paso.columnas is not None:
+        presentes = set(columnas_tabla(entrada))
+        columnas = [c for c in paso.columnas if c in presentes]
+    escritor = EscritorTabla(salida) if paso.salida else None
+    filas = 0
+    try:
+        chunks = iterar_tabla(entrada, chunk_size, columns=columnas)
+        # Las verificaciones solo leen unas columnas: mandarlas a otro proceso cuesta más que contarlas
+        for chunk in aplicar_etapas(chunks, [paso.etapa], procesos if paso.salida else 1):
+            filas += len(chunk)
+            if escritor is not None:
+                escritor.escribir(chunk)
+        ruta = escritor.cerrar() if escritor is not None else None
+    except BaseException:
+        if escritor is not None:
+            escritor.abortar()
+        raise
+    reporte = io.StringIO()
+    with contextlib.redirect_stdout(reporte):
+        paso.etapa.reporte()
+    return ruta, filas, reporte.getvalue()
+
+
+def ejecutar_dag(entrada=INPUT_FILE, salida=OUTPUT_FILE, pasos=None, cache=None,
+                 chunk_size=CHUNK_SIZE, forzar=(), hasta=None, procesos=PROCESOS, categorias=CATEGORIAS_DEFECTO):
+    """Recorre los pasos en orden reutilizando los que no cambiaron.
+
+    ``categorias``: archivo de categorías congeladas (``None``: sin columnas
+    categóricas). Devuelve la lista de ``(paso, estado, segundos, filas)``.
+    Si se llegó al final del DAG (sin ``hasta``), la salida del último paso
+    con tabla se copia a ``salida``.
+    """
+    pasos = pasos if pasos is not None else construir_dag()
+    validar_categorias(pasos, categorias)
+    usar_categorias(categorias)
+    cache = cache or CachePasos()
+    if hasta is not None:
+        pasos = pasos[:[p.nombre for p in pasos].index(hasta) + 1]
+    entrada = ruta_existente(entrada)
+    clave_cruda = hash_archivo(entrada, cache.manifiesto["entradas"])
+    hash_cat = hash_categorias()
+    cache.escribir()
+
+    resultados = {}  # paso -> (clave, ruta de la salida)
+    resumen = []
+    for paso in pasos:
+        if paso.depende is None:
+            clave_entrada, ruta_entrada = clave_cruda, entrada
+        else:
+            clave_entrada, ruta_entrada = resultados[paso.depende]
+        clave = paso.clave(clave_entrada, hash_cat)
+
+        inicio = time.perf_counter()
+        previo = None if paso.nombre in forzar else cache.buscar(paso, clave)
+        if previo is not None:
+            estado, registro = "reutilizado", previo
+        else:
+            print(f"Calculando paso {paso.nombre}: {paso.etapa.titulo}...", flush=True)
+            ruta, filas, reporte = calcular_paso(paso, ruta_entrada, cache.ruta_salida(paso, clave), chunk_size,
+                                                 procesos)
+            registro = {"clave": clave, "salida": ruta, "filas": filas, "reporte": reporte,
+                        "segundos": round(time.perf_counter() - inicio, 3)}
+            cache.guardar(paso, registro)
+            estado = "calculado"
+        resultados[paso.nombre] = (clave, registro["salida"])
+        resumen.append((paso, estado, time.perf_counter() - inicio, registro["filas"], registro["reporte"]))
+
+    for paso, estado, segundos, _, reporte in resumen:
+        print("\n" + "=" * 80)
+        print(f"  Paso {paso.nombre}: {paso.etapa.titulo} ({estado}, {segundos:.2f} s)")
+        print("=" * 80)
+        print(reporte, end="")
+
+    final = next((r for r in reversed(resumen) if r[0].salida), None)
+    if final is not None and hasta is None:
+        publicar(resultados[final[0].nombre][1], salida, cache)
+    return [(p.nombre, estado, segundos, filas) for p, estado, segundos, filas, _ in resumen]
+
+
+def publicar(origen, salida, cache):
+    """Copia la salida cacheada del último paso a ``salida`` (con la extensión de ``origen``)."""
+    destino = os.path.splitext(salida)[0] + os.path.splitext(origen)[1]
+    if cache.manifiesto.get("publicado") == [origen, destino] and os.path.exists(destino):
+        return destino
+    shutil.copyfile(origen, destino + ".tmp")
+    os.replace(destino + ".tmp", destino)
+    cache.manifiesto["publicado"] = [origen, destino]
+    cache.escribir()
+    return destino
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pasos 02-09 del EDA con caché por paso (solo se rehace lo que cambió).")
+    parser.add_argument("--entrada", default=INPUT_FILE)
+    parser.add_argument("--salida", default=OUTPUT_FILE)
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--reportes", default=REPORTS_DIR, help="Carpeta de los JSON de los pasos 07 y 08")
+    parser.add_argument("--categorias", default=CATEGORIAS_DEFECTO, help="JSON {columna: [categorías]} congelado")
+    parser.add_argument("--sin-categorias", action="store_true", help="Escribe las columnas categóricas como texto")
+    parser.add_argument("--forzar", nargs="+", default=[], metavar="PASO", help="Recalcula estos pasos aunque su clave no haya cambiado")
+    parser.add_argument("--hasta", metavar="PASO", help="Último paso a ejecutar (p. ej. 05)")
+    parser.add_argument("--procesos", type=int, default=PROCESOS, help="Procesos para los chunks (1: sin pool)")
+    args = parser.parse_args(argv)
+    nombres = [p.nombre for p in construir_dag(args.reportes)]
+    for paso in args.forzar + ([args.hasta] if args.hasta else []):
+        if paso not in nombres:
+            parser.error(f"paso desconocido: {paso} (pasos: {', '.join(nombres)})")
+    categorias = None if args.sin_categorias else args.categorias
+    if categorias is not None and not os.path.isfile(categorias):
+        parser.error(f"no existe el archivo de categorías: {categorias}")
+    try:
+        validar_categorias(construir_dag(args.reportes), categorias)
+    except ValueError as e:
+        parser.error(str(e))
+
+    start_time = time.time()
+    try:
+        resumen = ejecutar_dag(args.entrada, args.salida, construir_dag(args.reportes), CachePasos(args.cache_dir),
+                               args.chunk_size, set(args.forzar), args.hasta, args.procesos, categorias)
+    except FileNotFoundError as e:
+        print(f"Error: No se pudo encontrar el archivo: {e.filename or e}")
+        return None
+    duration = time.time() - start_time
+
+    print("\n" + "=" * 80)
+    print(f"  {'Paso':<6} {'Estado':<12} {'Segundos':>9} {'Filas':>12}")
+    for nombre, estado, segundos, filas in resumen:
+        print(f"  {nombre:<6} {estado:<12} {segundos:>9.2f} {filas:>12,}")
+    print(f"Tiempo total de procesamiento: {duration:.2f} segundos.")
+    return resumen
+
+
+if __name__ == "__main__":
+    main()
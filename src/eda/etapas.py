@@ -0,0 +1,428 @@
+"""Transformaciones de los pasos 02-09 del EDA, aplicables chunk a chunk.
+
+Los scripts numerados (``02_manejo_valores_faltantes.py``...``09_filtrar_atipicos.py``)
+y ``pipeline_eda.py`` usan las mismas funciones y constantes de aquí: los
+scripts leen y escriben un CSV completo por paso; el pipeline encadena las
+etapas sobre un solo flujo de chunks.
+
+Cada ``Etapa`` transforma un chunk (o solo lo observa, como las
+verificaciones 06 y 07) y acumula lo necesario para imprimir su reporte al
+final, el mismo que imprimía su script. ``combinar`` suma lo acumulado por
+otra copia de la etapa (la que procesó un chunk en otro proceso, ver
+``paralelo.py``).
+"""
+import re
+import json
+import unicodedata
+
+import pandas as pd
+
+# --- Paso 2: columnas con más de 95% de valores faltantes (diagnóstico inicial) ---
+COLUMNAS_FALTANTES = [
+    'tipologias_ia',
+    'cuadra_hecho',
+    'barrio',
+    'comisaria',
+    'departamento',
+    'provincia',
+    'distrito',
+    'indice_priorizacion',
+    'fecha_inaguracion'
+]
+
+# --- Paso 3: columnas de texto redundantes con fecha_hora_hecho ---
+# La ingesta ya no las genera (deriva día/hora/día de la semana como enteros,
+# ver data_collection/fechas.py); se eliminan si vienen de descargas anteriores.
+COLUMNAS_FECHA_TEXTO = [
+    'fecha_hecho',
+    'hora_hecho'
+]
+
+# --- Paso 4: tipos basados en la verificación del dataset completo ---
+DTYPE_MAPPING = {
+    # Enteros a int8
+    'mes_hecho': 'int8',
+    'dia_hecho': 'int8',
+    'id_materia_hecho': 'int8',
+    'id_dpto_hecho': 'int8',
+    'solo_denuncia': 'int8',
+    'estado': 'int8',
+    # Enteros a int16
+    'ano_hecho': 'int16',
+    'id_tipo_hecho': 'int16',
+    # Floats a float32
+    'lat': 'float32',
+    'lon': 'float32',
+    'lat_hecho': 'float32',
+    'long_hecho': 'float32',
+}
+
+# --- Paso 6 ---
+COLUMNA_ID = 'objectid'
+
+# --- Paso 7: columnas categóricas a investigar ---
+CATEGORICAL_COLS = [
+    'departamento_hecho', 'provincia_hecho', 'distrito_hecho',
+    'tipo_hecho', 'materia_hecho', 'turno_hecho', 'es_delito_x',
+    'macroregpol_hecho', 'regionpol_hecho', 'estado_coord'
+]
+
+# --- Paso 8: codificación y binning ---
+# 1. Limpieza para 'estado_coord'
+estado_coord_replace_map = {
+    'SIN COORDENADA XX': 'SIN COORDENADA',
+    'SIN COORDENADA YY': 'SIN COORDENADA'
+}
+
+# 2. Codificación Ordinal para 'turno_hecho'
+turno_hecho_encoding_map = {
+    'madrugada': 0,
+    'mañana': 1,
+    'tarde': 2,
+    'noche': 3
+}
+
+# 3. Binning para la hora del día
+hour_bins = [-1, 5, 11, 17, 23]
+hour_labels = ['Madrugada', 'Mañana', 'Tarde', 'Noche']
+
+# 4. Codificación Binaria para 'tiene_coordenada'
+tiene_coordenada_map = {
+    'CON COORDENADA': 1,
+    'SIN COORDENADA': 0
+}
+
+# Diccionario de datos para documentación
+data_dictionary = {
+    "estado_coord_cleaning": {
+        "description": "Se unificaron valores en la columna 'estado_coord'.",
+        "mapping": estado_coord_replace_map
+    },
+    "turno_hecho_encoding": {
+        "description": "Codificación ordinal de la columna 'turno_hecho'.",
+        "mapping": {
+            "0": "madrugada",
+            "1": "mañana",
+            "2": "tarde",
+            "3": "noche"
+        }
+    },
+    "periodo_dia_binning": {
+        "description": "Nueva columna creada agrupando la hora de 'fecha_hora_hecho'.",
+        "bins": {
+            "0-5": "Madrugada",
+            "6-11": "Mañana",
+            "12-17": "Tarde",
+            "18-23": "Noche"
+        }
+    },
+    "tiene_coordenada_encoding": {
+        "description": "Codificación binaria (0/1) creada a partir de 'estado_coord' limpio.",
+        "mapping": tiene_coordenada_map
+    }
+}
+
+# --- Paso 9: límites geográficos de Perú (grados decimales, con margen) ---
+# Latitud Sur es negativa, Longitud Oeste es negativa.
+LAT_MIN = -18.4
+LAT_MAX = 0
+LON_MIN = -81.4
+LON_MAX = -68.6
+
+
+# --- Transformaciones por chunk ---
+
+def eliminar_faltantes(chunk):
+    """Paso 2: elimina las columnas casi vacías."""
+    return chunk.drop(columns=COLUMNAS_FALTANTES, errors='ignore')
+
+
+def transformar_fechas(chunk):
+    """Paso 3: ``fecha_hora_hecho`` a datetime y fuera las columnas de texto redundantes.
+
+    La ingesta la escribe en ISO ('2020-01-31 14:30:00'): se parsea sin
+    inferir el formato fila a fila. errors='coerce' deja NaT en las inválidas.
+    """
+    if not pd.api.types.is_datetime64_any_dtype(chunk['fecha_hora_hecho']):
+        chunk['fecha_hora_hecho'] = pd.to_datetime(chunk['fecha_hora_hecho'], format='ISO8601', errors='coerce')
+    return chunk.drop(columns=COLUMNAS_FECHA_TEXTO, errors='ignore')
+
+
+def optimizar_tipos(chunk):
+    """Paso 4: aplica ``DTYPE_MAPPING``; devuelve el chunk y ``{columna: error}`` de las que no se pudieron convertir."""
+    errores = {}
+    for col, dtype in DTYPE_MAPPING.items():
+        if col in chunk.columns:
+            try:
+                chunk[col] = chunk[col].astype(dtype)
+            except Exception as e:
+                errores[col] = e
+    return chunk, errores
+
+
+def normalize_column_name(name):
+    """
+    Normaliza un nombre de columna a formato snake_case.
+    Ej: 'Año Hecho' -> 'ano_hecho'
+    """
+    # Transliterar caracteres con acentos y ñ
+    nfkd_form = unicodedata.normalize('NFKD', name)
+    name = "".join([c for c in nfkd_form if not unicodedata.combining(c)])
+    # Convertir a minúsculas
+    name = name.lower()
+    # Reemplazar caracteres no alfanuméricos con guion bajo
+    name = re.sub(r'[^a-z0-9]+', '_', name)
+    # Quitar guiones bajos al principio o final
+    name = name.strip('_')
+    return name
+
+
+def _mapear(serie, mapa):
+    """``serie.map(mapa)`` con resultado numérico aunque ``serie`` sea categórica.
+
+    En una categórica, ``map`` devolvería otra categórica (de 0, 1, 2...).
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        serie = serie.astype(object)
+    return serie.map(mapa)
+
+
+def _reemplazar(serie, mapa):
+    """``serie.replace(mapa)`` aunque los valores nuevos no estén en las categorías de ``serie``."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        nuevas = [v for v in mapa.values() if v not in serie.cat.categories]
+        serie = serie.cat.add_categories(list(dict.fromkeys(nuevas)))
+    return serie.replace(mapa)
+
+
+def codificar(chunk):
+    """Paso 8: limpia ``estado_coord``, codifica ``turno_hecho`` y agrupa la hora."""
+    # 1. Limpiar 'estado_coord'
+    chunk['estado_coord'] = _reemplazar(chunk['estado_coord'], estado_coord_replace_map)
+    # 2. Codificar 'turno_hecho'
+    chunk['turno_hecho_cod'] = _mapear(chunk['turno_hecho'], turno_hecho_encoding_map)
+    # 3. Binning de la hora
+    chunk['periodo_dia'] = pd.cut(chunk['fecha_hora_hecho'].dt.hour, bins=hour_bins, labels=hour_labels, right=True)
+    # 4. Crear 'tiene_coordenada'
+    chunk['tiene_coordenada'] = _mapear(chunk['estado_coord'], tiene_coordenada_map)
+    return chunk
+
+
+def filtrar_atipicos(chunk):
+    """Paso 9: solo las filas con coordenadas dentro de Perú."""
+    return chunk[
+        (chunk['lat'].between(LAT_MIN, LAT_MAX)) &
+        (chunk['lon'].between(LON_MIN, LON_MAX))
+    ]
+
+
+def guardar_json(datos, ruta):
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, ensure_ascii=False, indent=4)
+
+
+# --- Etapas del pipeline ---
+
+class Etapa:
+    """Paso del EDA sobre un flujo de chunks: ``procesar`` por chunk, ``reporte`` al final."""
+
+    paso = None
+    titulo = None
+
+    def procesar(self, chunk):
+        return chunk
+
+    def combinar(self, otra):
+        """Suma lo acumulado por ``otra``, que procesó los chunks siguientes."""
+        pass
+
+    def reporte(self):
+        pass
+
+
+class EtapaFaltantes(Etapa):
+    paso, titulo = "02", "Manejo de valores faltantes (Eliminación de columnas)"
+
+    def __init__(self):
+        self.eliminadas = None
+
+    def procesar(self, chunk):
+        if self.eliminadas is None:
+            self.eliminadas = [c for c in COLUMNAS_FALTANTES if c in chunk.columns]
+        return eliminar_faltantes(chunk)
+
+    def combinar(self, otra):
+        if self.eliminadas is None:
+            self.eliminadas = otra.eliminadas
+
+    def reporte(self):
+        print(f"Columnas eliminadas: {self.eliminadas or []}")
+
+
+class EtapaFechas(Etapa):
+    paso, titulo = "03", "Transformación de Columnas (Fechas)"
+
+    def __init__(self):
+        self.fechas_invalidas = 0
+
+    def procesar(self, chunk):
+        chunk = transformar_fechas(chunk)
+        self.fechas_invalidas += int(chunk['fecha_hora_hecho'].isna().sum())
+        return chunk
+
+    def combinar(self, otra):
+        self.fechas_invalidas += otra.fechas_invalidas
+
+    def reporte(self):
+        print(f"Fechas no convertibles (NaT): {self.fechas_invalidas:,}")
+
+
+class EtapaTipos(Etapa):
+    paso, titulo = "04", "Optimización de Tipos de Datos (Numéricos)"
+
+    def __init__(self):
+        self.chunks = 0
+        self.fallos = {}
+
+    def procesar(self, chunk):
+        self.chunks += 1
+        chunk, errores = optimizar_tipos(chunk)
+        for col, e in errores.items():
+            self.fallos.setdefault(col, [0, e])[0] += 1
+        return chunk
+
+    def combinar(self, otra):
+        self.chunks += otra.chunks
+        for col, (n, e) in otra.fallos.items():
+            self.fallos.setdefault(col, [0, e])[0] += n
+
+    def reporte(self):
+        for col, dtype in DTYPE_MAPPING.items():
+            if col in self.fallos:
+                n, e = self.fallos[col]
+                print(f"- Columna '{col}' -> {dtype}: no se pudo convertir en {n}/{self.chunks} chunks. Error: {e}")
+            else:
+                print(f"- Columna '{col}' -> {dtype}")
+
+
+class EtapaRenombrar(Etapa):
+    paso, titulo = "05", "Renombrar y Estandarizar Nombres de Columnas"
+
+    def __init__(self):
+        self.nuevos = None
+
+    def procesar(self, chunk):
+        if self.nuevos is None:
+            self.nuevos = {col: normalize_column_name(col) for col in chunk.columns}
+        return chunk.rename(columns=self.nuevos)
+
+    def combinar(self, otra):
+        if self.nuevos is None:
+            self.nuevos = otra.nuevos
+
+    def reporte(self):
+        cambios = {old: new for old, new in (self.nuevos or {}).items() if old != new}
+        for old, new in cambios.items():
+            print(f"- '{old}' -> '{new}'")
+        if not cambios:
+            print("(No se encontraron columnas que necesiten cambios)")
+
+
+class EtapaUnicidad(Etapa):
+    """Verificación de ``objectid`` (paso 06): solo observa el chunk."""
+
+    paso, titulo = "06", f"Verificación de Unicidad para la columna '{COLUMNA_ID}'"
+
+    def __init__(self):
+        self.vistos = set()
+        self.filas = 0
+
+    def procesar(self, chunk):
+        self.filas += len(chunk)
+        self.vistos.update(chunk[COLUMNA_ID])
+        return chunk
+
+    def combinar(self, otra):
+        self.filas += otra.filas
+        self.vistos |= otra.vistos
+
+    def reporte(self):
+        unicos = len(self.vistos)
+        print(f"Total de filas analizadas: {self.filas:,}")
+        print(f"Valores únicos encontrados: {unicos:,}")
+        if self.filas == unicos:
+            print("(OK) ¡Confirmado! La columna es un identificador único. No hay duplicados.")
+        else:
+            print("(ERROR) ¡Atención! La columna NO es un identificador único.")
+            print(f"   Se encontraron {self.filas - unicos:,} filas duplicadas basadas en '{COLUMNA_ID}'.")
+
+
+class EtapaCategoricas(Etapa):
+    """Valores únicos de las columnas categóricas (paso 07): solo observa el chunk."""
+
+    paso, titulo = "07", "Verificación de Valores Únicos para Columnas Categóricas"
+
+    def __init__(self, ruta_json):
+        self.ruta_json = ruta_json
+        self.unicos = {col: set() for col in CATEGORICAL_COLS}
+
+    def procesar(self, chunk):
+        for col in CATEGORICAL_COLS:
+            if col in chunk.columns:
+                self.unicos[col].update(chunk[col].dropna().unique())
+        return chunk
+
+    def combinar(self, otra):
+        for col, valores in otra.unicos.items():
+            self.unicos[col] |= valores
+
+    def reporte(self):
+        final = {col: sorted(values) for col, values in self.unicos.items()}
+        for col, values in final.items():
+            print(f"\n--- Columna: '{col}' ({len(values)} valores únicos) ---")
+            # Imprimir solo algunos si la lista es muy larga
+            if len(values) > 20:
+                print(values[:10], "...")
+            else:
+                print(values)
+        guardar_json(final, self.ruta_json)
+        print(f"\nDiccionario completo guardado en: {self.ruta_json}")
+
+
+class EtapaCodificacion(Etapa):
+    paso, titulo = "08", "Codificación y Binning"
+
+    def __init__(self, ruta_json):
+        self.ruta_json = ruta_json
+
+    def procesar(self, chunk):
+        return codificar(chunk)
+
+    def reporte(self):
+        guardar_json(data_dictionary, self.ruta_json)
+        print(f"Se ha guardado el diccionario de datos en: {self.ruta_json}")
+
+
+class EtapaAtipicos(Etapa):
+    paso, titulo = "09", "Filtrado de Valores Atípicos (Geográficos)"
+
+    def __init__(self):
+        self.filas = 0
+        self.atipicas = 0
+
+    def procesar(self, chunk):
+        filtrado = filtrar_atipicos(chunk)
+        self.filas += len(chunk)
+        self.atipicas += len(chunk) - len(filtrado)
+        return filtrado
+
+    def combinar(self, otra):
+        self.filas += otra.filas
+        self.atipicas += otra.atipicas
+
+    def reporte(self):
+        print(f"Límites de Latitud: {LAT_MIN} a {LAT_MAX}")
+        print(f"Límites de Longitud: {LON_MIN} a {LON_MAX}")
+        print(f"Total de filas procesadas: {self.filas:,}")
+        print(f"Filas eliminadas como outliers: {self.atipicas:,}")
+        print(f"Filas en el archivo final: {(self.filas - self.atipicas):,}")
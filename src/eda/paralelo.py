@@ -0,0 +1,104 @@
+"""Chunks del EDA en un pool de procesos, con los resultados en orden.
+
+Los bucles de los pasos procesaban ``chunk_iter`` de a un chunk en un solo
+núcleo, aunque cada chunk se transforma sin mirar a los demás (quitar
+columnas, ``pd.to_datetime``, ``astype``, ``map``, el filtro por
+coordenadas). ``mapear_ordenado`` reparte los chunks entre procesos y
+devuelve los resultados en el orden de entrada, así el escritor recibe lo
+mismo que en serie. Como mucho hay ``en_vuelo`` chunks leídos y sin
+consumir, lo que acota la memoria aunque la lectura vaya más rápido que el
+pool.
+
+Las ``Etapa`` acumulan lo que luego muestran en su reporte; con
+``aplicar_etapas`` cada chunk se procesa con una copia vacía de las etapas
+en el worker y lo acumulado vuelve al proceso principal, que lo suma con
+``Etapa.combinar`` en el orden de los chunks.
+
+Se usa ``spawn`` como en ``data_collection/programador.py`` (igual en
+Windows y en Linux, y sin hacer fork con los hilos de pyarrow activos): los
+scripts que llaman a esto necesitan ``if __name__ == "__main__":``.
+Procesos por defecto: ``$EDA_PROCESOS`` o todos los núcleos; con 1 no se
+crea el pool.
+"""
+import os
+import copy
+import time
+import functools
+import collections
+import multiprocessing
+import concurrent.futures
+
+PROCESOS = int(os.environ.get("EDA_PROCESOS") or os.cpu_count() or 1)
+# Chunks en cola por proceso: uno procesándose y otro esperando
+EN_VUELO_POR_PROCESO = 2
+
+
+def mapear_ordenado(funcion, chunks, procesos=None, en_vuelo=None):
+    """Como ``map(funcion, chunks)``, pero en ``procesos`` procesos.
+
+    ``funcion`` tiene que poder importarse desde el worker (definida a nivel
+    de módulo, no una lambda). Como mucho ``en_vuelo`` chunks (por defecto
+    ``EN_VUELO_POR_PROCESO`` por proceso) se envían antes de consumir el
+    resultado más antiguo.
+    """
+    procesos = procesos or PROCESOS
+    if procesos <= 1:
+        yield from map(funcion, chunks)
+        return
+    en_vuelo = en_vuelo or procesos * EN_VUELO_POR_PROCESO
+    pool = concurrent.futures.ProcessPoolExecutor(
+        max_workers=procesos, mp_context=multiprocessing.get_context("spawn")
+    )
+    pendientes = collections.deque()
+    try:
+        for chunk in chunks:
+            if len(pendientes) >= en_vuelo:
+                yield pendientes.popleft().result()
+            pendientes.append(pool.submit(funcion, chunk))
+        while pendientes:
+            yield pendientes.popleft().result()
+    finally:
+        # Si el consumidor se detuvo o hubo un error, no esperar a los chunks que sobran
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _aplicar(etapas, chunk):
+    tiempos = []
+    for etapa in etapas:
+        inicio = time.perf_counter()
+        chunk = etapa.procesar(chunk)
+        tiempos.append(time.perf_counter() - inicio)
+    return chunk, tiempos
+
+
+def _procesar_etapas(plantilla, chunk):
+    """En el worker: aplica una copia vacía de las etapas y devuelve lo acumulado."""
+    etapas = copy.deepcopy(plantilla)
+    chunk, tiempos = _aplicar(etapas, chunk)
+    return chunk, etapas, tiempos
+
+
+def aplicar_etapas(chunks, etapas, procesos=None, tiempos=None, en_vuelo=None):
+    """Aplica ``etapas`` a cada chunk (en paralelo si ``procesos`` > 1) y los devuelve en orden.
+
+    Al terminar, ``etapas`` tienen lo acumulado de todos los chunks, como si
+    se hubieran procesado en serie. Las etapas deben llegar recién creadas:
+    son la plantilla que se copia en cada worker. Si se pasa ``tiempos``
+    (una lista con un valor por etapa), se le suman los segundos de cada
+    etapa (en paralelo, el tiempo sumado de todos los procesos).
+    """
+    if tiempos is None:
+        tiempos = [0.0] * len(etapas)
+    if (procesos or PROCESOS) <= 1:
+        for chunk in chunks:
+            chunk, segundos = _aplicar(etapas, chunk)
+            for j, s in enumerate(segundos):
+                tiempos[j] += s
+            yield chunk
+        return
+    funcion = functools.partial(_procesar_etapas, copy.deepcopy(etapas))
+    for chunk, parciales, segundos in mapear_ordenado(funcion, chunks, procesos, en_vuelo):
+        for j, (etapa, parcial) in enumerate(zip(etapas, parciales)):
+            etapa.combinar(parcial)
+            tiempos[j] += segundos[j]
+        yield chunk
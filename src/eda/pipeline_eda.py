@@ -0,0 +1,130 @@
+"""Pasos 02-09 del EDA en una sola pasada sobre la unión cruda.
+
+Los scripts ``02_manejo_valores_faltantes.py`` -> ``03`` -> ``04`` -> ``05``
+-> ``08`` -> ``09`` leen cada uno un CSV completo en chunks de 50.000 filas
+y escriben otro completo (``denuncias_pasoN_*.csv``): seis vueltas de
+parseo/serialización y seis copias en disco. Aquí las mismas transformaciones
+(``etapas.py``) se encadenan sobre un solo flujo de chunks: el CSV de entrada
+se lee una vez y ``denuncias_final.parquet`` se escribe una vez (ver
+``tablas.py``; con ``--csv`` además se exporta a CSV).
+Las verificaciones 06 (unicidad) y 07 (valores categóricos) observan el
+flujo en su lugar de la cadena, y al final se imprime el reporte de cada paso
+junto con el tiempo que tomó.
+
+Los chunks se transforman en un pool de procesos (``--procesos``, por
+defecto todos los núcleos; ver ``paralelo.py``) y se escriben en orden.
+La salida se escribe en un archivo temporal y reemplaza a la final solo al
+terminar, así que entrada y salida pueden ser el mismo archivo. Las columnas
+categóricas usan las categorías congeladas de ``--categorias`` (por defecto
+``config/categorias_eda.json``, ver ``tablas.py``).
+
+Uso:
+    python src/eda/pipeline_eda.py
+    python src/eda/pipeline_eda.py --csv
+    python src/eda/pipeline_eda.py --procesos 4
+    python src/eda/pipeline_eda.py --entrada data/otro.csv --salida data/limpio.parquet
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.paths import PROCESSED_DATA_DIR, BASE_DIR
+from eda.etapas import (
+    EtapaAtipicos, EtapaCategoricas, EtapaCodificacion, EtapaFaltantes, EtapaFechas,
+    EtapaRenombrar, EtapaTipos, EtapaUnicidad,
+)
+from eda.paralelo import PROCESOS, aplicar_etapas
+from eda.tablas import CATEGORIAS_DEFECTO, EscritorTabla, exportar_csv, iterar_tabla, usar_categorias
+
+# --- Configuración ---
+INPUT_FILE = os.path.join(PROCESSED_DATA_DIR, 'denuncias_final.csv')
+OUTPUT_FILE = os.path.join(PROCESSED_DATA_DIR, 'denuncias_final.parquet')
+REPORTS_DIR = os.path.join(BASE_DIR, 'docs', 'analysis_reports')
+CHUNK_SIZE = 50000
+
+
+def construir_etapas(reports_dir=REPORTS_DIR):
+    """Los pasos en el orden de los scripts; 06 y 07 leían la salida del 05."""
+    os.makedirs(reports_dir, exist_ok=True)
+    return [
+        EtapaFaltantes(),
+        EtapaFechas(),
+        EtapaTipos(),
+        EtapaRenombrar(),
+        EtapaUnicidad(),
+        EtapaCategoricas(os.path.join(reports_dir, '07_diccionario_categoricas.json')),
+        EtapaCodificacion(os.path.join(reports_dir, '08_diccionario_codificacion.json')),
+        EtapaAtipicos(),
+    ]
+
+
+def ejecutar(entrada=INPUT_FILE, salida=OUTPUT_FILE, etapas=None, chunk_size=CHUNK_SIZE, procesos=PROCESOS,
+             categorias=CATEGORIAS_DEFECTO):
+    """Lee ``entrada`` una vez, aplica ``etapas`` a cada chunk y escribe ``salida`` una vez.
+
+    ``categorias``: archivo de categorías congeladas (``None``: sin columnas
+    categóricas). Devuelve ``(filas, ruta)``: la ruta es la de ``salida`` en
+    Parquet, o en CSV si no hay pyarrow.
+    """
+    usar_categorias(categorias)
+    etapas = etapas if etapas is not None else construir_etapas()
+    tiempos = [0.0] * len(etapas)
+
+    with EscritorTabla(salida) as escritor:
+        chunks = aplicar_etapas(iterar_tabla(entrada, chunk_size), etapas, procesos, tiempos)
+        for i, chunk in enumerate(chunks):
+            print(f"Chunk {i+1} procesado.", flush=True)
+            if not chunk.empty:
+                escritor.escribir(chunk)
+
+    for etapa, segundos in zip(etapas, tiempos):
+        print("\n" + "=" * 80)
+        print(f"  Paso {etapa.paso}: {etapa.titulo} ({segundos:.2f} s de CPU)")
+        print("=" * 80)
+        etapa.reporte()
+    return escritor.filas, escritor.ruta
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pasos 02-09 del EDA en una sola lectura de la unión cruda.")
+    parser.add_argument("--entrada", default=INPUT_FILE)
+    parser.add_argument("--salida", default=OUTPUT_FILE)
+    parser.add_argument("--csv", action="store_true", help="Exporta además la salida a CSV")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--reportes", default=REPORTS_DIR, help="Carpeta de los JSON de los pasos 07 y 08")
+    parser.add_argument("--categorias", default=CATEGORIAS_DEFECTO, help="JSON {columna: [categorías]} congelado")
+    parser.add_argument("--sin-categorias", action="store_true", help="Escribe las columnas categóricas como texto")
+    parser.add_argument("--procesos", type=int, default=PROCESOS, help="Procesos para los chunks (1: sin pool)")
+    args = parser.parse_args(argv)
+    categorias = None if args.sin_categorias else args.categorias
+    if categorias is not None and not os.path.isfile(categorias):
+        parser.error(f"no existe el archivo de categorías: {categorias}")
+
+    print("Iniciando Pasos 02-09 del EDA en una sola pasada.")
+    print(f"Archivo de entrada: {args.entrada}")
+    print(f"Archivo de salida: {args.salida}")
+    print("=" * 80)
+
+    start_time = time.time()
+    try:
+        filas, salida = ejecutar(args.entrada, args.salida, construir_etapas(args.reportes), args.chunk_size,
+                                 args.procesos, categorias)
+    except FileNotFoundError:
+        print(f"Error: No se pudo encontrar el archivo de entrada en la ruta especificada:\n{args.entrada}")
+        return None
+    duration = time.time() - start_time
+
+    print("\n" + "=" * 80)
+    print("Proceso completado.")
+    print(f"Filas en el archivo final: {filas:,}")
+    print(f"Se ha creado el archivo final limpio en: {salida}")
+    if args.csv:
+        print(f"Exportado a CSV en: {exportar_csv(salida)}")
+    print(f"Tiempo total de procesamiento: {duration:.2f} segundos.")
+    return filas
+
+
+if __name__ == "__main__":
+    main()
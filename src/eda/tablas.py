@@ -0,0 +1,337 @@
+"""Artefactos intermedios y procesados en Parquet (zstd); el CSV queda solo como exportación.
+
+Antes cada paso le pasaba los datos al siguiente en CSV: el paso 04 convertía
+a ``int8``/``float32``, escribía texto, y el siguiente volvía a inferir todo
+con ``low_memory=False``. Las fechas ya parseadas, los tipos reducidos y las
+categorías se perdían en cada salto. En Parquet se conservan, y leer solo
+algunas columnas no obliga a parsear el resto.
+
+Las rutas de los scripts son las del Parquet (``denuncias_pasoN_*.parquet``).
+``iterar_tabla``/``leer_tabla`` leen el CSV homónimo si el Parquet no existe
+(artefactos de ejecuciones anteriores); sin ``pyarrow``, ``EscritorTabla``
+escribe ese CSV en su lugar. La entrada del paso 02 (la unión cruda
+``denuncias_final.csv``) sigue siendo CSV.
+
+Las columnas de ``config/categorias_eda.json`` (departamento, distrito,
+tipo, turno, ``estado_coord``...) se leen y escriben como ``category`` con
+las categorías fijas de ese archivo: cada fila guarda un código entero en
+lugar de repetir el texto, en memoria y en el Parquet, y el mismo valor
+tiene el mismo código en todos los chunks, archivos y ejecuciones. Las
+listas están congeladas (no se regeneran a partir de los datos, como el
+reporte del paso 07): un valor nuevo se agrega al final, sin mover los
+códigos de los demás. ``usar_categorias`` cambia el archivo o desactiva
+las categorías.
+
+Exportar a CSV:
+    python src/eda/tablas.py "data/3. processed/denuncias_final.parquet"
+"""
+import os
+import sys
+import json
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow es opcional: sin él los artefactos siguen en CSV
+    pa = pq = None
+
+EXTENSION = ".parquet"
+COMPRESION = "zstd"
+CHUNK_EXPORTACION = 100000
+
+_RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+# Categorías congeladas (a partir del diccionario del dataset completo del primer EDA)
+CATEGORIAS_DEFECTO = os.path.join(_RAIZ, "config", "categorias_eda.json")
+_ruta_categorias = CATEGORIAS_DEFECTO
+_tipos = None
+
+
+def disponible():
+    return pa is not None
+
+
+def ruta_csv(ruta):
+    return os.path.splitext(ruta)[0] + ".csv"
+
+
+def ruta_parquet(ruta):
+    return os.path.splitext(ruta)[0] + EXTENSION
+
+
+def es_parquet(ruta):
+    return ruta.endswith(EXTENSION)
+
+
+def ruta_existente(ruta):
+    """El archivo a leer: ``ruta`` si existe; si no, el Parquet o el CSV homónimo.
+
+    Un Parquet sin ``pyarrow`` instalado cuenta como inexistente. Si no hay
+    ninguno devuelve ``ruta`` tal cual, para que la lectura levante
+    ``FileNotFoundError`` con el nombre esperado.
+    """
+    for candidata in (ruta, ruta_parquet(ruta), ruta_csv(ruta)):
+        if os.path.exists(candidata) and (disponible() or not es_parquet(candidata)):
+            return candidata
+    return ruta
+
+
+def _cargar_categorias(ruta):
+    if not os.path.isfile(ruta):
+        raise FileNotFoundError(f"No existe el archivo de categorías: {ruta}")
+    with open(ruta, encoding="utf-8") as f:
+        categorias = json.load(f)
+    if not isinstance(categorias, dict) or not all(isinstance(v, list) for v in categorias.values()):
+        raise ValueError(f"{ruta} debe ser un objeto {{columna: [categorías]}}")
+    return {col: pd.CategoricalDtype(valores) for col, valores in categorias.items() if valores}
+
+
+def usar_categorias(ruta):
+    """Fija el archivo de categorías del proceso (``None``: sin columnas categóricas).
+
+    Se valida y se carga aquí, no en la primera lectura: una ruta errónea
+    falla antes de empezar a procesar.
+    """
+    global _ruta_categorias, _tipos
+    _tipos = _cargar_categorias(ruta) if ruta is not None else {}
+    _ruta_categorias = ruta
+
+
+def ruta_categorias():
+    """El archivo de categorías en uso (``None`` si están desactivadas)."""
+    return _ruta_categorias
+
+
+def tipos_categoricos():
+    """``{columna: pd.CategoricalDtype}`` de las categorías en uso.
+
+    Se carga una vez por proceso. Si aparece un valor que no está, se agrega
+    al final de sus categorías: los códigos de los demás no cambian.
+    """
+    global _tipos
+    if _tipos is None:
+        _tipos = _cargar_categorias(_ruta_categorias) if _ruta_categorias is not None else {}
+    return _tipos
+
+
+def aplicar_categorias(df):
+    """Convierte las columnas categóricas presentes en ``df`` a su tipo fijo."""
+    tipos = tipos_categoricos()
+    for col in df.columns.intersection(list(tipos)):
+        serie, tipo = df[col], tipos[col]
+        if serie.dtype == tipo:
+            continue
+        nuevos = pd.unique(serie[serie.notna() & ~serie.isin(tipo.categories)])
+        if len(nuevos):
+            print(f"Aviso: valores de '{col}' que no están en {os.path.basename(_ruta_categorias)}: "
+                  f"{list(nuevos)[:10]} (se agregan a sus categorías)", flush=True)
+            tipo = tipos[col] = pd.CategoricalDtype(list(tipo.categories) + list(nuevos))
+        df[col] = serie.astype(tipo)
+    return df
+
+
+def columnas_tabla(ruta):
+    ruta = ruta_existente(ruta)
+    if es_parquet(ruta):
+        return pq.read_schema(ruta).names
+    return list(pd.read_csv(ruta, nrows=0).columns)
+
+
+def _validar_columnas(ruta, columns):
+    """Como ``usecols`` de ``read_csv``: pyarrow omitiría en silencio las que falten."""
+    if columns is None:
+        return
+    faltantes = [c for c in columns if c not in pq.read_schema(ruta).names]
+    if faltantes:
+        raise ValueError(f"Columnas no encontradas en {os.path.basename(ruta)}: {faltantes}")
+
+
+def leer_tabla(ruta, columns=None, **opciones_csv):
+    """DataFrame completo (o solo ``columns``). ``opciones_csv`` solo se usan si se lee un CSV."""
+    ruta = ruta_existente(ruta)
+    if es_parquet(ruta):
+        _validar_columnas(ruta, columns)
+        return aplicar_categorias(pd.read_parquet(ruta, columns=columns))
+    return aplicar_categorias(pd.read_csv(ruta, usecols=columns, low_memory=False, **opciones_csv))
+
+
+def iterar_tabla(ruta, chunksize, columns=None, **opciones_csv):
+    """Chunks de ``chunksize`` filas, como ``pd.read_csv(..., chunksize=)``."""
+    ruta = ruta_existente(ruta)
+    if not es_parquet(ruta):
+        for chunk in pd.read_csv(ruta, chunksize=chunksize, usecols=columns, low_memory=False, **opciones_csv):
+            yield aplicar_categorias(chunk)
+        return
+    _validar_columnas(ruta, columns)
+    archivo = pq.ParquetFile(ruta)
+    for lote in archivo.iter_batches(batch_size=chunksize, columns=columns):
+        # Cada lote trae su propio diccionario: se lleva a las categorías fijas
+        yield aplicar_categorias(lote.to_pandas())
+
+
+def _desbordadas(chunk, esquema):
+    """Columnas numéricas del esquema cuyos valores en ``chunk`` no caben en su tipo.
+
+    Devuelve ``{columna: tipo ampliado}``: ``int64`` si los valores siguen
+    siendo enteros, ``float64`` si no.
+    """
+    tipos = {}
+    for campo in esquema:
+        if campo.name not in chunk.columns or not (pa.types.is_integer(campo.type)
+                                                  or pa.types.is_floating(campo.type)):
+            continue
+        try:
+            pa.array(chunk[campo.name], type=campo.type, from_pandas=True)
+        except pa.ArrowInvalid:
+            enteros = pa.types.is_integer(campo.type) and pd.api.types.is_integer_dtype(chunk[campo.name])
+            tipos[campo.name] = pa.int64() if enteros else pa.float64()
+    return tipos
+
+
+class EscritorTabla:
+    """Escribe chunks en un Parquet (un row group por chunk) o, sin pyarrow, en CSV.
+
+    Las columnas categóricas se escriben con diccionario de Parquet. El
+    esquema lo fija el primer chunk. Si después una columna llega con otro
+    tipo (p. ej. el paso 04 no pudo convertirla a ``int8`` porque ese chunk
+    tenía nulos), se convierte a la del esquema; si sus valores no caben en
+    ese tipo (300.7 en un ``int8``), el tipo se amplía a ``int64`` o
+    ``float64`` en lugar de truncarlos (ver ``_desbordadas``). Una columna sin
+    ningún valor en el primer chunk queda con el tipo nulo de Arrow hasta el
+    primer chunk que traiga valores, que fija su tipo (ver ``_promover``). Se
+    escribe en ``.tmp`` y se renombra en ``cerrar``: un fallo no deja un
+    artefacto a medias, y la entrada y la salida pueden ser el mismo archivo.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta_parquet(ruta) if disponible() else ruta_csv(ruta)
+        self.temporal = self.ruta + ".tmp"
+        self.filas = 0
+        self._escritor = None
+        self._primero = True
+
+    def _tabla(self, chunk):
+        if self._escritor is None:
+            tabla = pa.Table.from_pandas(chunk, preserve_index=False)
+            # Columnas vacías en el primer chunk: todavía no se sabe su tipo
+            for col in chunk.columns:
+                if chunk[col].isna().all() and not isinstance(chunk[col].dtype, pd.CategoricalDtype):
+                    i = tabla.schema.get_field_index(col)
+                    tabla = tabla.set_column(i, pa.field(col, pa.null()), pa.nulls(len(tabla)))
+            return tabla
+        nulas = [c.name for c in self._escritor.schema if pa.types.is_null(c.type) and c.name in chunk.columns]
+        con_valores = [c for c in nulas if chunk[c].notna().any()]
+        if con_valores:
+            tipos = pa.Table.from_pandas(chunk[con_valores], preserve_index=False).schema
+            self._promover({col: tipos.field(col).type for col in con_valores})
+        # Las que siguen vacías: pyarrow solo convierte a tipo nulo desde objetos
+        chunk = chunk.assign(**{c: pd.Series(None, index=chunk.index, dtype=object)
+                                for c in nulas if c not in con_valores})
+        esquema = self._escritor.schema
+        try:
+            return pa.Table.from_pandas(chunk, schema=esquema, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, ValueError):
+            pass
+        chunk = chunk.copy()
+        for campo in esquema:
+            if pa.types.is_dictionary(campo.type):
+                chunk[campo.name] = chunk[campo.name].astype(object)
+            elif pa.types.is_string(campo.type) or pa.types.is_large_string(campo.type):
+                chunk[campo.name] = chunk[campo.name].astype('string')
+            elif pa.types.is_integer(campo.type) or pa.types.is_floating(campo.type):
+                chunk[campo.name] = pd.to_numeric(chunk[campo.name], errors='coerce')
+        # Valores que no caben en el tipo del esquema (300.7 en una columna
+        # int8): se amplía el tipo en vez de truncarlos o desbordarlos
+        desbordadas = _desbordadas(chunk, esquema)
+        if desbordadas:
+            self._promover(desbordadas)
+            esquema = self._escritor.schema
+        return pa.Table.from_pandas(chunk, schema=esquema, preserve_index=False)
+
+    def _promover(self, tipos):
+        """Cambia el tipo de las columnas de ``tipos`` (nombre -> tipo de Arrow).
+
+        Sirve para fijar el tipo de columnas que hasta ahora solo traían nulos
+        y para ampliar el de las que se desbordan. Parquet no admite cambiar
+        el esquema de un archivo abierto: lo escrito hasta aquí se copia a un
+        archivo nuevo con el esquema promovido, y se sigue escribiendo en él.
+        """
+        esquema = self._escritor.schema
+        for col, tipo in tipos.items():
+            esquema = esquema.set(esquema.get_field_index(col), pa.field(col, tipo))
+        self._escritor.close()
+        anterior = self.temporal + ".0"
+        os.replace(self.temporal, anterior)
+        self._escritor = pq.ParquetWriter(self.temporal, esquema, compression=COMPRESION)
+        with pq.ParquetFile(anterior) as archivo:
+            for grupo in range(archivo.num_row_groups):
+                self._escritor.write_table(archivo.read_row_group(grupo).cast(esquema))
+        os.remove(anterior)
+
+    def escribir(self, chunk):
+        if chunk.empty and not self._primero:
+            return
+        chunk = aplicar_categorias(chunk.copy(deep=False))
+        if es_parquet(self.ruta):
+            tabla = self._tabla(chunk)
+            if self._escritor is None:
+                self._escritor = pq.ParquetWriter(self.temporal, tabla.schema, compression=COMPRESION)
+            self._escritor.write_table(tabla)
+        else:
+            chunk.to_csv(self.temporal, index=False, mode='w' if self._primero else 'a', header=self._primero)
+        self._primero = False
+        self.filas += len(chunk)
+
+    def cerrar(self):
+        """Publica el archivo; devuelve su ruta (``None`` si no se escribió nada)."""
+        if self._escritor is not None:
+            self._escritor.close()
+            self._escritor = None
+        if self._primero:
+            return None
+        os.replace(self.temporal, self.ruta)
+        return self.ruta
+
+    def abortar(self):
+        if self._escritor is not None:
+            self._escritor.close()
+            self._escritor = None
+        for ruta in (self.temporal, self.temporal + ".0"):
+            if os.path.exists(ruta):
+                os.remove(ruta)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        if tipo is None:
+            self.cerrar()
+        else:
+            self.abortar()
+        return False
+
+
+def guardar_tabla(df, ruta):
+    """Escribe un DataFrame completo como artefacto; devuelve la ruta escrita."""
+    with EscritorTabla(ruta) as escritor:
+        escritor.escribir(df)
+    return escritor.ruta
+
+
+def exportar_csv(ruta, destino=None, chunksize=CHUNK_EXPORTACION):
+    """Exporta un artefacto Parquet a CSV (por defecto, al lado y con el mismo nombre)."""
+    origen = ruta_existente(ruta)
+    destino = destino or ruta_csv(origen)
+    if origen == destino:
+        return destino
+    primero = True
+    for chunk in iterar_tabla(origen, chunksize):
+        chunk.to_csv(destino, index=False, mode='w' if primero else 'a', header=primero)
+        primero = False
+    return destino
+
+
+if __name__ == "__main__":
+    for ruta in sys.argv[1:]:
+        print(f"Exportado: {exportar_csv(ruta)}")
@@ -4,6 +4,7 @@ import numpy as np
 import os
 from dotenv import load_dotenv
 from src.utils.paths import PROCESSED_DATA_DIR, BASE_DIR
+from src.eda.tablas import leer_tabla
 
 # Cargar variables de entorno desde el archivo .env en la raíz del proyecto
 load_dotenv(dotenv_path=os.path.join(BASE_DIR, '.env'))
@@ -15,7 +16,7 @@ MAPBOX_TOKEN = os.getenv("MAPBOX_ACCESS_TOKEN")
 REPORTS_DIR = os.path.join(BASE_DIR, 'reports', 'visualizations')
 os.makedirs(REPORTS_DIR, exist_ok=True)
 
-CSV_FILE_PATH = os.path.join(PROCESSED_DATA_DIR, "denuncias_final.csv")
+CSV_FILE_PATH = os.path.join(PROCESSED_DATA_DIR, "denuncias_final.parquet")
 OUTPUT_HTML_FILE = os.path.join(REPORTS_DIR, "heatmap_denuncias_lima.html")
 
 # Filtros geográficos
@@ -35,9 +36,9 @@ def main():
 
     print(f"Paso 1: Leyendo el archivo de denuncias: {CSV_FILE_PATH}")
     try:
-        df = pd.read_csv(
+        df = leer_tabla(
             CSV_FILE_PATH,
-            usecols=['departamento_hecho', 'provincia_hecho', 'lat', 'lon'],
+            columns=['departamento_hecho', 'provincia_hecho', 'lat', 'lon'],
             dtype={'departamento_hecho': str, 'provincia_hecho': str}
         )
     except FileNotFoundError:
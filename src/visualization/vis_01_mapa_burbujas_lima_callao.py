@@ -4,6 +4,7 @@ import numpy as np
 import os
 from dotenv import load_dotenv
 from src.utils.paths import PROCESSED_DATA_DIR, BASE_DIR
+from src.eda.tablas import leer_tabla
 
 # Cargar variables de entorno desde el archivo .env en la raíz del proyecto
 load_dotenv(dotenv_path=os.path.join(BASE_DIR, '.env'))
@@ -15,7 +16,7 @@ MAPBOX_TOKEN = os.getenv("MAPBOX_ACCESS_TOKEN")
 REPORTS_DIR = os.path.join(BASE_DIR, 'reports', 'visualizations')
 os.makedirs(REPORTS_DIR, exist_ok=True)
 
-INPUT_CSV_PATH = os.path.join(PROCESSED_DATA_DIR, "denuncias_lima_callao.csv")
+INPUT_CSV_PATH = os.path.join(PROCESSED_DATA_DIR, "denuncias_lima_callao.parquet")
 OUTPUT_HTML_PATH = os.path.join(REPORTS_DIR, "mapa_burbujas_lima_callao.html")
 
 def generar_mapa_burbujas():
@@ -29,7 +30,7 @@ def generar_mapa_burbujas():
 
     print(f"Paso 1: Leyendo el archivo CSV optimizado: {INPUT_CSV_PATH}")
     try:
-        df = pd.read_csv(INPUT_CSV_PATH)
+        df = leer_tabla(INPUT_CSV_PATH)
     except FileNotFoundError:
         print(f"Error: No se encontró el archivo CSV en la ruta: {INPUT_CSV_PATH}")
         print("Asegúrate de haber ejecutado primero el script 'src/data_processing/01_filtrar_lima_callao.py'")
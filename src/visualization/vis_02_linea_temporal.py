@@ -2,13 +2,14 @@ import pandas as pd
 import plotly.express as px
 import os
 from src.utils.paths import PROCESSED_DATA_DIR, BASE_DIR
+from src.eda.tablas import leer_tabla
 
 # --- CONFIGURACIÓN ---
 # Rutas de entrada y salida usando el módulo de rutas
 REPORTS_DIR = os.path.join(BASE_DIR, 'reports', 'visualizations')
 os.makedirs(REPORTS_DIR, exist_ok=True)
 
-INPUT_CSV_PATH = os.path.join(PROCESSED_DATA_DIR, "denuncias_lima_callao.csv")
+INPUT_CSV_PATH = os.path.join(PROCESSED_DATA_DIR, "denuncias_lima_callao.parquet")
 OUTPUT_HTML_PATH = os.path.join(REPORTS_DIR, "02_linea_temporal.html")
 
 def generar_linea_temporal():
@@ -17,7 +18,7 @@ def generar_linea_temporal():
     """
     print(f"Leyendo datos desde: {INPUT_CSV_PATH}")
     try:
-        df = pd.read_csv(INPUT_CSV_PATH, usecols=['fecha_hora_hecho'])
+        df = leer_tabla(INPUT_CSV_PATH, columns=['fecha_hora_hecho'])
     except FileNotFoundError:
         print(f"Error: No se encontró el archivo CSV: {INPUT_CSV_PATH}")
         return
@@ -2,13 +2,15 @@ import pandas as pd
 import plotly.express as px
 import os
 from src.utils.paths import PROCESSED_DATA_DIR, BASE_DIR
+from src.data_collection.fechas import CAMPO_DIA_SEMANA, CAMPO_FECHA, CAMPO_HORA, DIAS_SEMANA
+from src.eda.tablas import columnas_tabla, leer_tabla
 
 # --- CONFIGURACIÓN ---
 # Rutas de entrada y salida usando el módulo de rutas
 REPORTS_DIR = os.path.join(BASE_DIR, 'reports', 'visualizations')
 os.makedirs(REPORTS_DIR, exist_ok=True)
 
-INPUT_CSV_PATH = os.path.join(PROCESSED_DATA_DIR, "denuncias_lima_callao.csv")
+INPUT_CSV_PATH = os.path.join(PROCESSED_DATA_DIR, "denuncias_lima_callao.parquet")
 OUTPUT_HTML_PATH = os.path.join(REPORTS_DIR, "03_heatmap_hora_dia.html")
 
 def generar_heatmap_hora_dia():
@@ -17,7 +19,16 @@ def generar_heatmap_hora_dia():
     """
     print(f"Leyendo datos desde: {INPUT_CSV_PATH}")
     try:
-        df = pd.read_csv(INPUT_CSV_PATH, usecols=['fecha_hora_hecho'])
+        columnas = columnas_tabla(INPUT_CSV_PATH)
+        if CAMPO_HORA in columnas and CAMPO_DIA_SEMANA in columnas:
+            # Enteros derivados en la ingesta: no hace falta parsear fechas
+            df = leer_tabla(INPUT_CSV_PATH, columns=[CAMPO_HORA, CAMPO_DIA_SEMANA]).dropna()
+            df = df.rename(columns={CAMPO_HORA: 'hora', CAMPO_DIA_SEMANA: 'dia'}).astype('int8')
+        else:
+            print("Procesando fechas para extraer día y hora...")
+            fecha = pd.to_datetime(leer_tabla(INPUT_CSV_PATH, columns=[CAMPO_FECHA])[CAMPO_FECHA],
+                                   errors='coerce').dropna()
+            df = pd.DataFrame({'hora': fecha.dt.hour, 'dia': fecha.dt.weekday})
     except FileNotFoundError:
         print(f"Error: No se encontró el archivo CSV: {INPUT_CSV_PATH}")
         return
@@ -25,20 +36,9 @@ def generar_heatmap_hora_dia():
         print(f"Error al leer el CSV: {e}")
         return
 
-    print("Procesando fechas para extraer día y hora...")
-    df['fecha'] = pd.to_datetime(df['fecha_hora_hecho'], errors='coerce')
-    df.dropna(subset=['fecha'], inplace=True)
-
-    # Extraer hora y día de la semana
-    df['hora'] = df['fecha'].dt.hour
-    df['dia_semana'] = df['fecha'].dt.day_name()
-
-    # Ordenar los días de la semana
-    dias_ordenados = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-    df['dia_semana'] = pd.Categorical(df['dia_semana'], categories=dias_ordenados, ordered=True)
-
-    # Agrupar para obtener la matriz de calor
-    heatmap_data = df.groupby(['dia_semana', 'hora']).size().reset_index(name='conteo')
+    # Agrupar sobre los enteros; el nombre del día solo se genera para el gráfico
+    heatmap_data = df.groupby(['dia', 'hora']).size().reset_index(name='conteo')
+    heatmap_data['dia_semana'] = pd.Categorical.from_codes(heatmap_data['dia'], DIAS_SEMANA, ordered=True)
 
     print("Generando mapa de calor...")
     fig = px.density_heatmap(
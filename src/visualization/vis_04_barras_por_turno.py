@@ -2,13 +2,15 @@ import pandas as pd
 import plotly.express as px
 import os
 from src.utils.paths import PROCESSED_DATA_DIR, BASE_DIR
+from src.data_collection.agregados import conteos
+from src.eda.tablas import ruta_existente
 
 # --- CONFIGURACIÓN ---
 # Rutas de entrada y salida usando el módulo de rutas
 REPORTS_DIR = os.path.join(BASE_DIR, 'reports', 'visualizations')
 os.makedirs(REPORTS_DIR, exist_ok=True)
 
-INPUT_CSV_PATH = os.path.join(PROCESSED_DATA_DIR, "denuncias_lima_callao.csv")
+INPUT_CSV_PATH = os.path.join(PROCESSED_DATA_DIR, "denuncias_lima_callao.parquet")
 OUTPUT_HTML_PATH = os.path.join(REPORTS_DIR, "04_barras_por_turno.html")
 
 def generar_barras_por_turno():
@@ -17,7 +19,7 @@ def generar_barras_por_turno():
     """
     print(f"Leyendo datos desde: {INPUT_CSV_PATH}")
     try:
-        df = pd.read_csv(INPUT_CSV_PATH, usecols=['turno_hecho'])
+        conteo = conteos("lima_callao_por_turno", ruta_existente(INPUT_CSV_PATH))
     except FileNotFoundError:
         print(f"Error: No se encontró el archivo CSV: {INPUT_CSV_PATH}")
         return
@@ -26,7 +28,7 @@ def generar_barras_por_turno():
         return
 
     print("Contando denuncias por turno...")
-    conteo_por_turno = df['turno_hecho'].value_counts().reset_index()
+    conteo_por_turno = conteo[['turno_hecho', 'conteo']].copy()
     conteo_por_turno.columns = ['Turno', 'Número de Denuncias']
 
     # Ordenar por un orden lógico en lugar de por conteo
@@ -39,7 +41,7 @@ def generar_barras_por_turno():
         conteo_por_turno,
         x='Turno',
         y='Número de Denuncias',
-        title='Número de Denuncias por Turno del Día',
+        title=f'Número de Denuncias por Turno del Día<br><sup>Fuente: {conteo.attrs["fuente"]}</sup>',
         labels={'Turno': 'Turno del Día', 'Número de Denuncias': 'Total de Denuncias'}
     )
     
@@ -1,14 +1,15 @@
-import pandas as pd
 import plotly.express as px
 import os
 from src.utils.paths import PROCESSED_DATA_DIR, BASE_DIR
+from src.data_collection.agregados import conteos
+from src.eda.tablas import ruta_existente
 
 # --- CONFIGURACIÓN ---
 # Rutas de entrada y salida usando el módulo de rutas
 REPORTS_DIR = os.path.join(BASE_DIR, 'reports', 'visualizations')
 os.makedirs(REPORTS_DIR, exist_ok=True)
 
-INPUT_CSV_PATH = os.path.join(PROCESSED_DATA_DIR, "denuncias_lima_callao.csv")
+INPUT_CSV_PATH = os.path.join(PROCESSED_DATA_DIR, "denuncias_lima_callao.parquet")
 OUTPUT_HTML_PATH = os.path.join(REPORTS_DIR, "05_barras_top_delitos.html")
 TOP_N = 10
 
@@ -18,7 +19,7 @@ def generar_barras_top_delitos():
     """
     print(f"Leyendo datos desde: {INPUT_CSV_PATH}")
     try:
-        df = pd.read_csv(INPUT_CSV_PATH, usecols=['tipo_hecho'])
+        conteo = conteos("lima_callao_por_tipo", ruta_existente(INPUT_CSV_PATH))
     except FileNotFoundError:
         print(f"Error: No se encontró el archivo CSV: {INPUT_CSV_PATH}")
         return
@@ -27,7 +28,7 @@ def generar_barras_top_delitos():
         return
 
     print(f"Contando los {TOP_N} tipos de hechos más comunes...")
-    top_delitos = df['tipo_hecho'].value_counts().nlargest(TOP_N).reset_index()
+    top_delitos = conteo.nlargest(TOP_N, 'conteo')[['tipo_hecho', 'conteo']]
     top_delitos.columns = ['Tipo de Hecho', 'Número de Denuncias']
 
     print("Generando gráfico de barras...")
@@ -36,7 +37,7 @@ def generar_barras_top_delitos():
         x='Número de Denuncias',
         y='Tipo de Hecho',
         orientation='h', # Gráfico horizontal para mejor legibilidad
-        title=f'Top {TOP_N} Tipos de Hechos Denunciados'
+        title=f'Top {TOP_N} Tipos de Hechos Denunciados<br><sup>Fuente: {conteo.attrs["fuente"]}</sup>'
     )
     
     # Invertir el eje Y para que el más común aparezca arriba
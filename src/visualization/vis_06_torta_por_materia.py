@@ -1,14 +1,15 @@
-import pandas as pd
 import plotly.express as px
 import os
 from src.utils.paths import PROCESSED_DATA_DIR, BASE_DIR
+from src.data_collection.agregados import conteos
+from src.eda.tablas import ruta_existente
 
 # --- CONFIGURACIÓN ---
 # Rutas de entrada y salida usando el módulo de rutas
 REPORTS_DIR = os.path.join(BASE_DIR, 'reports', 'visualizations')
 os.makedirs(REPORTS_DIR, exist_ok=True)
 
-INPUT_CSV_PATH = os.path.join(PROCESSED_DATA_DIR, "denuncias_lima_callao.csv")
+INPUT_CSV_PATH = os.path.join(PROCESSED_DATA_DIR, "denuncias_lima_callao.parquet")
 OUTPUT_HTML_PATH = os.path.join(REPORTS_DIR, "06_torta_por_materia.html")
 
 def generar_torta_por_materia():
@@ -17,7 +18,7 @@ def generar_torta_por_materia():
     """
     print(f"Leyendo datos desde: {INPUT_CSV_PATH}")
     try:
-        df = pd.read_csv(INPUT_CSV_PATH, usecols=['materia_hecho'])
+        conteo = conteos("lima_callao_por_materia", ruta_existente(INPUT_CSV_PATH))
     except FileNotFoundError:
         print(f"Error: No se encontró el archivo CSV: {INPUT_CSV_PATH}")
         return
@@ -26,7 +27,7 @@ def generar_torta_por_materia():
         return
 
     print("Contando denuncias por materia...")
-    conteo_por_materia = df['materia_hecho'].value_counts().reset_index()
+    conteo_por_materia = conteo[['materia_hecho', 'conteo']].copy()
     conteo_por_materia.columns = ['Materia del Hecho', 'Número de Denuncias']
 
     print("Generando gráfico de torta...")
@@ -34,7 +35,7 @@ def generar_torta_por_materia():
         conteo_por_materia,
         names='Materia del Hecho',
         values='Número de Denuncias',
-        title='Distribución de Denuncias por Materia del Hecho',
+        title=f'Distribución de Denuncias por Materia del Hecho<br><sup>Fuente: {conteo.attrs["fuente"]}</sup>',
         hole=.3 # Estilo "donut"
     )
     
@@ -2,13 +2,15 @@ import pandas as pd
 import plotly.express as px
 import os
 from src.utils.paths import PROCESSED_DATA_DIR, BASE_DIR
+from src.data_collection.agregados import conteos
+from src.eda.tablas import ruta_existente
 
 # --- CONFIGURACIÓN ---
 # Rutas de entrada y salida usando el módulo de rutas
 REPORTS_DIR = os.path.join(BASE_DIR, 'reports', 'visualizations')
 os.makedirs(REPORTS_DIR, exist_ok=True)
 
-INPUT_CSV_PATH = os.path.join(PROCESSED_DATA_DIR, "denuncias_lima_callao.csv")
+INPUT_CSV_PATH = os.path.join(PROCESSED_DATA_DIR, "denuncias_lima_callao.parquet")
 OUTPUT_HTML_PATH = os.path.join(REPORTS_DIR, "07_barras_apiladas_delito_turno.html")
 TOP_N_DELITOS = 5
 
@@ -18,7 +20,7 @@ def generar_barras_apiladas():
     """
     print(f"Leyendo datos desde: {INPUT_CSV_PATH}")
     try:
-        df = pd.read_csv(INPUT_CSV_PATH, usecols=['tipo_hecho', 'turno_hecho'])
+        conteo = conteos("lima_callao_por_tipo_turno", ruta_existente(INPUT_CSV_PATH))
     except FileNotFoundError:
         print(f"Error: No se encontró el archivo CSV: {INPUT_CSV_PATH}")
         return
@@ -28,13 +30,11 @@ def generar_barras_apiladas():
 
     print(f"Calculando el top {TOP_N_DELITOS} de tipos de hecho...")
     # Encontrar los N tipos de hechos más comunes
-    top_delitos_lista = df['tipo_hecho'].value_counts().nlargest(TOP_N_DELITOS).index.tolist()
-    
-    # Filtrar el DataFrame para incluir solo esos tipos
-    df_filtrado = df[df['tipo_hecho'].isin(top_delitos_lista)]
+    top_delitos_lista = conteo.groupby('tipo_hecho', observed=True)['conteo'].sum().nlargest(TOP_N_DELITOS).index.tolist()
 
+    # Filtrar los conteos para incluir solo esos tipos
     print("Agrupando datos por tipo de hecho y turno...")
-    conteo_agrupado = df_filtrado.groupby(['tipo_hecho', 'turno_hecho']).size().reset_index(name='conteo')
+    conteo_agrupado = conteo[conteo['tipo_hecho'].isin(top_delitos_lista)].copy()
 
     # Ordenar los turnos de forma lógica
     orden_turnos = ['mañana', 'tarde', 'noche', 'madrugada']
@@ -47,7 +47,7 @@ def generar_barras_apiladas():
         x='tipo_hecho',
         y='conteo',
         color='turno_hecho',
-        title=f'Distribución por Turno de los {TOP_N_DELITOS} Tipos de Hecho más Comunes',
+        title=f'Distribución por Turno de los {TOP_N_DELITOS} Tipos de Hecho más Comunes<br><sup>Fuente: {conteo.attrs["fuente"]}</sup>',
         labels={'tipo_hecho': 'Tipo de Hecho', 'conteo': 'Número de Denuncias', 'turno_hecho': 'Turno'}
     )
     
@@ -1,14 +1,15 @@
-import pandas as pd
 import plotly.express as px
 import os
 from src.utils.paths import PROCESSED_DATA_DIR, BASE_DIR
+from src.data_collection.agregados import conteos
+from src.eda.tablas import ruta_existente
 
 # --- CONFIGURACIÓN ---
 # Rutas de entrada y salida usando el módulo de rutas
 REPORTS_DIR = os.path.join(BASE_DIR, 'reports', 'visualizations')
 os.makedirs(REPORTS_DIR, exist_ok=True)
 
-INPUT_CSV_PATH = os.path.join(PROCESSED_DATA_DIR, "denuncias_lima_callao.csv")
+INPUT_CSV_PATH = os.path.join(PROCESSED_DATA_DIR, "denuncias_lima_callao.parquet")
 OUTPUT_HTML_PATH = os.path.join(REPORTS_DIR, "08_barras_top_distritos.html")
 TOP_N = 15
 
@@ -18,7 +19,7 @@ def generar_barras_top_distritos():
     """
     print(f"Leyendo datos desde: {INPUT_CSV_PATH}")
     try:
-        df = pd.read_csv(INPUT_CSV_PATH, usecols=['distrito_hecho'])
+        conteo = conteos("lima_callao_por_distrito", ruta_existente(INPUT_CSV_PATH))
     except FileNotFoundError:
         print(f"Error: No se encontró el archivo CSV: {INPUT_CSV_PATH}")
         return
@@ -27,7 +28,7 @@ def generar_barras_top_distritos():
         return
 
     print(f"Contando los {TOP_N} distritos con más denuncias...")
-    top_distritos = df['distrito_hecho'].value_counts().nlargest(TOP_N).reset_index()
+    top_distritos = conteo.nlargest(TOP_N, 'conteo')[['distrito_hecho', 'conteo']]
     top_distritos.columns = ['Distrito', 'Número de Denuncias']
 
     print("Generando gráfico de barras...")
@@ -36,7 +37,7 @@ def generar_barras_top_distritos():
         x='Número de Denuncias',
         y='Distrito',
         orientation='h',
-        title=f'Top {TOP_N} Distritos con Mayor Número de Denuncias'
+        title=f'Top {TOP_N} Distritos con Mayor Número de Denuncias<br><sup>Fuente: {conteo.attrs["fuente"]}</sup>'
     )
     
     # Invertir el eje Y para que el más común aparezca arriba
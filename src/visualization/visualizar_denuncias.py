@@ -1,10 +1,10 @@
 
-import pandas as pd
 import plotly.express as px
-import json
 import requests
 import os
 from src.utils.paths import PROCESSED_DATA_DIR, BASE_DIR
+from src.data_collection.agregados import conteos
+from src.eda.tablas import ruta_existente
 
 # --- CONFIGURACIÓN ---
 
@@ -12,7 +12,7 @@ from src.utils.paths import PROCESSED_DATA_DIR, BASE_DIR
 REPORTS_DIR = os.path.join(BASE_DIR, 'reports', 'visualizations')
 os.makedirs(REPORTS_DIR, exist_ok=True)
 
-CSV_FILE_PATH = os.path.join(PROCESSED_DATA_DIR, "denuncias_final.csv")
+CSV_FILE_PATH = os.path.join(PROCESSED_DATA_DIR, "denuncias_final.parquet")
 
 # URL del archivo GeoJSON con los límites de los departamentos de Perú
 GEOJSON_URL = "https://raw.githubusercontent.com/juaneladio/peru-geojson/master/peru_departamental_simple.geojson"
@@ -28,8 +28,8 @@ def main():
     """
     print(f"Paso 1: Leyendo el archivo de denuncias: {CSV_FILE_PATH}")
     try:
-        # Lee el archivo CSV. Especificamos el tipo de 'departamento_hecho' como string.
-        df = pd.read_csv(CSV_FILE_PATH, usecols=['departamento_hecho'], dtype={'departamento_hecho': str})
+        # Conteos agregados en el servidor si están al día; si no, se cuentan las filas del CSV.
+        conteo = conteos("por_departamento", ruta_existente(CSV_FILE_PATH))
     except FileNotFoundError:
         print(f"Error: No se encontró el archivo CSV en la ruta: {CSV_FILE_PATH}")
         print("Asegúrate de que el archivo exista y la ruta sea correcta.")
@@ -39,9 +39,7 @@ def main():
         return
 
     print("Paso 2: Contando las denuncias por departamento...")
-    # Agrupa por departamento y cuenta el número de denuncias.
-    # reset_index() convierte el resultado de nuevo en un DataFrame.
-    denuncias_por_dpto = df['departamento_hecho'].value_counts().reset_index()
+    denuncias_por_dpto = conteo[['departamento_hecho', 'conteo']].copy()
     # Renombra las columnas para que sean más claras.
     denuncias_por_dpto.columns = ['departamento', 'cantidad_denuncias']
     print("Conteo finalizado:")
@@ -76,7 +74,7 @@ def main():
 
     # Actualiza el diseño del mapa para añadir un título.
     fig.update_layout(
-        title_text='<b>Número de Denuncias por Departamento en Perú</b>',
+        title_text=f'<b>Número de Denuncias por Departamento en Perú</b><br><sup>Fuente: {conteo.attrs["fuente"]}</sup>',
         title_x=0.5, # Centrar el título
         margin={"r":0,"t":40,"l":0,"b":0}
     )
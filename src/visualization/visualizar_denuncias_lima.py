@@ -1,10 +1,9 @@
 
-import pandas as pd
 import plotly.express as px
-import json
 import requests
 import os
 from src.utils.paths import PROCESSED_DATA_DIR, BASE_DIR
+from src.eda.tablas import leer_tabla
 
 # --- CONFIGURACIÓN ---
 
@@ -12,7 +11,7 @@ from src.utils.paths import PROCESSED_DATA_DIR, BASE_DIR
 REPORTS_DIR = os.path.join(BASE_DIR, 'reports', 'visualizations')
 os.makedirs(REPORTS_DIR, exist_ok=True)
 
-CSV_FILE_PATH = os.path.join(PROCESSED_DATA_DIR, "denuncias_final.csv")
+CSV_FILE_PATH = os.path.join(PROCESSED_DATA_DIR, "denuncias_final.parquet")
 
 # URL del archivo GeoJSON con los límites de las provincias de Perú
 GEOJSON_URL = "https://raw.githubusercontent.com/juaneladio/peru-geojson/master/peru_provincial_simple.geojson"
@@ -32,7 +31,7 @@ def main():
     print(f"Paso 1: Leyendo el archivo de denuncias: {CSV_FILE_PATH}")
     try:
         # Lee solo las columnas necesarias para optimizar la memoria.
-        df = pd.read_csv(CSV_FILE_PATH, usecols=['departamento_hecho', 'provincia_hecho'], dtype=str)
+        df = leer_tabla(CSV_FILE_PATH, columns=['departamento_hecho', 'provincia_hecho'], dtype=str)
     except FileNotFoundError:
         print(f"Error: No se encontró el archivo CSV en la ruta: {CSV_FILE_PATH}")
         return
@@ -48,7 +47,8 @@ def main():
         return
 
     print("Paso 3: Contando las denuncias por provincia...")
-    denuncias_por_prov = df_lima['provincia_hecho'].value_counts().reset_index()
+    # provincia_hecho es categórica: value_counts incluiría las de otros departamentos con 0
+    denuncias_por_prov = df_lima['provincia_hecho'].value_counts().loc[lambda c: c > 0].reset_index()
     denuncias_por_prov.columns = ['provincia', 'cantidad_denuncias']
     print("Conteo finalizado:")
     print(denuncias_por_prov)
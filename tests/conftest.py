@@ -0,0 +1,31 @@
+"""Configuración común de los tests: ``src`` en el path, como hacen los scripts.
+
+Uso:
+    python -m pytest -q
+"""
+import os
+import sys
+import types
+import atexit
+import shutil
+import tempfile
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(RAIZ, "src"))
+
+# utils/paths.py (las rutas de datos de cada máquina) puede no estar en el
+# checkout; los módulos del EDA lo importan al cargarse, así que sin él se
+# usa uno que apunta a un directorio temporal
+try:
+    import utils.paths  # noqa: F401
+except ImportError:
+    _base = tempfile.mkdtemp(prefix="denuncias_tests_")
+    atexit.register(shutil.rmtree, _base, ignore_errors=True)
+    paths = types.ModuleType("utils.paths")
+    paths.BASE_DIR = _base
+    paths.RAW_DATA_DIR = os.path.join(_base, "data", "1. raw")
+    paths.PROCESSED_DATA_DIR = os.path.join(_base, "data", "3. processed")
+    utils = types.ModuleType("utils")
+    utils.paths = paths
+    sys.modules["utils"] = utils
+    sys.modules["utils.paths"] = paths
@@ -0,0 +1,18 @@
+from data_collection.capacidades import CapacidadesCapa, obtener_capacidades
+
+URL_A = "http://servidor-a/arcgis/rest/services/denuncias/MapServer/0/query"
+URL_B = "http://servidor-b/arcgis/rest/services/denuncias/MapServer/0/query"
+
+
+def test_la_cache_no_sirve_capacidades_de_otra_url(tmp_path):
+    ruta = str(tmp_path / "_capacidades.json")
+    sondeos = []
+
+    def sondeo(session, url_query, timeout):
+        sondeos.append(url_query)
+        return CapacidadesCapa(max_record_count=1000 if url_query == URL_A else 2000)
+
+    assert obtener_capacidades(None, URL_A, ruta, sondeo=sondeo).max_record_count == 1000
+    assert obtener_capacidades(None, URL_B, ruta, sondeo=sondeo).max_record_count == 2000
+    assert obtener_capacidades(None, URL_A, ruta, sondeo=sondeo).max_record_count == 1000
+    assert sondeos == [URL_A, URL_B]
@@ -0,0 +1,73 @@
+import os
+
+import pandas as pd
+
+from data_collection.checkpoint import MANIFEST, Checkpoint, CheckpointTramos
+
+WHERE = "fecha_hora_hecho >= DATE '2020-01-01' AND fecha_hora_hecho < DATE '2020-07-01'"
+
+
+def _lote(ids):
+    return pd.DataFrame({"objectid": ids, "tipo_hecho": ["HURTO"] * len(ids)})
+
+
+def test_reanuda_sin_los_lotes_completados(tmp_path):
+    directorio = str(tmp_path / "2020_S1")
+    checkpoint = Checkpoint(directorio, WHERE)
+    checkpoint.guardar_lote([1, 2, 3], _lote([1, 2, 3]))
+    checkpoint.guardar_lote([7, 8], _lote([7, 8]))
+
+    reanudado = Checkpoint(directorio, WHERE)
+    assert reanudado.lotes_completados == 2
+    assert reanudado.pendientes(range(1, 11)) == [4, 5, 6, 9, 10]
+    assert reanudado.max_oid == 8
+    partes = reanudado.archivos_parciales()
+    assert [filas for _, filas in partes] == [3, 2]
+    assert pd.concat(pd.read_csv(ruta) for ruta, _ in partes)["objectid"].tolist() == [1, 2, 3, 7, 8]
+
+
+def test_reanuda_con_otro_tamano_de_lote(tmp_path):
+    """Los rangos son intervalos de objectId: un lote nuevo puede solaparse con uno guardado."""
+    directorio = str(tmp_path / "2020_S1")
+    checkpoint = Checkpoint(directorio, WHERE)
+    checkpoint.guardar_lote([1, 2, 3, 4], _lote([1, 2, 3, 4]))
+    checkpoint.guardar_lote([3, 4, 5, 6], _lote([3, 4, 5, 6]))
+
+    assert Checkpoint(directorio, WHERE).pendientes(range(1, 9)) == [7, 8]
+
+
+def test_ignora_la_linea_truncada_y_los_parciales_perdidos(tmp_path):
+    directorio = str(tmp_path / "2020_S1")
+    checkpoint = Checkpoint(directorio, WHERE)
+    checkpoint.guardar_lote([1, 2], _lote([1, 2]))
+    checkpoint.guardar_lote([3, 4], _lote([3, 4]))
+    os.remove(os.path.join(directorio, "lote_3_4.csv"))
+    with open(os.path.join(directorio, MANIFEST), "a", encoding="utf-8") as f:
+        f.write('{"inicio": 5, "fin"')  # corte a mitad de una línea
+
+    reanudado = Checkpoint(directorio, WHERE)
+    assert reanudado.pendientes(range(1, 7)) == [3, 4, 5, 6]
+
+
+def test_descarta_el_checkpoint_de_otra_consulta(tmp_path):
+    directorio = str(tmp_path / "2020_S1")
+    Checkpoint(directorio, WHERE).guardar_lote([1, 2], _lote([1, 2]))
+
+    assert Checkpoint(directorio, WHERE, out_fields="objectid,tipo_hecho").pendientes([1, 2]) == [1, 2]
+    assert Checkpoint(directorio, "1=1").lotes_completados == 0
+
+
+def test_tramos_pendientes_entre_paginas(tmp_path):
+    directorio = str(tmp_path / "2020_S1")
+    checkpoint = CheckpointTramos(directorio, WHERE)
+    assert checkpoint.huecos(0, 1000) == [((0, -1), 1000, True)]
+
+    # Un tramo desde 0 con dos páginas y otro, robado, que empieza en 500
+    checkpoint.guardar_pagina((0, -1), (100, 5), _lote([5]), "a.csv")
+    checkpoint.guardar_pagina((100, 5), (200, 1), _lote([1]), "b.csv")
+    checkpoint.guardar_pagina((500, -1), (600, 3), _lote([3]), "c.csv")
+
+    reanudado = CheckpointTramos(directorio, WHERE)
+    assert reanudado.filas == 3
+    assert reanudado.huecos(0, 1000) == [((200, 1), 500, False), ((600, 3), 1000, True)]
+    assert [os.path.basename(ruta) for ruta, _ in reanudado.archivos_parciales()] == ["a.csv", "b.csv", "c.csv"]
@@ -0,0 +1,98 @@
+import json
+import itertools
+
+import pandas as pd
+import pytest
+
+from eda import etapas as et
+from eda import tablas
+from eda.dag_eda import CachePasos, construir_dag, ejecutar_dag
+
+TODOS = ["02", "03", "04", "05", "06", "07", "08", "09"]
+FILAS = 300
+
+
+def _ciclo(valores):
+    return list(itertools.islice(itertools.cycle(valores), FILAS))
+
+
+@pytest.fixture
+def entorno(tmp_path):
+    """Unión cruda pequeña, caché y carpeta de reportes en ``tmp_path``."""
+    pd.DataFrame({
+        "objectid": range(1, FILAS + 1),
+        "fecha_hora_hecho": pd.date_range("2020-01-01", periods=FILAS, freq="7h").strftime("%Y-%m-%d %H:%M:%S"),
+        "mes_hecho": _ciclo(range(1, 13)),
+        "departamento_hecho": _ciclo(["LIMA", "CALLAO", "CUSCO"]),
+        "turno_hecho": _ciclo(["madrugada", "mañana", "tarde", "noche"]),
+        "estado_coord": _ciclo(["CON COORDENADA", "SIN COORDENADA XX", "SIN COORDENADA YY"]),
+        "lat": _ciclo([-12.05, -11.9, 5.0]),
+        "lon": _ciclo([-77.04, -77.1, -70.0]),
+        "barrio": None,
+    }).to_csv(tmp_path / "denuncias_final.csv", index=False)
+    yield tmp_path
+    tablas.usar_categorias(tablas.CATEGORIAS_DEFECTO)
+
+
+def _ejecutar(entorno, categorias=tablas.CATEGORIAS_DEFECTO):
+    resumen = ejecutar_dag(str(entorno / "denuncias_final.csv"), str(entorno / "final.parquet"),
+                           construir_dag(str(entorno / "reportes")), CachePasos(str(entorno / "cache")),
+                           chunk_size=100, procesos=1, categorias=categorias)
+    return {nombre: estado for nombre, estado, _, _ in resumen}
+
+
+def _calculados(estados):
+    return sorted(nombre for nombre, estado in estados.items() if estado == "calculado")
+
+
+def test_segunda_ejecucion_reutiliza_todo(entorno):
+    assert _calculados(_ejecutar(entorno)) == TODOS
+    # El paso 07 reescribió su JSON de reporte: eso no puede invalidar nada
+    assert _calculados(_ejecutar(entorno)) == []
+    final = pd.read_parquet(entorno / "final.parquet")
+    assert len(final) == 200
+    assert final["turno_hecho_cod"].dtype == "int64"
+
+
+def test_constante_solo_rehace_su_paso(entorno, monkeypatch):
+    _ejecutar(entorno)
+    monkeypatch.setattr(et, "LAT_MIN", -12.0)
+    assert _calculados(_ejecutar(entorno)) == ["09"]
+
+
+def test_funcion_auxiliar_invalida_a_quien_la_usa(entorno, monkeypatch):
+    """``_mapear`` no se declara en ningún paso: la clave la alcanza desde ``codificar``."""
+    _ejecutar(entorno)
+
+    def _mapear(serie, mapa):
+        return serie.astype(object).map(mapa).fillna(-1).astype("int8")
+
+    monkeypatch.setattr(et, "_mapear", _mapear)
+    assert _calculados(_ejecutar(entorno)) == ["08", "09"]
+
+
+def test_categorias_entran_en_la_clave_de_los_pasos_con_tabla(entorno):
+    pasos = {paso.nombre: paso for paso in construir_dag(str(entorno / "reportes"))}
+    for nombre in ("06", "07"):
+        assert pasos[nombre].clave("entrada", "cat-a") == pasos[nombre].clave("entrada", "cat-b")
+    for nombre in ("02", "08"):
+        assert pasos[nombre].clave("entrada", "cat-a") != pasos[nombre].clave("entrada", "cat-b")
+
+
+def test_otras_categorias_rehacen_las_tablas(entorno):
+    _ejecutar(entorno)
+    with open(tablas.CATEGORIAS_DEFECTO, encoding="utf-8") as f:
+        categorias = json.load(f)
+    categorias["departamento_hecho"].append("NUEVO")
+    otras = entorno / "categorias.json"
+    otras.write_text(json.dumps(categorias, ensure_ascii=False), encoding="utf-8")
+
+    # 06 y 07 leen la salida del 05, que cambió
+    assert _calculados(_ejecutar(entorno, str(otras))) == TODOS
+    assert _calculados(_ejecutar(entorno, str(otras))) == []
+
+
+def test_rechaza_categorias_que_reescribe_un_paso(entorno):
+    reporte = entorno / "reportes" / "07_diccionario_categoricas.json"
+    with pytest.raises(ValueError, match="07"):
+        _ejecutar(entorno, str(reporte))
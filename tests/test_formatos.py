@@ -0,0 +1,72 @@
+import json
+
+import pytest
+import requests
+
+from data_collection import ingesta
+from data_collection.lotes import es_error_de_capacidad
+from data_collection.parseo import ErrorAPI, FormatoNoSoportado
+
+GEOJSON = json.dumps({"type": "FeatureCollection", "features": [
+    {"geometry": {"coordinates": [-77.0, -12.0]}, "properties": {"objectid": 1}}]}).encode()
+
+
+class _Respuesta:
+    def __init__(self, codigo, contenido):
+        self.status_code = codigo
+        self.content = contenido
+        self.elapsed = type("Duracion", (), {"total_seconds": lambda self: 0.0})()
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"HTTP {self.status_code}", response=self)
+
+
+class _Sesion:
+    """Responde a cada ``f`` con la respuesta indicada y anota los formatos pedidos."""
+
+    def __init__(self, respuestas):
+        self.respuestas = respuestas
+        self.pedidos = []
+
+    def post(self, url, data, **kwargs):
+        self.pedidos.append(data["f"])
+        return self.respuestas[data["f"]]
+
+
+@pytest.fixture(autouse=True)
+def formatos_limpios(monkeypatch):
+    monkeypatch.setattr(ingesta, "FORMATOS_NO_SOPORTADOS", set())
+
+
+def _error(codigo, mensaje):
+    return json.dumps({"error": {"code": codigo, "message": mensaje}}).encode()
+
+
+@pytest.mark.parametrize("codigo", [200, 400])
+def test_rechazo_explicito_descarta_el_formato(codigo):
+    sesion = _Sesion({"pbf": _Respuesta(codigo, _error(400, "Invalid format 'pbf'")),
+                      "geojson": _Respuesta(200, GEOJSON)})
+    assert ingesta.fetch_chunk(sesion, [1])["objectid"].tolist() == [1]
+    assert ingesta.fetch_chunk(sesion, [1])["objectid"].tolist() == [1]
+    assert sesion.pedidos == ["pbf", "geojson", "geojson"]
+
+
+@pytest.mark.parametrize("respuesta, error", [
+    (_Respuesta(200, b"<html>Service Unavailable</html>"), ValueError),
+    (_Respuesta(200, _error(500, "Error performing query operation")), ErrorAPI),
+    (_Respuesta(403, b"Forbidden"), requests.HTTPError),
+    (_Respuesta(400, _error(400, "Unable to complete operation.")), requests.HTTPError),
+])
+def test_otros_errores_no_prueban_otro_formato(respuesta, error):
+    sesion = _Sesion({"pbf": respuesta, "geojson": _Respuesta(200, GEOJSON)})
+    with pytest.raises(error):
+        ingesta.fetch_chunk(sesion, [1])
+    assert sesion.pedidos == ["pbf"]
+    assert not ingesta.FORMATOS_NO_SOPORTADOS
+
+
+def test_error_json_500_es_de_capacidad():
+    assert es_error_de_capacidad(ErrorAPI({"code": 500, "message": "Error performing query operation"}))
+    assert not es_error_de_capacidad(ErrorAPI({"code": 400, "message": "Unable to complete operation."}))
+    assert not es_error_de_capacidad(FormatoNoSoportado({"code": 400, "message": "Invalid format 'pbf'"}))
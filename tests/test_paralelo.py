@@ -0,0 +1,34 @@
+import time
+
+import pandas as pd
+
+from eda.etapas import EtapaAtipicos
+from eda.paralelo import aplicar_etapas, mapear_ordenado
+
+
+def _cuadrado_lento(n):
+    # Los primeros tardan más: en el pool terminan después que los siguientes
+    time.sleep(0.05 * (n % 4 == 0))
+    return n * n
+
+
+def test_mapear_ordenado_conserva_el_orden():
+    assert list(mapear_ordenado(_cuadrado_lento, range(12), procesos=2, en_vuelo=4)) == [n * n for n in range(12)]
+
+
+def test_mapear_ordenado_en_serie():
+    assert list(mapear_ordenado(_cuadrado_lento, range(5), procesos=1)) == [0, 1, 4, 9, 16]
+
+
+def test_aplicar_etapas_como_en_serie():
+    chunks = [pd.DataFrame({"lat": [-12.0, 5.0, -11.0 + i], "lon": [-77.0, -77.0, -70.0]}) for i in range(6)]
+
+    en_serie = EtapaAtipicos()
+    esperado = list(aplicar_etapas(iter(chunks), [en_serie], procesos=1))
+    en_paralelo = EtapaAtipicos()
+    obtenido = list(aplicar_etapas(iter(chunks), [en_paralelo], procesos=2, en_vuelo=3))
+
+    assert len(obtenido) == len(esperado)
+    for a, b in zip(obtenido, esperado):
+        pd.testing.assert_frame_equal(a, b)
+    assert (en_paralelo.filas, en_paralelo.atipicas) == (en_serie.filas, en_serie.atipicas) == (18, 6)
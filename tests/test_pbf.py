@@ -0,0 +1,52 @@
+import pytest
+
+from benchmarks.servidor_arcgis import (
+    CAMPOS, _pb_campo, _pb_double, _pb_entero, _pb_varint, _pb_zigzag, _pbf, generar_denuncias,
+)
+from data_collection.pbf import ORIGEN_SUPERIOR_IZQUIERDO, decodificar_features
+
+ORIGEN_INFERIOR_IZQUIERDO = 1
+
+
+def _coleccion(origen, escala, traslado, puntos):
+    """FeatureCollectionPBuffer con un campo ``objectid`` y un punto cuantizado por feature."""
+    transformacion = (
+        _pb_entero(1, origen)
+        + _pb_campo(2, _pb_double(1, escala[0]) + _pb_double(2, escala[1]))
+        + _pb_campo(3, _pb_double(1, traslado[0]) + _pb_double(2, traslado[1]))
+    )
+    partes = [_pb_campo(12, transformacion), _pb_campo(13, _pb_campo(1, b"objectid") + _pb_entero(2, 6))]
+    for oid, (x, y) in enumerate(puntos, 1):
+        coords = _pb_varint(_pb_zigzag(x)) + _pb_varint(_pb_zigzag(y))
+        geometria = _pb_campo(2, _pb_varint(1)) + _pb_campo(3, coords)
+        partes.append(_pb_campo(15, _pb_campo(1, _pb_entero(6, oid)) + _pb_campo(2, geometria)))
+    return _pb_campo(2, _pb_campo(1, b"".join(partes)))
+
+
+def test_origen_superior_izquierdo_invierte_y():
+    salida = decodificar_features(_coleccion(ORIGEN_SUPERIOR_IZQUIERDO, (0.5, 0.25), (-180.0, 90.0),
+                                             [(2, 4), (0, 0), (-4, 8)]))
+    assert salida["columnas"]["objectid"] == [1, 2, 3]
+    assert salida["x"] == [-179.0, -180.0, -182.0]
+    assert salida["y"] == [89.0, 90.0, 88.0]
+
+
+def test_origen_inferior_izquierdo_suma_y():
+    salida = decodificar_features(_coleccion(ORIGEN_INFERIOR_IZQUIERDO, (0.5, 0.25), (-180.0, -90.0),
+                                             [(2, 4)]))
+    assert salida["x"] == [-179.0]
+    assert salida["y"] == [-89.0]
+
+
+def test_respuesta_del_servidor_simulado():
+    """Las coordenadas cuantizadas (escala 1e-9) vuelven con error menor que la escala."""
+    registros = generar_denuncias(50)
+    campos = [nombre for nombre, _ in CAMPOS]
+    salida = decodificar_features(_pbf(registros, campos, True, True))
+
+    assert salida["excedido"] is True
+    assert salida["wkid"] == 4326
+    assert salida["columnas"]["objectid"] == [r["objectid"] for r in registros]
+    assert salida["columnas"]["tipo_hecho"] == [r["tipo_hecho"] for r in registros]
+    assert salida["x"] == pytest.approx([r["long_hecho"] for r in registros], abs=1e-8)
+    assert salida["y"] == pytest.approx([r["lat_hecho"] for r in registros], abs=1e-8)
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from eda.tablas import EscritorTabla, leer_tabla
+
+
+def test_columna_vacia_en_el_primer_chunk_toma_el_tipo_de_sus_valores(tmp_path):
+    ruta = str(tmp_path / "paso.parquet")
+    with EscritorTabla(ruta) as escritor:
+        escritor.escribir(pd.DataFrame({"objectid": [1, 2], "turno_hecho_cod": [np.nan, np.nan]}))
+        escritor.escribir(pd.DataFrame({"objectid": [3, 4], "turno_hecho_cod": [np.nan, np.nan]}))
+        escritor.escribir(pd.DataFrame({"objectid": [5, 6], "turno_hecho_cod": [2.0, np.nan]}))
+
+    assert str(pq.read_schema(ruta).field("turno_hecho_cod").type) == "double"
+    df = leer_tabla(ruta)
+    assert df["objectid"].tolist() == [1, 2, 3, 4, 5, 6]
+    assert df["turno_hecho_cod"].dtype == "float64"
+    assert df["turno_hecho_cod"].iloc[4] == 2.0
+    assert not list(tmp_path.glob("*.tmp*"))
+
+
+def test_error_a_mitad_no_deja_archivos(tmp_path):
+    ruta = tmp_path / "paso.parquet"
+    with pytest.raises(RuntimeError, match="corte"):
+        with EscritorTabla(str(ruta)) as escritor:
+            escritor.escribir(pd.DataFrame({"objectid": [1]}))
+            raise RuntimeError("corte")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_valores_que_no_caben_amplian_el_tipo(tmp_path):
+    ruta = str(tmp_path / "paso.parquet")
+    with EscritorTabla(ruta) as escritor:
+        escritor.escribir(pd.DataFrame({"mes_hecho": np.array([1, 2], dtype="int8")}))
+        # Nulos que el paso no pudo llevar a int8: caben en el esquema
+        escritor.escribir(pd.DataFrame({"mes_hecho": [3.0, np.nan]}))
+        escritor.escribir(pd.DataFrame({"mes_hecho": [300.7, 1000.0]}))
+
+    assert str(pq.read_schema(ruta).field("mes_hecho").type) == "double"
+    assert leer_tabla(ruta)["mes_hecho"].tolist()[4:] == [300.7, 1000.0]
+    assert not list(tmp_path.glob("*.tmp*"))